@@ -1,5 +1,6 @@
 import json, time, uuid, os
 import boto3
+from responses import json_response
 
 table = boto3.resource("dynamodb").Table(os.environ["BLOG_TABLE"])
 
@@ -16,8 +17,4 @@ def handler(event, context):
 
     table.put_item(Item=item)
 
-    return {
-        "statusCode": 200,
-        "headers": {"Content-Type": "application/json"},
-        "body": json.dumps({"id": item["id"]})
-    }
+    return json_response({"id": item["id"]})
@@ -1,4 +1,5 @@
-import json, os, boto3
+import os, boto3
+from responses import json_response, error_response
 
 table = boto3.resource("dynamodb").Table(os.environ["BLOG_TABLE"])
 
@@ -17,13 +18,9 @@ def handler(event, context):
             Limit=1
         )
         if q["Count"] == 0:
-            return {"statusCode": 404, "body": "Not found"}
+            return error_response("Not found", 404)
         item = q["Items"][0]
     else:
         item = res["Item"]
 
-    return {
-        "statusCode": 200,
-        "headers": {"Content-Type": "application/json"},
-        "body": json.dumps(item)
-    }
+    return json_response(item)
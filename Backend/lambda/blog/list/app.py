@@ -1,15 +1,16 @@
-import json, os, boto3
+import os, logging, boto3
+
+from responses import json_response
+from scan_engine import ParallelScan
 
 table = boto3.resource("dynamodb").Table(os.environ["BLOG_TABLE"])
+logger = logging.getLogger()
 
 def handler(event, context):
-    res = table.scan()
-
-    # Sort newest first
-    items = sorted(res["Items"], key=lambda x: x["ts"], reverse=True)
+    # All pages (the old single scan() call stopped at the first 1 MB)
+    scan = ParallelScan(table)
+    items = sorted(scan, key=lambda x: x["ts"], reverse=True)  # newest first
+    if logger.isEnabledFor(logging.DEBUG):  # summary() joins the scan pool
+        logger.debug(scan.summary())
 
-    return {
-        "statusCode": 200,
-        "headers": {"Content-Type": "application/json"},
-        "body": json.dumps(items)
-    }
+    return json_response(items)
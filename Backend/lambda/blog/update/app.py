@@ -1,4 +1,5 @@
 import json, os, boto3
+from responses import json_response, error_response
 
 table = boto3.resource("dynamodb").Table(os.environ["BLOG_TABLE"])
 
@@ -14,7 +15,7 @@ def handler(event, context):
             expr_attr[f":{field}"] = body[field]
 
     if not update_expr:
-        return {"statusCode": 400, "body": "Nothing to update"}
+        return error_response("Nothing to update", 400)
 
     table.update_item(
         Key={"id": body["id"], "ts": body.get("ts")},
@@ -22,7 +23,4 @@ def handler(event, context):
         ExpressionAttributeValues=expr_attr
     )
 
-    return {
-        "statusCode": 200,
-        "body": json.dumps({"success": True})
-    }
+    return json_response({"success": True})
@@ -1,5 +1,6 @@
 import os, json, uuid, boto3
 from datetime import datetime
+from responses import json_response
 TABLE=os.environ["BOOKINGS_TABLE"]; ddb=boto3.resource("dynamodb").Table(TABLE)
 def lambda_handler(event,context):
     body=json.loads(event.get("body") or "{}")
@@ -7,5 +8,4 @@ def lambda_handler(event,context):
     item={"booking_id":booking_id,"created_at":datetime.utcnow().isoformat()+"Z","form":body.get("form",{}),
           "selection":body.get("selection",{}),"status":"NEW"}
     ddb.put_item(Item=item)
-    return {"statusCode":200,"headers":{"Content-Type":"application/json","Access-Control-Allow-Origin":"*"},
-            "body":json.dumps({"booking_id":booking_id})}
\ No newline at end of file
+    return json_response({"booking_id":booking_id})
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+Availability-window search for rent listings (CommonLayer).
+
+    GET /rent/listings?availableFrom=2026-11-01&availableTo=2026-12-15
+
+returns listings whose [availabilityFrom, availabilityTo] window overlaps
+the requested one (a missing availabilityTo is open-ended). One bound
+alone asks about that single day.
+
+A warm container keeps an interval tree per listings table, rebuilt
+after AVAILABILITY_INDEX_TTL_SECONDS from a projected scan. Each entry
+carries the attributes the exact/price/location filters and sorts need, so a
+page is: tree lookup -> filter/sort in memory -> BatchGet of just the
+page's listings (q and a fresh window check on those).
+"""
+import os
+import time
+
+import listings
+from scan_engine import ParallelScan
+
+AVAILABILITY_PLAN = "AvailabilityIndex"
+INDEX_TTL_SECONDS = int(os.environ.get("AVAILABILITY_INDEX_TTL_SECONDS", "120"))
+
+ENTRY_FIELDS = ["listingId", "createdAt", "size", "condition", "locationLc",
+                listings.PRICE_ATTR] + list(listings.AVAILABILITY_FIELDS)
+
+_cached = {}   # table name -> IntervalIndex
+
+
+def parse_window(params):
+    """(start, end) ISO dates from availableFrom/availableTo, or None."""
+    params = params or {}
+    start = listings.parse_date(params.get("availableFrom"), "availableFrom")
+    end = listings.parse_date(params.get("availableTo"), "availableTo")
+    if start is None and end is None:
+        return None
+    start, end = start or end, end or start
+    if start > end:
+        raise ValueError("availableFrom must not be after availableTo")
+    return start, end
+
+
+class IntervalIndex:
+    """
+    Static augmented interval tree: entries sorted by start, laid out as
+    an implicit balanced BST (the middle of each range is its root) with
+    the largest end of every subtree. An overlap query visits only the
+    subtrees that can hold a match, O(log n + k).
+    """
+
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=lambda e: e["start"])
+        self.starts = [e["start"] for e in self.entries]
+        self.max_end = [""] * len(self.entries)
+        self._build(0, len(self.entries))
+        self.built_at = time.time()
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return ""
+        mid = (lo + hi) // 2
+        self.max_end[mid] = max(self.entries[mid]["end"],
+                                self._build(lo, mid), self._build(mid + 1, hi))
+        return self.max_end[mid]
+
+    def overlapping(self, start, end):
+        """Entries with entry.start <= end and entry.end >= start."""
+        out = []
+        stack = [(0, len(self.entries))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self.max_end[mid] < start:
+                continue  # nothing in this subtree reaches the window
+            stack.append((lo, mid))
+            if self.starts[mid] <= end:
+                if self.entries[mid]["end"] >= start:
+                    out.append(self.entries[mid])
+                stack.append((mid + 1, hi))
+        return out
+
+
+def _entry(item):
+    start, end = listings.listing_window(item)
+    return {
+        "start": start,
+        "end": end,
+        "listingId": item["listingId"],
+        "createdAt": int(item.get("createdAt") or 0),
+        "size": item.get("size"),
+        "condition": item.get("condition"),
+        "locationLc": item.get("locationLc"),
+        listings.PRICE_ATTR: item.get(listings.PRICE_ATTR),
+    }
+
+
+def get_index(table):
+    """Per-container interval tree for table, rebuilt after the TTL."""
+    index = _cached.get(table.name)
+    if index is None or time.time() - index.built_at > INDEX_TTL_SECONDS:
+        t0 = time.perf_counter()
+        scan = ParallelScan(table, projection=ENTRY_FIELDS)
+        index = IntervalIndex(_entry(it) for it in scan)
+        _cached[table.name] = index
+        print(f"Availability index built: {len(index.entries)} listings "
+              f"in {time.perf_counter() - t0:.3f}s; {scan.summary()}")
+    return index
+
+
+def candidates(index, filters, sort="newest"):
+    """Overlapping entries passing the exact/price/location filters, in sort order."""
+    sort_key, forward = listings.SORT_ORDERS[sort]
+    window = filters["window"]
+    entry_filters = {k: filters.get(k) for k in ("size", "condition", "location", "minPrice", "maxPrice")}
+    found = [e for e in index.overlapping(*window) if listings.matches_filters(e, entry_filters)]
+    if sort_key == listings.PRICE_ATTR:
+        # like GSI_Price, price sorts only cover listings with a price
+        found = [e for e in found if e.get(sort_key) is not None]
+    found.sort(key=lambda e: (e[sort_key], e["listingId"]), reverse=not forward)
+    return found
+
+
+def read_page(table, filters, page_size, sort="newest", token=None, stats=None):
+    """
+    One page of listings available during filters["window"].
+    Returns (items, next_token); the token is an offset into the
+    candidate list, in the usual envelope.
+    """
+    offset = 0
+    if token:
+        offset = int(listings.decode_token(token, AVAILABILITY_PLAN, sort)["o"])
+    found = candidates(get_index(table), filters, sort)
+
+    items = []
+    pos = offset
+    calls = 0
+    while pos < len(found) and len(items) < page_size:
+        chunk = found[pos:pos + listings.BATCH_GET_LIMIT]
+        docs = listings.batch_get(table, [e["listingId"] for e in chunk])
+        calls += 1
+        for e in chunk:
+            pos += 1
+            doc = docs.get(e["listingId"])  # deleted since the index was built
+            if doc and listings.matches_filters(doc, filters):
+                items.append(doc)
+                if len(items) >= page_size:
+                    break
+    if stats is not None:
+        stats.update(index=AVAILABILITY_PLAN, pages=calls, scanned=pos - offset,
+                     candidates=len(found))
+    next_token = None
+    if pos < len(found):
+        next_token = listings.encode_token(AVAILABILITY_PLAN, sort, {"o": pos})
+    return items, next_token
@@ -0,0 +1,301 @@
+"""
+Offline geo helpers shared by the Python lambdas (CommonLayer).
+
+    lat, lon, exact = zip_centroid("77002")
+    lat, lon, exact = geocode("near Nagpur MIDC")     # city / pincode / ZIP / "lat,lon"
+    cells = covering_cells(lat, lon, radius_km=100)   # geohash prefixes
+    haversine_km(lat, lon, other_lat, other_lon)
+
+Coordinates come from bundled centroid tables in geodata/, so nothing
+here calls out to a geocoding service.
+"""
+import os
+import re
+import csv
+import math
+from bisect import bisect_left
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Stored geohash length (~150 m cells) and the prefix used as an index
+# partition key (~1250 x 625 km cells)
+GEOHASH_PRECISION = 7
+GEO_CELL_PRECISION = 2
+
+# Upper bound on geohash cells a radius lookup may fan out to
+MAX_COVER_CELLS = 9
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geodata")
+
+_zip_table = {}
+_zip_keys = []
+# USPS 3-digit ranges: sorted first prefixes and (last, state, lat, lon)
+_zip_range_starts = []
+_zip_ranges = []
+
+# Gazetteer: normalised city name/alias -> (lat, lon); India PIN prefix -> (lat, lon)
+_city_table = {}
+_pin_prefix_table = {}
+
+# Longest place name, in words, tried when matching free text
+MAX_NAME_WORDS = 4
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_LATLON_RE = re.compile(r"^\s*(-?\d{1,2}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)\s*$")
+_PIN_RE = re.compile(r"(?<!\d)(\d{6})(?!\d)")
+# A 5-digit number is only read as a US ZIP when it is the whole text or
+# the text says it is in the US (a country word or "<state code> <zip>")
+_ZIP_RE = re.compile(r"(?<!\d)(\d{5})(?:-\d{4})?(?!\d)")
+_ZIP_ONLY_RE = re.compile(r"^\s*\d{5}(?:-\d{4})?\s*$")
+_US_WORDS = re.compile(r"\b(?:usa|u\.s\.(?:a\.)?|united states)(?!\w)|\bus\s*$")
+_US_STATES = frozenset(
+    "al ak az ar ca co ct de dc fl ga hi id il in ia ks ky la me md ma mi mn ms mo mt "
+    "ne nv nh nj nm ny nc nd oh ok or pa ri sc sd tn tx ut vt va wa wv wi wy pr".split())
+_STATE_ZIP_RE = re.compile(r"\b([a-z]{2})[\s,]+(\d{5})(?:-\d{4})?(?!\d)")
+
+
+# ---------------------------------------------------
+# GEOHASH
+# ---------------------------------------------------
+def geohash_encode(lat, lon, precision=GEOHASH_PRECISION):
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    out = []
+    bits = 0
+    ch = 0
+    even = True  # longitude bit first
+    while len(out) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                ch = (ch << 1) | 1
+                lon_lo = mid
+            else:
+                ch <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(_BASE32[ch])
+            bits = 0
+            ch = 0
+    return "".join(out)
+
+
+def cell_size(precision):
+    """(lat_degrees, lon_degrees) covered by one geohash cell."""
+    total = 5 * precision
+    lon_bits = (total + 1) // 2
+    lat_bits = total // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def _frange(lo, hi, step):
+    """lo, lo+step, ... plus hi itself: one sample in every cell of [lo, hi]."""
+    out = []
+    v = lo
+    while v < hi:
+        out.append(v)
+        v += step
+    out.append(hi)
+    return out
+
+
+def bounding_box(lat, lon, radius_km):
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    coslat = max(math.cos(math.radians(lat)), 0.01)
+    dlon = min(dlat / coslat, 180.0)
+    return (max(lat - dlat, -90.0), min(lat + dlat, 90.0),
+            max(lon - dlon, -180.0), min(lon + dlon, 180.0))
+
+
+def cells_for_box(box, precision):
+    lat_lo, lat_hi, lon_lo, lon_hi = box
+    h, w = cell_size(precision)
+    return {
+        geohash_encode(la, lo, precision)
+        for la in _frange(lat_lo, lat_hi, h)
+        for lo in _frange(lon_lo, lon_hi, w)
+    }
+
+
+def covering_cells(lat, lon, radius_km, min_precision=GEO_CELL_PRECISION,
+                   max_precision=GEOHASH_PRECISION, max_cells=MAX_COVER_CELLS):
+    """
+    Geohash prefixes whose union covers the circle's bounding box, at the
+    finest precision that needs no more than max_cells of them (never
+    coarser than min_precision, so every prefix maps onto one partition).
+    """
+    box = bounding_box(lat, lon, radius_km)
+    best = cells_for_box(box, min_precision)
+    for precision in range(min_precision + 1, max_precision + 1):
+        cells = cells_for_box(box, precision)
+        if len(cells) > max_cells:
+            break
+        best = cells
+    return sorted(best)
+
+
+# ---------------------------------------------------
+# DISTANCE
+# ---------------------------------------------------
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+# ---------------------------------------------------
+# ZIP CENTROIDS
+# ---------------------------------------------------
+def _load_zip_table():
+    if not _zip_table:
+        path = os.path.join(_DATA_DIR, "us_zip_centroids.csv")
+        with open(path, newline="", encoding="utf-8") as fp:
+            for row in csv.DictReader(fp):
+                _zip_table[row["zip"]] = (float(row["lat"]), float(row["lon"]))
+        _zip_keys.extend(sorted(_zip_table))
+        path = os.path.join(_DATA_DIR, "us_zip_prefixes.csv")
+        with open(path, newline="", encoding="utf-8") as fp:
+            for row in csv.DictReader(fp):
+                _zip_range_starts.append(row["first"])
+                _zip_ranges.append((row["last"], row["state"], float(row["lat"]), float(row["lon"])))
+    return _zip_table
+
+
+def _zip_range(zip5):
+    """(state, lat, lon) of the USPS 3-digit range holding zip5, or None."""
+    i = bisect_left(_zip_range_starts, zip5[:3] + "~") - 1
+    if i < 0 or zip5[:3] > _zip_ranges[i][0]:
+        return None
+    return _zip_ranges[i][1:]
+
+
+def zip_centroid(pincode, approximate=True):
+    """
+    (lat, lon, exact) for a US ZIP, or None. Unknown ZIPs fall back to
+    the numerically closest bundled ZIP sharing the 3-digit prefix, else
+    to the representative point of its USPS prefix range (the range's
+    main sectional centre), flagged exact=False. Only unassigned and
+    military prefixes return None.
+    """
+    zip5 = str(pincode or "").strip()[:5]
+    if len(zip5) != 5 or not zip5.isdigit():
+        return None
+
+    table = _load_zip_table()
+    if zip5 in table:
+        lat, lon = table[zip5]
+        return lat, lon, True
+    if not approximate:
+        return None
+
+    i = bisect_left(_zip_keys, zip5)
+    candidates = [k for k in _zip_keys[max(0, i - 1):i + 1] if k[:3] == zip5[:3]]
+    if not candidates:
+        area = _zip_range(zip5)
+        if not area:
+            return None
+        _, lat, lon = area
+        return lat, lon, False
+    nearest = min(candidates, key=lambda k: abs(int(k) - int(zip5)))
+    lat, lon = table[nearest]
+    return lat, lon, False
+
+
+# ---------------------------------------------------
+# GAZETTEER (cities, India PIN codes, free text)
+# ---------------------------------------------------
+def _name_key(text):
+    return " ".join(_WORD_RE.findall(str(text or "").lower()))
+
+
+def _load_city_table():
+    if not _city_table:
+        path = os.path.join(_DATA_DIR, "cities.csv")
+        with open(path, newline="", encoding="utf-8") as fp:
+            for row in csv.DictReader(fp):
+                point = (float(row["lat"]), float(row["lon"]))
+                for name in [row["name"]] + [a for a in row["aliases"].split(";") if a]:
+                    _city_table.setdefault(_name_key(name), point)
+                # The first city listed for a prefix is its sorting district's centre
+                if row["pin_prefix"]:
+                    _pin_prefix_table.setdefault(row["pin_prefix"], point)
+    return _city_table
+
+
+def city_centroid(name):
+    """(lat, lon) for a bundled city name or alias, or None."""
+    return _load_city_table().get(_name_key(name))
+
+
+def pin_centroid(pincode):
+    """
+    (lat, lon) for an Indian PIN code, or None. Resolved by its 3-digit
+    sorting-district prefix, so always approximate.
+    """
+    pin = str(pincode or "").strip()
+    if len(pin) != 6 or not pin.isdigit():
+        return None
+    _load_city_table()
+    return _pin_prefix_table.get(pin[:3])
+
+
+def _us_zips(text):
+    """5-digit codes in text that read as US ZIPs (see _ZIP_RE)."""
+    if _ZIP_ONLY_RE.match(text):
+        return [text.strip()[:5]]
+    lower = text.lower()
+    stated = [code for state, code in _STATE_ZIP_RE.findall(lower) if state in _US_STATES]
+    if stated:
+        return stated
+    if _US_WORDS.search(lower):
+        return _ZIP_RE.findall(text)
+    return []
+
+
+def geocode(text):
+    """
+    (lat, lon, exact) for free text, or None. Tried in order:
+    "lat,lon"; a 6-digit PIN anywhere in the text; a US ZIP (the whole
+    text, or with a US state code or country in it); the longest bundled
+    city name found in it ("near Nagpur MIDC" -> Nagpur). Other 5-digit
+    numbers ("Plot 12345, Nagpur") are ignored. exact is True only for
+    explicit coordinates and exact ZIPs.
+    """
+    text = str(text or "")
+    m = _LATLON_RE.match(text)
+    if m:
+        lat, lon = float(m.group(1)), float(m.group(2))
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            return lat, lon, True
+        return None
+
+    for code in _PIN_RE.findall(text):
+        point = pin_centroid(code)
+        if point:
+            return point[0], point[1], False
+    for code in _us_zips(text):
+        point = zip_centroid(code)
+        if point:
+            return point
+
+    table = _load_city_table()
+    words = _WORD_RE.findall(text.lower())
+    for size in range(min(MAX_NAME_WORDS, len(words)), 0, -1):
+        for i in range(len(words) - size + 1):
+            point = table.get(" ".join(words[i:i + size]))
+            if point:
+                return point[0], point[1], False
+    return None
@@ -0,0 +1,303 @@
+"""
+Facet counts for GET /rent/listings/facets and /sell/listings/facets
+(CommonLayer).
+
+Unfiltered: one counts document per listings table in the meta table,
+kept current by the listings stream processor (ListingIndexFunction):
+
+    id      "LISTINGS#<table>#facets"
+    counts  {"total": n, "size": {value: n}, "condition": {...}, "location": {...}}
+    version optimistic-lock counter, as the ports facet snapshot
+    batches ids of the last stream batches applied (MAX_BATCH_IDS), so a
+            retried batch isn't counted twice
+
+location is free text, so its value map can outgrow a DynamoDB item:
+past MAX_SNAPSHOT_BYTES the least common locations are dropped from the
+snapshot (logged). A dropped value that comes back restarts its count
+from that listing.
+
+Filtered: the filters' own access path does the counting. The index
+read_page would use is queried for just the facet attributes (the
+other filters ride along server-side), radius searches count the
+geohash cells' candidates and availability windows the interval
+index's entries. Only counts are kept in memory.
+"""
+import os
+import json
+import time
+
+import boto3
+from botocore.exceptions import ClientError
+
+import listings
+import listing_geo
+import availability
+from scan_engine import scan_items, projection_kwargs
+
+META_TABLE = os.environ.get("META_TABLE")
+
+# facet name -> listing attribute it counts (location by its normalised form)
+FACET_FIELDS = {
+    "size": "size",
+    "condition": "condition",
+    "location": "locationLc",
+}
+COUNTS_PLAN = "Counters"
+
+# How long a warm container keeps its copy before re-reading the meta item
+CACHE_TTL_SECONDS = int(os.environ.get("FACETS_TTL_SECONDS", "60"))
+MAX_WRITE_ATTEMPTS = 5
+MAX_BATCH_IDS = 50
+MAX_SNAPSHOT_BYTES = 350_000   # DynamoDB items stop at 400 KB
+TRIMMED_FACET = "location"
+
+_ddb = boto3.resource("dynamodb")
+_cache = {}   # table name -> (counts, loaded_at)
+
+
+def _snapshot_id(table_name):
+    return f"LISTINGS#{table_name}#facets"
+
+
+# ---------------------------------------------------
+# COUNTS
+# ---------------------------------------------------
+def _facet_values(item):
+    values = {}
+    for facet, attr in FACET_FIELDS.items():
+        value = item.get(attr)
+        if attr == "locationLc" and value is None:
+            value = listings.normalize_text(item.get("location"))
+        if isinstance(value, str) and value.strip():
+            values[facet] = value.strip()
+    return values
+
+
+def empty_counts():
+    return {"total": 0, **{facet: {} for facet in FACET_FIELDS}}
+
+
+def apply_item(counts, item, delta):
+    """Add (delta=1) or remove (delta=-1) one listing's values."""
+    counts["total"] = max(0, counts.get("total", 0) + delta)
+    for facet, value in _facet_values(item).items():
+        bucket = counts.setdefault(facet, {})
+        n = bucket.get(value, 0) + delta
+        if n > 0:
+            bucket[value] = n
+        else:
+            bucket.pop(value, None)
+
+
+def count_items(items):
+    counts = empty_counts()
+    for it in items:
+        apply_item(counts, it, 1)
+    return counts
+
+
+def to_response(counts, plan):
+    """{"total", "facets": {facet: [{"value", "count"}] most common first}, "plan"}."""
+    return {
+        "total": counts.get("total", 0),
+        "facets": {
+            facet: [{"value": v, "count": n}
+                    for v, n in sorted(counts.get(facet, {}).items(), key=lambda kv: (-kv[1], kv[0]))]
+            for facet in FACET_FIELDS
+        },
+        "plan": plan,
+    }
+
+
+# ---------------------------------------------------
+# SNAPSHOT STORAGE
+# ---------------------------------------------------
+def _scan_counts(table):
+    return count_items(scan_items(table, projection=["size", "condition", "location", "locationLc"]))
+
+
+def _read_snapshot(table_name, consistent=False):
+    """
+    Returns (counts, version, applied batch ids) or (None, None, []) if no
+    snapshot exists yet.
+    """
+    resp = _ddb.Table(META_TABLE).get_item(
+        Key={"id": _snapshot_id(table_name)},
+        ConsistentRead=consistent,
+    )
+    item = resp.get("Item")
+    if not item:
+        return None, None, []
+    return json.loads(item["counts"]), int(item.get("version", 0)), list(item.get("batches") or [])
+
+
+def _dumps(counts):
+    return json.dumps(counts, separators=(",", ":"), sort_keys=True)
+
+
+def _counts_text(table_name, counts):
+    """JSON for the snapshot, dropping the rarest locations past MAX_SNAPSHOT_BYTES."""
+    text = _dumps(counts)
+    if len(text.encode()) <= MAX_SNAPSHOT_BYTES:
+        return text
+    values = counts.get(TRIMMED_FACET) or {}
+    size = len(_dumps(dict(counts, **{TRIMMED_FACET: {}})).encode())
+    kept = {}
+    for value, n in sorted(values.items(), key=lambda kv: (-kv[1], kv[0])):
+        entry = len(_dumps({value: n}).encode()) - 1   # minus braces, plus comma
+        if size + entry > MAX_SNAPSHOT_BYTES:
+            break
+        kept[value] = n
+        size += entry
+    print(f"Listing facet snapshot for {table_name}: kept {len(kept)} of "
+          f"{len(values)} {TRIMMED_FACET} values")
+    counts[TRIMMED_FACET] = kept
+    return _dumps(counts)
+
+
+def _write_snapshot(table_name, counts, expected_version, batches=()):
+    """Conditional put so concurrent stream batches never lose an update."""
+    item = {
+        "id": _snapshot_id(table_name),
+        "counts": _counts_text(table_name, counts),
+        "version": (expected_version or 0) + 1,
+        "updatedAt": int(time.time()),
+    }
+    if batches:
+        item["batches"] = list(batches)[-MAX_BATCH_IDS:]
+    if expected_version is None:
+        condition = {"ConditionExpression": "attribute_not_exists(id)"}
+    else:
+        condition = {
+            "ConditionExpression": "version = :v",
+            "ExpressionAttributeValues": {":v": expected_version},
+        }
+    _ddb.Table(META_TABLE).put_item(Item=item, **condition)
+
+
+def get_counts(table):
+    """
+    Unfiltered counts: in-container copy first, then one GetItem.
+    Without a snapshot (or meta table) they come from a projected scan.
+    """
+    cached = _cache.get(table.name)
+    now = time.time()
+    if cached and now - cached[1] < CACHE_TTL_SECONDS:
+        return cached[0]
+
+    counts = None
+    if META_TABLE:
+        try:
+            counts, _, _ = _read_snapshot(table.name)
+        except ClientError as e:
+            print("Listing facet snapshot read failed", e)
+    if counts is None:
+        counts = _scan_counts(table)
+
+    _cache[table.name] = (counts, now)
+    return counts
+
+
+def rebuild(table_name):
+    counts = _scan_counts(_ddb.Table(table_name))
+    _, version, _ = _read_snapshot(table_name, consistent=True)
+    _write_snapshot(table_name, counts, version)
+    return counts
+
+
+def apply_changes(table_name, changes, batch_id=None):
+    """
+    Apply (old_image, new_image) pairs from one listings table's stream.
+    Returns the number of listing deltas applied (0 for a batch_id the
+    snapshot already records).
+    """
+    deltas = []
+    for old, new in changes:
+        if old and new and _facet_values(old) == _facet_values(new):
+            continue
+        if old:
+            deltas.append((old, -1))
+        if new:
+            deltas.append((new, 1))
+    if not deltas:
+        return 0
+
+    for attempt in range(MAX_WRITE_ATTEMPTS):
+        counts, version, batches = _read_snapshot(table_name, consistent=True)
+        if batch_id is not None:
+            if batch_id in batches:
+                print(f"Listing facets for batch {batch_id} already applied, skipping")
+                return 0
+            batches.append(batch_id)
+        try:
+            if counts is None:
+                # First run: the scan already reflects this batch
+                counts = _scan_counts(_ddb.Table(table_name))
+            else:
+                for item, delta in deltas:
+                    apply_item(counts, item, delta)
+            _write_snapshot(table_name, counts, version, batches)
+            return len(deltas)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            print("Listing facet snapshot changed underneath us, retrying", attempt + 1)
+            time.sleep(0.05 * (2 ** attempt))
+
+    raise RuntimeError("Could not update listing facet snapshot after retries")
+
+
+# ---------------------------------------------------
+# FILTERED COUNTS
+# ---------------------------------------------------
+def _count_query(table, filters):
+    """Count over the filters' index, projecting only the facet attributes."""
+    index_name, kwargs = listings.plan_query(filters)
+    kwargs.update(projection_kwargs(list(FACET_FIELDS.values())))
+
+    counts = empty_counts()
+    while True:
+        resp = table.query(**kwargs)
+        for it in resp.get("Items", []):
+            apply_item(counts, it, 1)
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return index_name, counts
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def _count_window(table, filters):
+    """Count the interval index's matches; q needs the listings themselves."""
+    entries = availability.candidates(availability.get_index(table), filters)
+    if not filters.get("q"):
+        return count_items(entries)
+    return _count_fetched(table, entries, filters)
+
+
+def _count_fetched(table, entries, filters):
+    """Count entries whose full listing passes filters (q, window)."""
+    counts = empty_counts()
+    for i in range(0, len(entries), listings.BATCH_GET_LIMIT):
+        chunk = entries[i:i + listings.BATCH_GET_LIMIT]
+        docs = listings.batch_get(table, [e["listingId"] for e in chunk])
+        for doc in docs.values():
+            if listings.matches_filters(doc, filters):
+                apply_item(counts, doc, 1)
+    return counts
+
+
+def facets(table, filters):
+    """Facet response for filters (as parse_filters returns them)."""
+    active = any(v not in (None, "") for v in filters.values())
+    if not active:
+        return to_response(get_counts(table), COUNTS_PLAN)
+    if not listings.indexes_ready(table):
+        return to_response(count_items(listings.scan_matches(table, filters)), listings.SCAN_PLAN)
+    if filters.get("near"):
+        entries = listing_geo.candidates(table, filters)
+        counts = _count_fetched(table, entries, filters) if filters.get("window") else count_items(entries)
+        return to_response(counts, listing_geo.GEO_PLAN)
+    if filters.get("window"):
+        return to_response(_count_window(table, filters), availability.AVAILABILITY_PLAN)
+    index_name, counts = _count_query(table, filters)
+    return to_response(counts, index_name)
@@ -0,0 +1,159 @@
+"""
+Radius search for rent/sell listings (CommonLayer).
+
+    GET /rent/listings?near=Nagpur&radiusKm=50
+    GET /sell/listings?near=400703            (PIN code, or a US ZIP)
+    GET /sell/listings?near=19.07,72.87&sort=price_asc
+
+prepare_listing geocodes each listing's location against the bundled
+gazetteer (geo.geocode) and stores lat/lon plus geohash/geoCell, which
+key GSI_Geo as on the ports table. A radius query reads only the
+geohash cells covering the circle (concurrently, the other filters as a
+FilterExpression, projecting just what ranking needs), keeps listings
+within the exact haversine distance and orders them nearest first (or
+by the requested sort). The page's listings are then fetched with
+BatchGetItem, each with distanceKm.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from boto3.dynamodb.conditions import ConditionExpressionBuilder
+
+import geo
+import listings
+from scan_engine import projection_kwargs
+
+GEO_INDEX = "GSI_Geo"
+GEO_PLAN = GEO_INDEX
+
+DEFAULT_RADIUS_KM = 50
+MAX_RADIUS_KM = 500
+
+# Attributes read per candidate: distance, every sort order, facets
+CANDIDATE_FIELDS = ["listingId", "lat", "lon", "createdAt", listings.PRICE_ATTR,
+                    "size", "condition", "locationLc"]
+
+
+def parse_near(params):
+    """
+    {"lat", "lon", "radiusKm", "near"} from near=&radiusKm=, or None.
+    ValueError when near can't be placed or the radius is out of range.
+    """
+    params = params or {}
+    near = (params.get("near") or "").strip()
+    if not near:
+        return None
+    try:
+        radius_km = float(params.get("radiusKm") or DEFAULT_RADIUS_KM)
+    except ValueError:
+        raise ValueError("radiusKm must be a number")
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        raise ValueError(f"radiusKm must be between 0 and {MAX_RADIUS_KM}")
+    found = geo.geocode(near)
+    if not found:
+        raise ValueError(f"could not place near={near!r}; use a city, PIN/ZIP code or lat,lon")
+    lat, lon, _ = found
+    return {"lat": lat, "lon": lon, "radiusKm": radius_km, "near": near}
+
+
+def _render_filter(filters):
+    """FilterExpression kwargs rendered once: the cell queries run on threads."""
+    cond = listings.attr_filter(filters)
+    if cond is None:
+        return {}
+    built = ConditionExpressionBuilder().build_expression(cond)
+    return {
+        "FilterExpression": built.condition_expression,
+        "ExpressionAttributeNames": built.attribute_name_placeholders,
+        "ExpressionAttributeValues": built.attribute_value_placeholders,
+    }
+
+
+def _query_cell(table, cell, base):
+    """Listings whose geohash starts with cell (one GSI_Geo partition)."""
+    kwargs = dict(base, TableName=table.name, IndexName=GEO_INDEX)
+    names = dict(base.get("ExpressionAttributeNames", {}), **{"#gc": "geoCell", "#gh": "geohash"})
+    values = dict(base.get("ExpressionAttributeValues", {}), **{":gc": cell[:geo.GEO_CELL_PRECISION]})
+    kwargs["KeyConditionExpression"] = "#gc = :gc"
+    if len(cell) > geo.GEO_CELL_PRECISION:
+        kwargs["KeyConditionExpression"] += " AND begins_with(#gh, :gh)"
+        values[":gh"] = cell
+    kwargs["ExpressionAttributeNames"] = names
+    kwargs["ExpressionAttributeValues"] = values
+
+    items, calls = [], 0
+    while True:
+        resp = table.meta.client.query(**kwargs)
+        calls += 1
+        items.extend(resp.get("Items", []))
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return items, calls
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def candidates(table, filters, sort="distance", stats=None):
+    """
+    Projected listings within filters["near"], each with distanceKm, in
+    sort order. The window (rent) is checked later on the full listing.
+    """
+    near = filters["near"]
+    cells = geo.covering_cells(near["lat"], near["lon"], near["radiusKm"])
+    base = _render_filter(filters)
+    proj = projection_kwargs(CANDIDATE_FIELDS)
+    base.setdefault("ExpressionAttributeNames", {}).update(proj.pop("ExpressionAttributeNames"))
+    base.update(proj)
+
+    with ThreadPoolExecutor(max_workers=min(len(cells), geo.MAX_COVER_CELLS)) as pool:
+        results = list(pool.map(lambda c: _query_cell(table, c, base), cells))
+
+    found = []
+    for items, _ in results:
+        for it in items:
+            km = geo.haversine_km(near["lat"], near["lon"], float(it["lat"]), float(it["lon"]))
+            if km <= near["radiusKm"]:
+                it["distanceKm"] = round(km, 1)
+                found.append(it)
+
+    if sort == "distance":
+        found.sort(key=lambda it: (it["distanceKm"], it["listingId"]))
+    else:
+        sort_key, forward = listings.SORT_ORDERS[sort]
+        if sort_key == listings.PRICE_ATTR:
+            found = [it for it in found if it.get(sort_key) is not None]
+        found.sort(key=lambda it: (it.get(sort_key) or 0, it["listingId"]), reverse=not forward)
+    if stats is not None:
+        stats.update(index=f"{GEO_PLAN}[{len(cells)}]", pages=sum(c for _, c in results),
+                     scanned=sum(len(items) for items, _ in results), candidates=len(found))
+    return found
+
+
+def read_page(table, filters, page_size, sort="distance", token=None, stats=None):
+    """
+    One page of listings near filters["near"]: (items, next_token). The
+    token is an offset into the ranking, in the usual envelope.
+    """
+    if not listings.indexes_ready(table):
+        # geo attributes arrive with the backfill
+        return listings.scan_page(table, filters, page_size, sort, token, stats)
+    offset = 0
+    if token:
+        offset = int(listings.decode_token(token, GEO_PLAN, sort)["o"])
+    found = candidates(table, filters, sort, stats)
+
+    items = []
+    pos = offset
+    while pos < len(found) and len(items) < page_size:
+        chunk = found[pos:pos + listings.BATCH_GET_LIMIT]
+        docs = listings.batch_get(table, [c["listingId"] for c in chunk])
+        for c in chunk:
+            pos += 1
+            doc = docs.get(c["listingId"])  # deleted since the cell query
+            if doc and listings.matches_filters(doc, filters):
+                doc["distanceKm"] = c["distanceKm"]
+                items.append(doc)
+                if len(items) >= page_size:
+                    break
+    next_token = None
+    if pos < len(found):
+        next_token = listings.encode_token(GEO_PLAN, sort, {"o": pos})
+    return items, next_token
@@ -0,0 +1,392 @@
+"""
+Inverted full-text index for rent/sell listings (CommonLayer).
+
+Postings live in ListingTermsTable, one item per (term, listing):
+
+    term       "<listings table>#<token>"     partition: every listing using it
+               "<listings table>#~<prefix>"   edge prefixes (3+ chars) of tokens
+    listingId  sort key
+    w          field-weighted term frequency
+    dl         the listing's weighted length
+    createdAt  tie-breaker for equal scores
+
+plus "<listings table>#!stats" holding the doc count and total length
+for BM25. apply_change() keeps postings in step with the listings table
+stream; search() reads only the partitions of the query's terms.
+Posting writes are idempotent; the stats ADD is made so by a marker
+item per stream batch in the same partition, written in one
+transaction with it (BATCH_MARKER_TTL_SECONDS, TTL attribute expiresAt).
+
+Query syntax: plain words (all should match; partial matches rank
+lower), "quoted phrases", and the last word doubles as a prefix while
+it is being typed ("40ft reef" finds reefer).
+"""
+import os
+import re
+import html
+import math
+import time
+import random
+from decimal import Decimal
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+import listings
+
+TERMS_TABLE = os.environ.get("TERMS_TABLE")
+RANKED_PLAN = "TextIndex"
+
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "location": 2.0,
+    "specs": 1.5,
+    "description": 1.0,
+}
+
+PREFIX_MIN = 3
+PREFIX_MAX = 12
+PREFIX_WEIGHT = 0.6        # a prefix hit counts this much of an exact hit
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STATS_TERM = "!stats"
+STATS_SORT_KEY = "!"
+BATCH_MARKER_PREFIX = "!batch#"
+BATCH_MARKER_TTL_SECONDS = 7 * 24 * 3600   # past the stream's 24h retention
+
+MAX_QUERY_TERMS = 8
+QUERY_WORKERS = 8
+FETCH_CHUNK = listings.BATCH_GET_LIMIT
+WRITE_CHUNK = 25           # BatchWriteItem limit
+MAX_ATTEMPTS = 6
+
+SNIPPET_CHARS = 160
+
+_PHRASE_RE = re.compile(r'"([^"]*)"')
+
+
+def _backoff(attempt):
+    time.sleep(0.05 * (2 ** attempt) * (1 + random.random()))
+
+
+# ---------------------------------------------------
+# POSTINGS
+# ---------------------------------------------------
+def postings_for(item):
+    """({term: weight}, doc_length) for a listing, prefix terms included."""
+    weights = defaultdict(float)
+    for field, w in FIELD_WEIGHTS.items():
+        for tok in listings.tokenize(item.get(field)):
+            weights[tok] += w
+    doc_len = sum(weights.values())
+
+    prefixes = {}
+    for tok, w in weights.items():
+        for n in range(PREFIX_MIN, min(len(tok), PREFIX_MAX + 1)):
+            key = "~" + tok[:n]
+            prefixes[key] = max(prefixes.get(key, 0.0), w)
+    weights.update(prefixes)
+    return dict(weights), doc_len
+
+
+def _term_key(table_name, term):
+    return f"{table_name}#{term}"
+
+
+def _posting(table_name, listing_id, term, weight, doc_len, created_at):
+    return {
+        "term": _term_key(table_name, term),
+        "listingId": listing_id,
+        "w": Decimal(str(round(weight, 3))),
+        "dl": Decimal(str(round(doc_len, 3))),
+        "createdAt": created_at or 0,
+    }
+
+
+def diff_postings(table_name, old, new):
+    """
+    (puts, deletes, stats_delta) turning old's postings into new's.
+    old/new are listing images (None for INSERT/REMOVE).
+    """
+    old_p, old_len = postings_for(old) if old else ({}, 0.0)
+    new_p, new_len = postings_for(new) if new else ({}, 0.0)
+    listing_id = (new or old)["listingId"]
+
+    deletes = [{"term": _term_key(table_name, t), "listingId": listing_id}
+               for t in old_p if t not in new_p]
+    rewrite_all = old_len != new_len or (old or {}).get("createdAt") != (new or {}).get("createdAt")
+    puts = [
+        _posting(table_name, listing_id, t, w, new_len, new.get("createdAt"))
+        for t, w in new_p.items()
+        if rewrite_all or old_p.get(t) != w
+    ]
+    stats = {
+        "docs": (1 if new else 0) - (1 if old else 0),
+        "length": new_len - old_len,
+    }
+    return puts, deletes, stats
+
+
+def _write_batch(client, table_name, requests):
+    """BatchWriteItem with UnprocessedItems retry; raises if items never land."""
+    for attempt in range(MAX_ATTEMPTS):
+        resp = client.batch_write_item(RequestItems={table_name: requests})
+        requests = (resp.get("UnprocessedItems") or {}).get(table_name, [])
+        if not requests:
+            return
+        _backoff(attempt)
+    raise RuntimeError(f"{len(requests)} posting writes unprocessed after retries")
+
+
+def apply_change(terms_table, table_name, changes, batch_id=None):
+    """
+    Apply (old_image, new_image) pairs for one listings table. Later
+    changes to the same (term, listing) win; stats are bumped once, and
+    only once per batch_id (the stream records' sequence numbers) when
+    the batch is retried.
+    """
+    ops = {}
+    docs = 0
+    length = 0.0
+    for old, new in changes:
+        puts, deletes, stats = diff_postings(table_name, old, new)
+        for key in deletes:
+            ops[(key["term"], key["listingId"])] = {"DeleteRequest": {"Key": key}}
+        for item in puts:
+            ops[(item["term"], item["listingId"])] = {"PutRequest": {"Item": item}}
+        docs += stats["docs"]
+        length += stats["length"]
+
+    requests = list(ops.values())
+    client = terms_table.meta.client
+    for i in range(0, len(requests), WRITE_CHUNK):
+        _write_batch(client, terms_table.name, requests[i:i + WRITE_CHUNK])
+
+    if docs or length:
+        stats_key = {"term": _term_key(table_name, STATS_TERM), "listingId": STATS_SORT_KEY}
+        update = {
+            "Key": stats_key,
+            "UpdateExpression": "ADD docs :d, #len :l",
+            "ExpressionAttributeNames": {"#len": "length"},
+            "ExpressionAttributeValues": {":d": docs, ":l": Decimal(str(round(length, 3)))},
+        }
+        if batch_id is None:
+            terms_table.update_item(**update)
+        else:
+            _bump_stats_once(client, terms_table.name, stats_key["term"], batch_id, update)
+    return len(requests)
+
+
+def _bump_stats_once(client, terms_table_name, stats_term, batch_id, update):
+    """The stats update plus its batch marker; a no-op if the marker exists."""
+    marker = {
+        "term": stats_term,
+        "listingId": f"{BATCH_MARKER_PREFIX}{batch_id}",
+        "expiresAt": int(time.time()) + BATCH_MARKER_TTL_SECONDS,
+    }
+    try:
+        client.transact_write_items(TransactItems=[
+            {"Put": {"TableName": terms_table_name, "Item": marker,
+                     "ConditionExpression": "attribute_not_exists(listingId)"}},
+            {"Update": {"TableName": terms_table_name, **update}},
+        ])
+    except client.exceptions.TransactionCanceledException as e:
+        reasons = e.response.get("CancellationReasons") or []
+        if not reasons or reasons[0].get("Code") != "ConditionalCheckFailed":
+            raise
+        print(f"Listing stats for batch {batch_id} already applied, skipping")
+
+
+# ---------------------------------------------------
+# QUERY
+# ---------------------------------------------------
+def parse_query(q):
+    """
+    (tokens, phrases, prefix_token): tokens in order without repeats,
+    phrases as normalised strings, and the trailing token when it may
+    still be a prefix (unquoted, no trailing space, long enough).
+    """
+    raw = q or ""
+    phrases = [listings.normalize_text(p) for p in _PHRASE_RE.findall(raw)]
+    phrases = [p for p in phrases if p]
+    rest = _PHRASE_RE.sub(" ", raw)
+
+    tokens = []
+    for tok in listings.tokenize(rest) + [t for p in phrases for t in listings.tokenize(p)]:
+        if tok not in tokens:
+            tokens.append(tok)
+    tokens = tokens[:MAX_QUERY_TERMS]
+
+    rest_tokens = listings.tokenize(rest)
+    prefix = None
+    if (rest_tokens and not raw.endswith((" ", '"')) and rest.rstrip() == rest
+            and PREFIX_MIN <= len(rest_tokens[-1]) <= PREFIX_MAX):
+        prefix = rest_tokens[-1]
+    return tokens, phrases, prefix
+
+
+def _read_postings(client, terms_table_name, term_key):
+    kwargs = {
+        "TableName": terms_table_name,
+        "KeyConditionExpression": "#t = :t",
+        "ExpressionAttributeNames": {"#t": "term"},
+        "ExpressionAttributeValues": {":t": term_key},
+    }
+    out = []
+    while True:
+        resp = client.query(**kwargs)
+        out.extend(resp.get("Items", []))
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return out
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def _read_stats(terms_table, table_name):
+    resp = terms_table.get_item(
+        Key={"term": _term_key(table_name, STATS_TERM), "listingId": STATS_SORT_KEY})
+    item = resp.get("Item") or {}
+    docs = max(int(item.get("docs", 0)), 1)
+    return docs, float(item.get("length", 0)) / docs or 1.0
+
+
+def rank(terms_table, table_name, tokens, prefix=None, stats=None):
+    """
+    [(listingId, score, createdAt)] best first. One partition read per
+    query token (two for the prefix token), concurrently.
+    """
+    if not tokens:
+        return []
+    reads = [(tok, tok) for tok in tokens]
+    if prefix:
+        reads.append((prefix, "~" + prefix))
+
+    client = terms_table.meta.client
+    with ThreadPoolExecutor(max_workers=min(len(reads), QUERY_WORKERS)) as pool:
+        results = list(pool.map(
+            lambda r: _read_postings(client, terms_table.name, _term_key(table_name, r[1])), reads))
+    n_docs, avg_len = _read_stats(terms_table, table_name)
+    if stats is not None:
+        # same keys as listings.read_page: calls made, rows read
+        stats.update(pages=len(reads), scanned=sum(len(r) for r in results))
+
+    best = defaultdict(dict)   # listingId -> {token: score}
+    created = {}
+    for (tok, term), postings in zip(reads, results):
+        if not postings:
+            continue
+        df = len(postings)
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        factor = PREFIX_WEIGHT if term.startswith("~") else 1.0
+        for p in postings:
+            tf = float(p["w"])
+            norm = 1 - BM25_B + BM25_B * float(p["dl"]) / avg_len
+            s = factor * idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+            lid = p["listingId"]
+            if s > best[lid].get(tok, 0.0):
+                best[lid][tok] = s
+            created[lid] = int(p.get("createdAt") or 0)
+
+    # Listings matching every query word outrank partial matches
+    n = len(tokens)
+    scored = [(lid, sum(hits.values()) * len(hits) / n, created[lid]) for lid, hits in best.items()]
+    scored.sort(key=lambda r: (-r[1], -r[2], r[0]))
+    return scored
+
+
+def _matches_filters(item, filters, phrases):
+    # q itself is what was ranked; only its quoted phrases must appear verbatim
+    if not listings.matches_filters(item, dict(filters, q="")):
+        return False
+    text = item.get("searchText") or "\n".join(
+        listings.normalize_text(item.get(f)) for f in listings.TEXT_FIELDS)
+    return all(p in text for p in phrases)
+
+
+# ---------------------------------------------------
+# HIGHLIGHTS
+# ---------------------------------------------------
+def _highlight_pattern(tokens, prefix, phrases):
+    alts = [re.escape(p).replace(r"\ ", r"\s+") for p in sorted(phrases, key=len, reverse=True)]
+    alts += [re.escape(t) + r"(?![a-z0-9])" for t in tokens]
+    if prefix:
+        alts.append(re.escape(prefix) + r"[a-z0-9]*")
+    return re.compile(r"(?<![a-z0-9])(?:" + "|".join(alts) + ")", re.IGNORECASE)
+
+
+def highlights(item, pattern):
+    """{field: html snippet with <mark> around matches} for fields that match."""
+    out = {}
+    for field in listings.TEXT_FIELDS:
+        text = item.get(field)
+        if not isinstance(text, str):
+            continue
+        matches = list(pattern.finditer(text))
+        if not matches:
+            continue
+        start = 0
+        end = len(text)
+        if len(text) > SNIPPET_CHARS:
+            start = max(0, matches[0].start() - SNIPPET_CHARS // 3)
+            end = min(len(text), start + SNIPPET_CHARS)
+        parts, pos = [], start
+        for m in matches:
+            if m.start() < pos or m.end() > end:
+                continue
+            parts.append(html.escape(text[pos:m.start()]))
+            parts.append("<mark>" + html.escape(m.group(0)) + "</mark>")
+            pos = m.end()
+        parts.append(html.escape(text[pos:end]))
+        out[field] = ("…" if start else "") + "".join(parts) + ("…" if end < len(text) else "")
+    return out
+
+
+def search(table, terms_table, q, filters, page_size, offset=0, stats=None):
+    """
+    One page of ranked listings for q, each with "score" and
+    "highlights". Structured filters and phrases are checked on the
+    fetched listings. Returns (items, next_offset or None).
+    """
+    tokens, phrases, prefix = parse_query(q)
+    ranked = rank(terms_table, table.name, tokens, prefix, stats)
+    pattern = _highlight_pattern(tokens, prefix, phrases)
+
+    # Walk the ranking in BatchGet-sized chunks until the page fills.
+    # Offsets count ranked candidates, so filtered-out ones are skipped
+    # for good and a page may come back short.
+    items = []
+    pos = offset
+    while pos < len(ranked) and len(items) < page_size:
+        chunk = ranked[pos:pos + FETCH_CHUNK]
+        docs = listings.batch_get(table, [lid for lid, _, _ in chunk])
+        for lid, score, _ in chunk:
+            pos += 1
+            doc = docs.get(lid)  # postings can briefly outlive a deleted listing
+            if doc and _matches_filters(doc, filters, phrases):
+                doc["score"] = round(score, 4)
+                doc["highlights"] = highlights(doc, pattern)
+                items.append(doc)
+                if len(items) >= page_size:
+                    break
+    if stats is not None:
+        stats.update(candidates=len(ranked))
+    return items, (pos if pos < len(ranked) else None)
+
+
+def read_ranked_page(table, q, filters, page_size, token=None, stats=None):
+    """
+    ?sort=relevance page for the list handlers: (items, next_token).
+    The cursor is an offset into the ranking, in the usual token envelope.
+    """
+    offset = 0
+    if token:
+        offset = int(listings.decode_token(token, RANKED_PLAN, "relevance")["o"])
+    terms_table = boto3.resource("dynamodb").Table(TERMS_TABLE)
+    items, next_offset = search(table, terms_table, q, filters, page_size, offset, stats)
+    next_token = None
+    if next_offset is not None:
+        next_token = listings.encode_token(RANKED_PLAN, "relevance", {"o": next_offset})
+    return items, next_token
@@ -0,0 +1,595 @@
+"""
+Listing search shared by the rent and sell list handlers (CommonLayer).
+
+Both listing tables carry the same GSIs, one set sorted by createdAt
+and one by priceNum (the listing's price as a number):
+
+    GSI_Size            size      / createdAt
+    GSI_Condition       condition / createdAt
+    GSI_Recent          entity    / createdAt   (entity = "LISTING" on every row)
+    GSI_SizePrice       size      / priceNum
+    GSI_ConditionPrice  condition / priceNum
+    GSI_Price           entity    / priceNum
+
+The sort picks the index family and the most selective exact filter the
+index within it; the other exact filter and the q/location text tests
+ride along as a FilterExpression. With no exact filter GSI_Recent /
+GSI_Price cover every listing. minPrice/maxPrice become a range key
+condition on the price indexes and a FilterExpression on the others.
+
+Text tests run against attributes normalised once at write time
+(prepare_listing): searchText, locationLc and the searchTokens set.
+
+read_page() serves ?pageSize=&nextToken=&sort=newest|oldest|price_asc|price_desc with a
+bounded number of reads per call (with a Scan instead until
+backfill_listings.py has run over the table, see indexes_ready);
+sort=relevance is answered from the
+full-text index (listing_text.py), rent availability windows from the
+interval index (availability.py).
+"""
+import os
+import re
+import time
+import uuid
+import random
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+import geo
+# also used as listings.encode_token/decode_token by the other access paths
+from tokens import encode_token, decode_token
+from scan_engine import scan_items
+
+ENTITY = "LISTING"
+
+# GSI key attributes: DynamoDB rejects empty strings/NULLs here, so such
+# values are left off the item (it just stays out of that index)
+INDEX_KEY_FIELDS = ["size", "condition", "entity", "createdAt", "priceNum", "geoCell", "geohash"]
+
+# Numeric copy of the price field (sell: price, rent: dailyRate; set per
+# function through PRICE_FIELD). Listings without a usable price stay
+# out of the price indexes.
+PRICE_ATTR = "priceNum"
+PRICE_FIELD = os.environ.get("PRICE_FIELD", "price")
+
+# sort key -> (exact-match parameter -> index, in order of preference;
+# index covering every listing)
+INDEXES = {
+    "createdAt": ([("size", "GSI_Size"), ("condition", "GSI_Condition")], "GSI_Recent"),
+    PRICE_ATTR: ([("size", "GSI_SizePrice"), ("condition", "GSI_ConditionPrice")], "GSI_Price"),
+}
+
+TEXT_FIELDS = ["title", "description", "specs", "location"]
+
+# Bump when normalize_text/tokenize or the derived attributes change;
+# backfill_listings.py rewrites every row stored with an older version
+# (2: priceNum, 3: geocoded location, 4: 5-digit ZIPs only in a US context)
+SEARCH_VERSION = 4
+SEARCH_FIELDS = ["searchText", "locationLc", "searchTokens", "searchVersion"]
+
+# The GSIs only hold rows written at SEARCH_VERSION (GSI_Recent needs
+# entity), so a table is searched through them once backfill_listings.py
+# has finished over it and left this marker in the meta table. Until
+# then read_page scans (SCAN_PLAN); a missing marker is re-read at most
+# every BACKFILL_CHECK_SECONDS.
+META_TABLE = os.environ.get("META_TABLE")
+SCAN_PLAN = "Scan"
+BACKFILL_CHECK_SECONDS = 60
+_backfill = {}   # table name -> (ready, checked_at)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Written from location by prepare_listing (GSI_Geo: geoCell / geohash)
+GEO_FIELDS = ["lat", "lon", "geohash", "geoCell"]
+
+_INTERNAL_FIELDS = frozenset(SEARCH_FIELDS + ["entity", PRICE_ATTR, "geohash", "geoCell"])
+
+# sort -> (index sort key, ScanIndexForward)
+SORT_ORDERS = {
+    "newest": ("createdAt", False),
+    "oldest": ("createdAt", True),
+    "price_asc": (PRICE_ATTR, True),
+    "price_desc": (PRICE_ATTR, False),
+}
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# Query calls one page may spend topping up a filtered result
+MAX_CALLS_PER_PAGE = 5
+
+BATCH_GET_LIMIT = 100
+MAX_ATTEMPTS = 6
+
+# Fields a listing is built from (create_listing, bulk import), per kind
+LISTING_FIELDS = ["title", "size", "condition", "location", "description",
+                  "specs", "images", "video"]
+KIND_FIELDS = {
+    "rent": ["dailyRate", "availabilityFrom", "availabilityTo"],
+    "sell": ["price", "availabilityFrom"],
+}
+KIND_PRICE_FIELD = {"rent": "dailyRate", "sell": "price"}
+
+# Rent availability window, ISO dates; a missing end is open-ended
+AVAILABILITY_FIELDS = ("availabilityFrom", "availabilityTo")
+OPEN_START = "0000-01-01"
+OPEN_END = "9999-12-31"
+
+
+
+def index_safe(item):
+    """
+    Copy of a listing ready for put_item: entity set, string index keys
+    stored as strings, empty index keys dropped.
+    """
+    out = dict(item)
+    out.setdefault("entity", ENTITY)
+    for f in ("size", "condition"):
+        if isinstance(out.get(f), (int, float, Decimal)):
+            out[f] = str(out[f])
+        elif isinstance(out.get(f), str):
+            out[f] = out[f].strip()
+    for f in INDEX_KEY_FIELDS:
+        if out.get(f) is None or out.get(f) == "":
+            out.pop(f, None)
+    return out
+
+
+def normalize_text(value):
+    """Lower-case, whitespace-collapsed text; numbers are stringified."""
+    if isinstance(value, (int, float, Decimal)):
+        value = str(value)
+    if not isinstance(value, str):
+        return ""
+    return " ".join(value.split()).casefold()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize_text(text))
+
+
+def search_fields(item):
+    """
+    Normalised search attributes for a listing:
+      searchText    TEXT_FIELDS joined by newlines (q substring match)
+      locationLc    location alone (location filter)
+      searchTokens  distinct tokens of searchText (omitted when empty)
+    """
+    parts = [normalize_text(item.get(f)) for f in TEXT_FIELDS]
+    out = {
+        "searchText": "\n".join(parts),
+        "locationLc": normalize_text(item.get("location")),
+        "searchVersion": SEARCH_VERSION,
+    }
+    tokens = {t for part in parts for t in _TOKEN_RE.findall(part)}
+    if tokens:
+        out["searchTokens"] = tokens
+    return out
+
+
+def price_number(value):
+    """
+    Non-negative Decimal for a price as clients send it (number or text
+    like "1,250.00" / "$90"); None when there is no usable number.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        value = str(value)
+    if isinstance(value, str):
+        value = value.strip().lstrip("$").replace(",", "").strip()
+        try:
+            value = Decimal(value) if value else None
+        except InvalidOperation:
+            return None
+    if not isinstance(value, Decimal) or not value.is_finite() or value < 0:
+        return None
+    return value
+
+
+def geo_fields(location):
+    """lat/lon/geohash/geoCell for a location string ({} if it can't be placed)."""
+    found = geo.geocode(location)
+    if not found:
+        return {}
+    lat, lon, _ = found
+    cell = geo.geohash_encode(lat, lon)
+    return {
+        "lat": Decimal(str(round(lat, 6))),
+        "lon": Decimal(str(round(lon, 6))),
+        "geohash": cell,
+        "geoCell": cell[:geo.GEO_CELL_PRECISION],
+    }
+
+
+def prepare_listing(item, price_field=None):
+    """
+    What create/import store: index-safe keys, the numeric price
+    (priceNum, from price_field or PRICE_FIELD), the geocoded location
+    and the search attributes.
+    """
+    out = {k: v for k, v in item.items() if k not in GEO_FIELDS}
+    out.update(geo_fields(out.get("location")))
+    out[PRICE_ATTR] = price_number(out.get(price_field or PRICE_FIELD))
+    out = index_safe(out)
+    for f in SEARCH_FIELDS:
+        out.pop(f, None)
+    out.update(search_fields(out))
+    return out
+
+
+def parse_date(value, name="date"):
+    """ISO "YYYY-MM-DD" for a date string (a time part is ignored); None if empty."""
+    if value is None or str(value).strip() == "":
+        return None
+    try:
+        return date.fromisoformat(str(value).strip()[:10]).isoformat()
+    except ValueError:
+        raise ValueError(f"{name} must be a YYYY-MM-DD date")
+
+
+def listing_window(item):
+    """(start, end) a listing is available for; unparseable bounds are open."""
+    bounds = []
+    for field, default in zip(AVAILABILITY_FIELDS, (OPEN_START, OPEN_END)):
+        try:
+            bounds.append(parse_date(item.get(field)) or default)
+        except ValueError:
+            bounds.append(default)
+    return bounds[0], bounds[1]
+
+
+def build_listing(body, kind, listing_id=None, created_at=None):
+    """
+    New listing from client fields, as create_listing and the bulk import
+    store it (before prepare_listing). Unknown fields are dropped; the
+    price must be a number and dates YYYY-MM-DD (ValueError otherwise).
+    """
+    listing = {
+        "listingId": listing_id or str(uuid.uuid4()),
+        **{f: body.get(f) for f in LISTING_FIELDS + KIND_FIELDS[kind]},
+        "createdAt": created_at or int(time.time()),
+    }
+    listing["images"] = listing["images"] or []
+
+    price_field = KIND_PRICE_FIELD[kind]
+    raw_price = listing.get(price_field)
+    if raw_price is not None and str(raw_price).strip() != "":
+        listing[price_field] = price_number(raw_price)
+        if listing[price_field] is None:
+            raise ValueError(f"{price_field} must be a non-negative number")
+
+    for field in AVAILABILITY_FIELDS:
+        if field in listing:
+            listing[field] = parse_date(listing[field], field)
+    if listing.get("availabilityFrom") and listing.get("availabilityTo") \
+            and listing["availabilityTo"] < listing["availabilityFrom"]:
+        raise ValueError("availabilityTo must not be before availabilityFrom")
+    return listing
+
+
+def public_view(item):
+    """A listing without the internal index/search attributes."""
+    return {k: v for k, v in item.items() if k not in _INTERNAL_FIELDS}
+
+
+def _price_param(params, name):
+    raw = params.get(name)
+    if raw is None or str(raw).strip() == "":
+        return None
+    value = price_number(raw)
+    if value is None:
+        raise ValueError(f"{name} must be a non-negative number")
+    return value
+
+
+def parse_filters(params):
+    """Filters from query params; ValueError on a bad minPrice/maxPrice."""
+    params = params or {}
+    filters = {
+        "q": normalize_text(params.get("q")),
+        "size": params.get("size") or "",
+        "condition": params.get("condition") or "",
+        "location": normalize_text(params.get("location")),
+        "minPrice": _price_param(params, "minPrice"),
+        "maxPrice": _price_param(params, "maxPrice"),
+    }
+    if (filters["minPrice"] is not None and filters["maxPrice"] is not None
+            and filters["minPrice"] > filters["maxPrice"]):
+        raise ValueError("minPrice must not exceed maxPrice")
+    return filters
+
+
+def attr_filter(filters):
+    """
+    Attr condition for every non-window filter (or None), for access
+    paths that pick their own key condition.
+    """
+    conds = [Attr(f).eq(filters[f]) for f in ("size", "condition") if filters.get(f)]
+    if filters.get("q"):
+        conds.append(Attr("searchText").contains(filters["q"]))
+    if filters.get("location"):
+        conds.append(Attr("locationLc").contains(filters["location"]))
+    price = _price_range(Attr, filters.get("minPrice"), filters.get("maxPrice"))
+    if price is not None:
+        conds.append(price)
+    if not conds:
+        return None
+    expr = conds[0]
+    for cond in conds[1:]:
+        expr = expr & cond
+    return expr
+
+
+def matches_filters(item, filters):
+    """In-memory equivalent of plan_query's conditions (plus the window)."""
+    for f in ("size", "condition"):
+        if filters.get(f) and item.get(f) != filters[f]:
+            return False
+    if filters.get("location") and filters["location"] not in (
+            item.get("locationLc") or normalize_text(item.get("location"))):
+        return False
+    if filters.get("q") and filters["q"] not in (
+            item.get("searchText") or "\n".join(normalize_text(item.get(f)) for f in TEXT_FIELDS)):
+        return False
+    price = item.get(PRICE_ATTR)
+    lo, hi = filters.get("minPrice"), filters.get("maxPrice")
+    if (lo is not None or hi is not None) and (
+            price is None or (lo is not None and price < lo) or (hi is not None and price > hi)):
+        return False
+    window = filters.get("window")
+    if window:
+        start, end = listing_window(item)
+        if start > window[1] or end < window[0]:
+            return False
+    near = filters.get("near")
+    if near:
+        if item.get("lat") is None or item.get("lon") is None:
+            return False
+        if geo.haversine_km(near["lat"], near["lon"], float(item["lat"]),
+                            float(item["lon"])) > near["radiusKm"]:
+            return False
+    return True
+
+
+def batch_get(table, ids):
+    """{listingId: item} for up to BATCH_GET_LIMIT ids (missing ones absent)."""
+    client = table.meta.client
+    request = {"Keys": [{"listingId": i} for i in ids]}
+    found = {}
+    for attempt in range(MAX_ATTEMPTS):
+        resp = client.batch_get_item(RequestItems={table.name: request})
+        for it in resp.get("Responses", {}).get(table.name, []):
+            found[it["listingId"]] = it
+        pending = (resp.get("UnprocessedKeys") or {}).get(table.name)
+        if not pending:
+            break
+        request = pending
+        time.sleep(0.05 * (2 ** attempt) * (1 + random.random()))
+    return found
+
+
+def _price_range(cls, lo, hi):
+    """Key/Attr condition for lo <= priceNum <= hi (either may be None)."""
+    field = cls(PRICE_ATTR)
+    if lo is not None and hi is not None:
+        return field.between(lo, hi)
+    if lo is not None:
+        return field.gte(lo)
+    if hi is not None:
+        return field.lte(hi)
+    return None
+
+
+def plan_query(filters, sort="newest"):
+    """
+    Query kwargs for the filters' access path in the given sort order.
+    Returns (index_name, kwargs).
+    """
+    sort_key, forward = SORT_ORDERS[sort]
+    exact_indexes, index_name = INDEXES[sort_key]
+    key_condition = None
+    residual = []
+
+    for param, index in exact_indexes:
+        value = filters.get(param)
+        if not value:
+            continue
+        if key_condition is None:
+            index_name = index
+            key_condition = Key(param).eq(value)
+        else:
+            residual.append(Attr(param).eq(value))
+
+    # Text filters against the write-time normalised attributes
+    if filters.get("q"):
+        residual.append(Attr("searchText").contains(filters["q"]))
+    if filters.get("location"):
+        residual.append(Attr("locationLc").contains(filters["location"]))
+
+    if key_condition is None:
+        key_condition = Key("entity").eq(ENTITY)
+
+    # Price range: on the price indexes it narrows the key range itself
+    lo, hi = filters.get("minPrice"), filters.get("maxPrice")
+    if sort_key == PRICE_ATTR:
+        price_key = _price_range(Key, lo, hi)
+        if price_key is not None:
+            key_condition = key_condition & price_key
+    else:
+        price_filter = _price_range(Attr, lo, hi)
+        if price_filter is not None:
+            residual.append(price_filter)
+
+    kwargs = {
+        "IndexName": index_name,
+        "KeyConditionExpression": key_condition,
+        "ScanIndexForward": forward,
+    }
+    if residual:
+        expr = residual[0]
+        for cond in residual[1:]:
+            expr = expr & cond
+        kwargs["FilterExpression"] = expr
+    return index_name, kwargs
+
+
+def query_listings(table, filters, sort="newest", stats=None):
+    """
+    Generator over listings matching filters, in sort order.
+    stats (optional dict) receives index/pages/scanned counts.
+    """
+    index_name, kwargs = plan_query(filters, sort)
+    if stats is not None:
+        stats.update(index=index_name, pages=0, scanned=0)
+
+    while True:
+        resp = table.query(**kwargs)
+        if stats is not None:
+            stats["pages"] += 1
+            stats["scanned"] += resp.get("ScannedCount", 0)
+        yield from resp.get("Items", [])
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+# ---------------------------------------------------
+# PAGINATION
+# ---------------------------------------------------
+def parse_page_params(params):
+    """(page_size, sort, token) from query params; ValueError on bad input."""
+    params = params or {}
+    try:
+        page_size = int(params.get("pageSize") or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        raise ValueError("pageSize must be a number")
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+
+    # near= results come nearest first unless another order is asked for
+    sort = (params.get("sort") or ("distance" if params.get("near") else "newest")).lower()
+    if sort not in SORT_ORDERS and sort not in ("relevance", "distance"):
+        raise ValueError(f"sort must be one of {', '.join(SORT_ORDERS)}, relevance, distance")
+    if sort == "relevance" and not (params.get("q") or "").strip():
+        raise ValueError("sort=relevance needs q")
+    if sort == "distance" and not (params.get("near") or "").strip():
+        raise ValueError("sort=distance needs near")
+    return page_size, sort, params.get("nextToken") or None
+
+
+def read_page(table, filters, page_size, sort="newest", token=None, stats=None):
+    """
+    One page of matching listings in sort order.
+    Returns (items, next_token); next_token is None after the last page.
+
+    Each Query's Limit is what the page still needs, so a page never
+    reads more rows than it could return. Filtered pages top up with
+    further calls, at most MAX_CALLS_PER_PAGE, and may then be short
+    (with a token).
+    """
+    if not indexes_ready(table):
+        return scan_page(table, filters, page_size, sort, token, stats)
+    index_name, kwargs = plan_query(filters, sort)
+    if token:
+        kwargs["ExclusiveStartKey"] = decode_token(token, index_name, sort)
+    if stats is not None:
+        stats.update(index=index_name, pages=0, scanned=0)
+
+    items = []
+    last_key = None
+    for _ in range(MAX_CALLS_PER_PAGE):
+        kwargs["Limit"] = page_size - len(items)
+        resp = table.query(**kwargs)
+        if stats is not None:
+            stats["pages"] += 1
+            stats["scanned"] += resp.get("ScannedCount", 0)
+        items.extend(resp.get("Items", []))
+
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key or len(items) >= page_size:
+            break
+        kwargs["ExclusiveStartKey"] = last_key
+
+    next_token = encode_token(index_name, sort, last_key) if last_key else None
+    return items, next_token
+
+
+# ---------------------------------------------------
+# BEFORE THE BACKFILL
+# ---------------------------------------------------
+def backfill_id(table_name):
+    return f"LISTINGS#{table_name}#backfill"
+
+
+def indexes_ready(table):
+    """
+    True once backfill_listings.py has brought every row of table to
+    SEARCH_VERSION. Without a meta table there is no marker to wait for.
+    """
+    if not META_TABLE:
+        return True
+    cached = _backfill.get(table.name)
+    now = time.time()
+    if cached and (cached[0] or now - cached[1] < BACKFILL_CHECK_SECONDS):
+        return cached[0]
+    try:
+        item = table.meta.client.get_item(
+            TableName=META_TABLE, Key={"id": backfill_id(table.name)}).get("Item")
+        ready = bool(item) and int(item.get("searchVersion", 0)) >= SEARCH_VERSION
+    except ClientError as e:
+        print("Listing backfill marker read failed", e)
+        ready = False
+    if not ready:
+        print(f"{table.name}: backfill to search version {SEARCH_VERSION} not finished, scanning")
+    _backfill[table.name] = (ready, now)
+    return ready
+
+
+def scan_matches(table, filters, stats=None):
+    """
+    Every listing passing filters, read with a Scan and prepared in memory
+    as the backfill will store it (so rows it hasn't reached yet match
+    too). Near searches get distanceKm; stats counts the rows read.
+    """
+    near = filters.get("near")
+    found = []
+    for item in scan_items(table):
+        if stats is not None:
+            stats["scanned"] += 1
+        it = prepare_listing(item)
+        if not matches_filters(it, filters):
+            continue
+        if near:
+            it["distanceKm"] = round(geo.haversine_km(
+                near["lat"], near["lon"], float(it["lat"]), float(it["lon"])), 1)
+        found.append(it)
+    return found
+
+
+def scan_page(table, filters, page_size, sort="newest", token=None, stats=None):
+    """
+    read_page's answer from scan_matches, sorted in memory; the token is
+    an offset into the sorted matches, in the usual envelope.
+    """
+    offset = 0
+    if token:
+        offset = int(decode_token(token, SCAN_PLAN, sort)["o"])
+    read = {"scanned": 0}
+    found = scan_matches(table, filters, read)
+    if sort == "distance":
+        found.sort(key=lambda it: (it["distanceKm"], it["listingId"]))
+    else:
+        sort_key, forward = SORT_ORDERS[sort]
+        if sort_key == PRICE_ATTR:
+            found = [it for it in found if it.get(sort_key) is not None]
+        found.sort(key=lambda it: (it.get(sort_key) or 0, it["listingId"]), reverse=not forward)
+
+    items = found[offset:offset + page_size]
+    if stats is not None:
+        stats.update(index=SCAN_PLAN, pages=1, scanned=read["scanned"], candidates=len(found))
+    next_token = None
+    if offset + page_size < len(found):
+        next_token = encode_token(SCAN_PLAN, sort, {"o": offset + page_size})
+    return items, next_token
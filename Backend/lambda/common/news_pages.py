@@ -0,0 +1,69 @@
+"""
+Pages of the news table, latest first (CommonLayer).
+
+    pk "NEWS"        every article, ts time-ordered (news_fetcher/news_items.py)
+    pk "TAG#<tag>"   a copy per tag
+    GSI_Source       sourceKey + ts, the NEWS rows only
+
+GET /news reads a page per request; the fetcher reads the first pages
+after each ingest and publishes them as static snapshots. Both use
+read_page, so a snapshot's nextToken continues through GET /news.
+"""
+from boto3.dynamodb.conditions import Key, Attr
+
+from tokens import encode_token, decode_token
+
+NEWS_PK = "NEWS"
+TAG_PK_PREFIX = "TAG#"
+SOURCE_INDEX = "GSI_Source"
+TOKEN_SORT = "newest"
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 100
+# Query calls one page may spend topping up a filtered (source + tag) page
+MAX_CALLS_PER_PAGE = 5
+
+# Row keys and bookkeeping, not article data (ts and articleId are also
+# beyond JavaScript's safe integer range)
+_INTERNAL_FIELDS = frozenset(["pk", "ts", "sourceKey", "articleId", "contentHash"])
+
+
+def plan(source="", tag=""):
+    """(plan name, query kwargs): newest first from one partition."""
+    if source:
+        kwargs = {"IndexName": SOURCE_INDEX, "KeyConditionExpression": Key("sourceKey").eq(source)}
+        if tag:
+            kwargs["FilterExpression"] = Attr("tags").contains(tag)
+        return f"{SOURCE_INDEX}#{source}#{tag or ''}", kwargs
+    if tag:
+        pk = f"{TAG_PK_PREFIX}{tag}"
+        return pk, {"KeyConditionExpression": Key("pk").eq(pk)}
+    return NEWS_PK, {"KeyConditionExpression": Key("pk").eq(NEWS_PK)}
+
+
+def public_view(item):
+    """An article without the table's key and bookkeeping attributes."""
+    return {k: v for k, v in item.items() if k not in _INTERNAL_FIELDS}
+
+
+def read_page(table, source="", tag="", limit=DEFAULT_LIMIT, token=None):
+    """(public items, next_token); ValueError for a token from other filters."""
+    name, kwargs = plan(source, tag)
+    kwargs.update(ScanIndexForward=False, Limit=limit)
+    if token:
+        kwargs["ExclusiveStartKey"] = decode_token(token, name, TOKEN_SORT)
+
+    # A filtered (source + tag) page can come back short: keep reading,
+    # within MAX_CALLS_PER_PAGE (then the page is short, with a token)
+    items = []
+    for _ in range(MAX_CALLS_PER_PAGE):
+        resp = table.query(**kwargs)
+        items.extend(resp.get("Items", []))
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key or len(items) >= limit:
+            break
+        kwargs["ExclusiveStartKey"] = last_key
+        kwargs["Limit"] = limit - len(items)
+
+    next_token = encode_token(name, TOKEN_SORT, last_key) if last_key else None
+    return [public_view(it) for it in items], next_token
@@ -0,0 +1,100 @@
+"""
+API Gateway responses shared by the Python lambdas (CommonLayer).
+
+    return json_response({"items": items})
+    return json_response(item, headers={"Cache-Control": "max-age=60"})
+    return error_response("Not found", 404)
+
+dumps() writes DynamoDB values (Decimal, sets, Binary/bytes) straight
+from the encoder's default hook, so a result tree is serialised in one
+pass instead of first being copied through a recursive converter.
+
+orjson is a layer dependency (requirements.txt) and is the fast path
+(scripts/bench_responses.py: ~3-4x the old converters). The standard
+library encoder is only a fallback for running the code outside the
+layer; it is no faster than the old float-only converters.
+
+CORS: every response allows any origin. Access-Control-Allow-Headers is
+only sent by handlers that pass allow_headers (ports: Content-Type,
+price: *), as each did before.
+"""
+import json
+import base64
+from decimal import Decimal
+
+from boto3.dynamodb.types import Binary
+
+try:
+    import orjson
+except ImportError:  # outside the layer (local scripts)
+    orjson = None
+    print("orjson not installed; responses use the slower stdlib JSON encoder")
+
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+}
+
+
+def _default(obj):
+    """Encoder hook for the types boto3 hands back from DynamoDB."""
+    if isinstance(obj, Decimal):
+        # Whole numbers stay ints (ids, timestamps, counts)
+        if obj == obj.to_integral_value():
+            return int(obj)
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Binary):
+        obj = obj.value
+    if isinstance(obj, (bytes, bytearray)):
+        try:
+            return obj.decode("utf-8")
+        except UnicodeDecodeError:
+            return base64.b64encode(obj).decode("ascii")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _std_dumps(obj):
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False)
+
+
+def dumps(obj):
+    """JSON text for obj, DynamoDB types included."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            # orjson.JSONEncodeError: e.g. ints beyond 64 bits
+            pass
+    return _std_dumps(obj)
+
+
+def cors_headers(methods=None, expose=None, allow_headers=None):
+    headers = dict(CORS_HEADERS)
+    if allow_headers:
+        headers["Access-Control-Allow-Headers"] = allow_headers
+    if methods:
+        headers["Access-Control-Allow-Methods"] = methods
+    if expose:
+        headers["Access-Control-Expose-Headers"] = expose
+    return headers
+
+
+def json_response(body, status=200, headers=None, methods=None, expose=None, allow_headers=None):
+    """Lambda proxy response: JSON body plus CORS and any extra headers."""
+    resp_headers = {"Content-Type": "application/json"}
+    resp_headers.update(cors_headers(methods, expose, allow_headers))
+    if headers:
+        resp_headers.update(headers)
+    return {
+        "statusCode": status,
+        "headers": resp_headers,
+        "body": dumps(body),
+    }
+
+
+def error_response(message, status=400, key="error", **extra):
+    """{"error": message} (or another key) with the usual headers."""
+    body = {key: message}
+    body.update(extra)
+    return json_response(body, status)
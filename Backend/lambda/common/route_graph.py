@@ -0,0 +1,230 @@
+"""
+Multi-leg routes composed from the onload/offload rate cards (CommonLayer).
+
+Every rate card item is an edge: "<origin>-><destination>" (or explicit
+origin/destination attributes) with its price and transit_days. When a
+price table changes, RouteGraphFunction runs Dijkstra from every node,
+once by price and once by transit time, and stores the winning paths of
+two or more legs in the meta table, one row per origin:
+
+    id      "ROUTES#<table>#<origin>"
+    paths   {destination: [path, ...]}   path: {"kind", "currency",
+            "price", "transit_days", "legs": [{"route", "carrier", ...}]}
+    version build this row belongs to
+
+and the build's manifest at "ROUTES#<table>" (origins, version). A
+/prices lookup is then one (cached) GetItem of the origin's row.
+
+Legs are only composed within one currency. Direct routes stay with the
+rate card itself, so a path appears here only when it has several legs.
+"""
+import os
+import json
+import time
+import heapq
+import logging
+from decimal import Decimal
+
+import boto3
+
+from responses import dumps
+
+logger = logging.getLogger()
+
+META_TABLE = os.environ.get("META_TABLE")
+VERSION_ROUTE = "#version"     # rate card version stamp (see price/rate_cards.py)
+ROUTE_SEPARATOR = "->"
+
+# kind -> weight of an edge; tuples compare lexicographically, so ties
+# fall to the next component and then to fewer legs
+KINDS = {
+    "cheapest": lambda e: (e["price"], e["transit_days"] or 0),
+    "fastest": lambda e: (e["transit_days"], e["price"]),
+}
+
+MAX_ROW_BYTES = 350_000        # DynamoDB items stop at 400 KB
+CACHE_TTL_SECONDS = int(os.environ.get("ROUTE_GRAPH_TTL_SECONDS", "60"))
+
+_ddb = boto3.resource("dynamodb")
+_cache = {}   # (table name, origin) -> (paths, loaded_at)
+
+
+def _manifest_id(table_name):
+    return f"ROUTES#{table_name}"
+
+
+def _row_id(table_name, origin):
+    return f"ROUTES#{table_name}#{origin}"
+
+
+def _node(value):
+    return " ".join(str(value or "").lower().split())
+
+
+# ---------------------------------------------------
+# GRAPH
+# ---------------------------------------------------
+def edge(item):
+    """Rate card item -> edge dict, or None when it can't be one."""
+    route = item.get("route")
+    if not route or route == VERSION_ROUTE:
+        return None
+    origin, destination = item.get("origin"), item.get("destination")
+    if not (origin and destination):
+        if ROUTE_SEPARATOR not in route:
+            return None
+        origin, destination = route.split(ROUTE_SEPARATOR, 1)
+    origin, destination = _node(origin), _node(destination)
+    price = item.get("price")
+    if not origin or not destination or origin == destination or not isinstance(price, (int, Decimal)):
+        return None
+    transit = item.get("transit_days")
+    return {
+        "origin": origin,
+        "destination": destination,
+        "route": route,
+        "carrier": item.get("carrier", "Carrier"),
+        "vehicle_type": item.get("vehicle_type", "Truck"),
+        "price": price,
+        "currency": item.get("currency", "INR"),
+        "transit_days": transit if isinstance(transit, (int, Decimal)) else None,
+    }
+
+
+def _dijkstra(adjacency, source, weight):
+    """{node: (cost, legs)} of the lightest path from source to each node."""
+    best = {source: ((), [])}
+    heap = [((), 0, 0, source)]   # cost, leg count, tiebreak counter, node
+    counter = 0
+    done = set()
+    while heap:
+        cost, _, _, node = heapq.heappop(heap)
+        if node in done:
+            continue
+        done.add(node)
+        for e in adjacency.get(node, ()):
+            w = weight(e)
+            new_cost = tuple(a + b for a, b in zip(cost, w)) if cost else w
+            legs = best[node][1] + [e]
+            target = e["destination"]
+            if target not in best or (new_cost, len(legs)) < (best[target][0], len(best[target][1])):
+                best[target] = (new_cost, legs)
+                counter += 1
+                heapq.heappush(heap, (new_cost, len(legs), counter, target))
+    best.pop(source)
+    return best
+
+
+def _path(kind, legs):
+    transit = [e["transit_days"] for e in legs]
+    return {
+        "kind": [kind],
+        "currency": legs[0]["currency"],
+        "price": sum(e["price"] for e in legs),
+        "transit_days": None if None in transit else sum(transit),
+        "legs": [{k: e[k] for k in ("route", "carrier", "vehicle_type", "price", "transit_days")}
+                 for e in legs],
+    }
+
+
+def build_matrix(items):
+    """
+    {origin: {destination: [paths]}} of the cheapest and fastest paths
+    with two or more legs. A path that wins both appears once.
+    """
+    by_currency = {}
+    for item in items:
+        e = edge(item)
+        if e:
+            by_currency.setdefault(e["currency"], []).append(e)
+
+    matrix = {}
+    for currency, edges in by_currency.items():
+        adjacency = {}
+        for e in edges:
+            adjacency.setdefault(e["origin"], []).append(e)
+        for kind, weight in KINDS.items():
+            usable = adjacency
+            if kind == "fastest":
+                usable = {n: [e for e in es if e["transit_days"] is not None]
+                          for n, es in adjacency.items()}
+            for source in usable:
+                for target, (_, legs) in _dijkstra(usable, source, weight).items():
+                    if len(legs) < 2:
+                        continue
+                    paths = matrix.setdefault(source, {}).setdefault(target, [])
+                    routes = [e["route"] for e in legs]
+                    same = next((p for p in paths if [l["route"] for l in p["legs"]] == routes), None)
+                    if same:
+                        same["kind"].append(kind)
+                    else:
+                        paths.append(_path(kind, legs))
+    return matrix
+
+
+# ---------------------------------------------------
+# STORAGE
+# ---------------------------------------------------
+def _row_paths(origin, destinations):
+    """JSON for one origin row, dropping the priciest destinations past MAX_ROW_BYTES."""
+    text = dumps(destinations)
+    if len(text.encode()) <= MAX_ROW_BYTES:
+        return text
+    ranked = sorted(destinations.items(), key=lambda kv: min(p["price"] for p in kv[1]))
+    kept, size = {}, 2
+    for dest, paths in ranked:
+        entry = len(dumps({dest: paths}).encode())
+        if size + entry > MAX_ROW_BYTES:
+            break
+        kept[dest] = paths
+        size += entry
+    logger.warning("Route graph row %s trimmed to %d of %d destinations", origin, len(kept), len(destinations))
+    return dumps(kept)
+
+
+def store(table_name, matrix):
+    """Write one build's rows, then its manifest; drop origins that lost their paths."""
+    meta = _ddb.Table(META_TABLE)
+    version = int(time.time() * 1000)
+    old = meta.get_item(Key={"id": _manifest_id(table_name)}, ConsistentRead=True).get("Item") or {}
+    stale = set(old.get("origins") or []) - set(matrix)
+
+    with meta.batch_writer() as batch:
+        for origin, destinations in matrix.items():
+            batch.put_item(Item={
+                "id": _row_id(table_name, origin),
+                "paths": _row_paths(origin, destinations),
+                "version": version,
+            })
+        for origin in stale:
+            batch.delete_item(Key={"id": _row_id(table_name, origin)})
+    meta.put_item(Item={
+        "id": _manifest_id(table_name),
+        "origins": sorted(matrix),
+        "version": version,
+        "builtAt": int(time.time()),
+    })
+    return version
+
+
+# ---------------------------------------------------
+# LOOKUP
+# ---------------------------------------------------
+def _origin_paths(table_name, origin):
+    key = (table_name, origin)
+    cached = _cache.get(key)
+    now = time.time()
+    if cached and now - cached[1] < CACHE_TTL_SECONDS:
+        return cached[0]
+    item = _ddb.Table(META_TABLE).get_item(Key={"id": _row_id(table_name, origin)}).get("Item")
+    paths = json.loads(item["paths"]) if item else {}
+    _cache[key] = (paths, now)
+    return paths
+
+
+def composed(table_name, route):
+    """Stored multi-leg paths for a "<origin>-><destination>" route ([] without META_TABLE)."""
+    if not META_TABLE or ROUTE_SEPARATOR not in route:
+        return []
+    origin, destination = (_node(p) for p in route.split(ROUTE_SEPARATOR, 1))
+    return _origin_paths(table_name, origin).get(destination, [])
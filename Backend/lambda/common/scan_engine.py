@@ -0,0 +1,177 @@
+"""
+Parallel segmented Scan shared by the Python lambdas (CommonLayer).
+
+    for item in ParallelScan(table, projection=["id", "name"], limit=500):
+        ...
+
+Each Segment of TotalSegments is read by its own worker thread; pages
+are handed to the caller through a small bounded queue, so items stream
+out as they arrive instead of being collected into one list. Reaching
+`limit` (or closing the generator) stops every segment.
+"""
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+
+DEFAULT_SEGMENTS = int(os.environ.get("SCAN_SEGMENTS", "4"))
+
+# Pages buffered per segment before workers wait for the consumer
+QUEUE_PAGES_PER_SEGMENT = 2
+
+_DONE = object()
+
+
+def projection_kwargs(projection):
+    """
+    ProjectionExpression with "#p" placeholders. boto3 names its own
+    Filter/KeyCondition placeholders "#n0.." and overwrites same-named
+    entries, so projections must not use that prefix.
+    """
+    if not projection:
+        return {}
+    field_list = sorted(set(projection))
+    ean = {f"#p{i}": name for i, name in enumerate(field_list)}
+    return {
+        "ProjectionExpression": ", ".join(ean.keys()),
+        "ExpressionAttributeNames": ean,
+    }
+
+
+class ParallelScan:
+    """
+    Iterable over every item of `table` matching `filter_expression`.
+
+    segments:   TotalSegments (1 behaves like a plain paginated scan)
+    projection: attribute names to return
+    limit:      soft cap on items yielded; all segments stop once reached
+    page_size:  Limit per Scan call
+    extra:      any other Scan parameters (ConsistentRead, IndexName, ...)
+
+    After iterating, .stats holds one dict per segment:
+      {"segment", "pages", "items", "scanned", "seconds"}
+    (complete once summary() has waited for the segments to stop).
+    """
+
+    def __init__(self, table, segments=None, filter_expression=None,
+                 projection=None, limit=None, page_size=None, **extra):
+        self.table = table
+        self.segments = max(1, segments or DEFAULT_SEGMENTS)
+        self.limit = limit
+        self.stats = []
+        self._pool = None
+
+        kwargs = projection_kwargs(projection)
+        if isinstance(filter_expression, ConditionBase):
+            # Render once up front: the client's own condition builder is
+            # shared state and not safe to drive from several threads.
+            built = ConditionExpressionBuilder().build_expression(filter_expression)
+            kwargs["FilterExpression"] = built.condition_expression
+            kwargs.setdefault("ExpressionAttributeNames", {}).update(
+                built.attribute_name_placeholders)
+            kwargs["ExpressionAttributeValues"] = built.attribute_value_placeholders
+        elif filter_expression is not None:
+            kwargs["FilterExpression"] = filter_expression
+        if page_size:
+            kwargs["Limit"] = page_size
+        kwargs.update(extra)
+        self._kwargs = kwargs
+
+    def _worker(self, segment, out, stop):
+        stat = {"segment": segment, "pages": 0, "items": 0, "scanned": 0, "seconds": 0.0}
+        t0 = time.perf_counter()
+        try:
+            # Resource tables aren't thread-safe; their client is (and still
+            # applies the resource-level type/condition transforms).
+            client = self.table.meta.client
+            kwargs = dict(self._kwargs, TableName=self.table.name)
+            for key in ("ExpressionAttributeNames", "ExpressionAttributeValues"):
+                if key in kwargs:  # boto3 updates these in place
+                    kwargs[key] = dict(kwargs[key])
+            if self.segments > 1:
+                kwargs["Segment"] = segment
+                kwargs["TotalSegments"] = self.segments
+
+            while not stop.is_set():
+                resp = client.scan(**kwargs)
+                batch = resp.get("Items", [])
+                stat["pages"] += 1
+                stat["items"] += len(batch)
+                stat["scanned"] += resp.get("ScannedCount", len(batch))
+                if batch:
+                    self._put(out, stop, batch)
+
+                last_key = resp.get("LastEvaluatedKey")
+                if not last_key:
+                    break
+                kwargs["ExclusiveStartKey"] = last_key
+        except Exception as e:  # surfaced to the consumer
+            self._put(out, stop, e)
+        finally:
+            stat["seconds"] = round(time.perf_counter() - t0, 4)
+            self.stats.append(stat)
+            self._put(out, stop, _DONE)
+
+    @staticmethod
+    def _put(out, stop, value):
+        while True:
+            try:
+                out.put(value, timeout=0.1)
+                return
+            except queue.Full:
+                if stop.is_set():
+                    return
+
+    def __iter__(self):
+        self.stats = []
+        out = queue.Queue(maxsize=self.segments * QUEUE_PAGES_PER_SEGMENT)
+        stop = threading.Event()
+        pool = self._pool = ThreadPoolExecutor(max_workers=self.segments)
+        for seg in range(self.segments):
+            pool.submit(self._worker, seg, out, stop)
+
+        done = 0
+        yielded = 0
+        try:
+            while done < self.segments:
+                value = out.get()
+                if value is _DONE:
+                    done += 1
+                    continue
+                if isinstance(value, Exception):
+                    raise value
+                for item in value:
+                    yield item
+                    yielded += 1
+                    if self.limit and yielded >= self.limit:
+                        return
+        finally:
+            # Segments still mid-call finish in the background; the
+            # caller gets its items without waiting for them
+            stop.set()
+            pool.shutdown(wait=False)
+
+    def summary(self):
+        """
+        One-line metrics string for the logs. Waits for segments stopped
+        early by limit to finish their last call, so the stats are whole.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        total_items = sum(s["items"] for s in self.stats)
+        total_scanned = sum(s["scanned"] for s in self.stats)
+        slowest = max((s["seconds"] for s in self.stats), default=0)
+        per_seg = " ".join(
+            f"[{s['segment']}:{s['pages']}p/{s['items']}i/{s['seconds']}s]"
+            for s in sorted(self.stats, key=lambda s: s["segment"])
+        )
+        return (f"scan {self.table.name}: {total_items} items "
+                f"({total_scanned} scanned) in {slowest}s {per_seg}")
+
+
+def scan_items(table, **kwargs):
+    """Generator shorthand for ParallelScan(table, **kwargs)."""
+    return iter(ParallelScan(table, **kwargs))
@@ -0,0 +1,38 @@
+"""
+Opaque nextToken cursors for paged DynamoDB reads (CommonLayer).
+
+    token = encode_token("GSI_Recent", "newest", resp["LastEvaluatedKey"])
+    kwargs["ExclusiveStartKey"] = decode_token(token, "GSI_Recent", "newest")
+
+A token is base64url JSON of the plan (index or partition) and sort
+order it was issued for plus the typed key, so a token replayed against
+other filters is rejected rather than silently skipping rows. Offset
+cursors use the same envelope with {"o": n} as the key.
+"""
+import json
+import base64
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def encode_token(index_name, sort, last_evaluated_key):
+    """Opaque cursor: the index and order it belongs to plus the typed key."""
+    key = {k: _serializer.serialize(v) for k, v in last_evaluated_key.items()}
+    raw = json.dumps({"i": index_name, "o": sort, "k": key}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_token(token, index_name, sort):
+    """ExclusiveStartKey for token; ValueError if it is malformed or stale."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key = {k: _deserializer.deserialize(v) for k, v in data["k"].items()}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise ValueError("invalid nextToken")
+    if data.get("i") != index_name or data.get("o") != sort:
+        raise ValueError("nextToken does not match these filters")
+    return key
@@ -1,4 +1,5 @@
 import os, json, boto3
+from responses import json_response
 
 ses = boto3.client('ses')
 TO_EMAIL = os.environ.get('TO_EMAIL', 'you@example.com')
@@ -18,6 +19,6 @@ def lambda_handler(event, context):
             Destination={'ToAddresses':[TO_EMAIL]},
             Message={'Subject': {'Data': subj}, 'Body': {'Text': {'Data': text}}}
         )
-        return {'statusCode': 200, 'headers': {"Content-Type":"application/json"}, 'body': json.dumps({'ok':True})}
+        return json_response({'ok':True})
     except Exception as e:
-        return {'statusCode': 500, 'headers': {"Content-Type":"application/json"}, 'body': json.dumps({'ok':False,'error':str(e)})}
+        return json_response({'ok':False,'error':str(e)}, 500)
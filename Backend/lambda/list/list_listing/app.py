@@ -3,8 +3,13 @@ import os
 import json
 import time
 import boto3
-from decimal import Decimal
-from typing import Any
+
+import listings
+import listing_text
+import availability
+import listing_facets
+import listing_geo
+from responses import json_response
 
 print("⚡ Lambda cold start - modules loaded")
 
@@ -21,53 +26,6 @@ table = dynamodb.Table(TABLE_NAME)
 def now_ts():
     return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
 
-def _convert_decimals(obj: Any) -> Any:
-    """
-    Recursively convert Decimal, set, bytes -> JSON-safe types.
-    """
-    if isinstance(obj, Decimal):
-        # return int when no fractional part, else float
-        try:
-            if obj % 1 == 0:
-                return int(obj)
-        except Exception:
-            pass
-        return float(obj)
-    if isinstance(obj, dict):
-        return {k: _convert_decimals(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [_convert_decimals(i) for i in obj]
-    if isinstance(obj, set):
-        return [_convert_decimals(i) for i in list(obj)]
-    if isinstance(obj, bytes):
-        try:
-            return obj.decode("utf-8")
-        except Exception:
-            return str(obj)
-    return obj
-
-# ---------- scan with pagination ----------
-def _scan_all(table):
-    print(f"{now_ts()} 📡 Start scanning table '{TABLE_NAME}'")
-    items = []
-    kwargs = {}
-    page = 0
-    while True:
-        page += 1
-        print(f"{now_ts()} 🔍 Calling scan() page={page} kwargs_keys={list(kwargs.keys())}")
-        resp = table.scan(**kwargs)
-        batch = resp.get("Items", [])
-        print(f"{now_ts()} 📦 Received {len(batch)} items in page {page}")
-        items.extend(batch)
-        if "LastEvaluatedKey" in resp:
-            print(f"{now_ts()} ➡️ LastEvaluatedKey present, continuing to next page")
-            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
-        else:
-            print(f"{now_ts()} ✅ No LastEvaluatedKey — scan complete after {page} pages")
-            break
-    print(f"{now_ts()} 📊 Total items retrieved: {len(items)}")
-    return items
-
 # ---------- main handler ----------
 def handler(event, context):
     start = time.time()
@@ -82,76 +40,50 @@ def handler(event, context):
         print(f"{now_ts()} ❌ Failed to read queryStringParameters: {e}")
         params = {}
 
-    q = (params.get("q") or "").lower()
-    size = params.get("size") or ""
-    condition = params.get("condition") or ""
-    location = params.get("location") or ""
-
-    print(f"{now_ts()} 🔎 Filters parsed -> q='{q}', size='{size}', condition='{condition}', location='{location}'")
-
-    # fetch items
     try:
-        items = _scan_all(table)
-    except Exception as e:
-        print(f"{now_ts()} ❌ Error scanning DynamoDB: {e}")
-        body = {"error": "Failed to read table", "message": str(e)}
-        return {
-            "statusCode": 500,
-            "headers": {"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"},
-            "body": json.dumps(body)
-        }
-
-    # filtering
-    print(f"{now_ts()} 🔎 Starting filtering of {len(items)} items")
-    def match(it):
-        def g(k):
-            try:
-                v = it.get(k) or ""
-                # Decimal/number -> str for search
-                if isinstance(v, (int, float, Decimal)):
-                    v = str(v)
-                return (v or "").lower()
-            except Exception:
-                return ""
-        ok = True
-        if q:
-            ok = q in g("title") or q in g("description") or q in g("specs") or q in g("location")
-        if size and ok:
-            ok = (it.get("size") == size)
-        if condition and ok:
-            ok = (it.get("condition") == condition)
-        if location and ok:
-            ok = (location.lower() in g("location"))
-        return ok
-
+        filters = listings.parse_filters(params)
+        filters["window"] = availability.parse_window(params)
+        filters["near"] = listing_geo.parse_near(params)
+        page_size, sort, token = listings.parse_page_params(params)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+    print(f"{now_ts()} 🔎 Filters parsed -> {filters} sort={sort} pageSize={page_size}")
+
+    # GET /rent/listings/facets: counts for the same filters
+    if (event.get("resource") or event.get("path") or "").endswith("/facets"):
+        try:
+            body = listing_facets.facets(table, filters)
+        except Exception as e:
+            print(f"{now_ts()} ❌ Error counting facets: {e}")
+            return json_response({"error": "Failed to count facets", "message": str(e)}, 500)
+        print(f"{now_ts()} 📊 Facets via {body['plan']}: total={body['total']}")
+        return json_response(body)
+
+    # fetch one bounded page from the listings GSIs (CommonLayer)
+    stats = {}
     try:
-        filtered = list(filter(match, items))
-        print(f"{now_ts()} 🎯 Filtering complete. Matched {len(filtered)} items")
+        if sort == "relevance":
+            page, next_token = listing_text.read_ranked_page(
+                table, params.get("q"), filters, page_size, token, stats=stats)
+            stats["index"] = listing_text.RANKED_PLAN
+        elif filters["near"]:
+            page, next_token = listing_geo.read_page(table, filters, page_size, sort, token, stats=stats)
+        elif filters["window"]:
+            page, next_token = availability.read_page(table, filters, page_size, sort, token, stats=stats)
+        else:
+            page, next_token = listings.read_page(table, filters, page_size, sort, token, stats=stats)
+        print(f"{now_ts()} 🎯 {stats['index']}: {len(page)} items "
+              f"({stats['scanned']} read in {stats['pages']} calls), more={bool(next_token)}")
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
     except Exception as e:
-        print(f"{now_ts()} ❌ Error during filtering: {e}")
-        filtered = []
+        print(f"{now_ts()} ❌ Error querying DynamoDB: {e}")
+        body = {"error": "Failed to read table", "message": str(e)}
+        return json_response(body, 500)
 
-    # convert decimals and other Dynamo types to JSON-safe values
-    print(f"{now_ts()} 🔄 Converting DynamoDB types to JSON-safe types")
-    try:
-        safe_filtered = [_convert_decimals(item) for item in filtered]
-        print(f"{now_ts()} ✅ Conversion complete")
-    except Exception as e:
-        print(f"{now_ts()} ❌ Error during conversion: {e}")
-        # fallback: try to stringify
-        try:
-            safe_filtered = [json.loads(json.dumps(item, default=str)) for item in filtered]
-            print(f"{now_ts()} ⚠️ Fallback conversion via default=str succeeded")
-        except Exception as e2:
-            print(f"{now_ts()} ❌ Fallback conversion failed: {e2}")
-            safe_filtered = []
+    # Decimals/sets are encoded directly by the shared encoder (CommonLayer)
+    response = json_response({"items": [listings.public_view(it) for it in page], "nextToken": next_token})
 
-    # prepare and return response
     duration_ms = int((time.time() - start) * 1000)
     print(f"{now_ts()} 📤 Returning response. duration_ms={duration_ms}")
-
-    return {
-        "statusCode": 200,
-        "headers": {"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"},
-        "body": json.dumps({"items": safe_filtered})
-    }
+    return response
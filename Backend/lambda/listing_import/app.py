@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import uuid
+
+import boto3
+from botocore.exceptions import ClientError
+
+import jobs
+from responses import json_response, error_response
+
+# Bulk listing import API (rent and sell):
+#
+#   POST /{rent|sell}/listings/import           {"filename": "stock.csv"}
+#        -> {"jobId", "uploadUrl", ...}; PUT the file to uploadUrl, then
+#   POST /{rent|sell}/listings/import/{jobId}   start the import (202);
+#        again on a failed (or stale) job to resume from its checkpoint
+#   GET  /{rent|sell}/listings/import/{jobId}   progress + row errors
+#
+# The rows are parsed and written by ListingImportWorkerFunction, invoked
+# asynchronously, so a file of thousands of listings is one job.
+
+WORKER_FUNCTION = os.environ.get("WORKER_FUNCTION")
+UPLOAD_URL_SECONDS = 3600
+
+s3 = boto3.client("s3")
+lambda_client = boto3.client("lambda")
+
+METHODS = "GET,POST,OPTIONS"
+
+
+def _kind(event):
+    path = event.get("resource") or event.get("path") or ""
+    return "sell" if path.startswith("/sell/") else "rent"
+
+
+def create_job(kind, body):
+    filename = os.path.basename(str(body.get("filename") or "").strip())
+    fmt = jobs.FORMATS.get(os.path.splitext(filename)[1].lower())
+    if not fmt:
+        return error_response(f"filename must end in one of {', '.join(jobs.FORMATS)}", 400)
+
+    job_id = str(uuid.uuid4())
+    bucket = jobs.TARGETS[kind]["bucket"]
+    key = f"imports/{job_id}/{filename}"
+    content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    now = int(time.time())
+    job = {
+        **jobs.job_key(job_id),
+        "kind": kind,
+        "bucket": bucket,
+        "key": key,
+        "format": fmt,
+        "status": "awaiting_upload",
+        "rows": 0,
+        "imported": 0,
+        "failed": 0,
+        "errors": [],
+        "createdAt": now,
+        "updatedAt": now,
+    }
+    jobs.put_job(job)
+    url = s3.generate_presigned_url(
+        "put_object",
+        Params={"Bucket": bucket, "Key": key, "ContentType": content_type},
+        ExpiresIn=UPLOAD_URL_SECONDS,
+    )
+    out = jobs.public_job(job)
+    out.update(uploadUrl=url, contentType=content_type)
+    return json_response(out, 201, methods=METHODS)
+
+
+def start_job(kind, job_id):
+    job = jobs.get_job(job_id, consistent=True)
+    if not job or job["kind"] != kind:
+        return error_response("Import job not found", 404)
+    try:
+        s3.head_object(Bucket=job["bucket"], Key=job["key"])
+    except ClientError:
+        return error_response("Upload the file to uploadUrl before starting the import", 409)
+    status = job["status"]
+    updated_before = None
+    if jobs.is_stale(job):
+        updated_before = time.time() - jobs.STALE_AFTER_SECONDS
+    elif status not in ("awaiting_upload", "failed"):
+        return error_response(f"Import job is already {status}", 409)
+    if not jobs.transition(job_id, status, "queued", updated_before=updated_before):
+        return error_response("Import job changed while starting; check its status", 409)
+
+    lambda_client.invoke(
+        FunctionName=WORKER_FUNCTION,
+        InvocationType="Event",
+        Payload=json.dumps({"jobId": job_id}).encode(),
+    )
+    job.update(status="queued", updatedAt=int(time.time()))
+    return json_response(jobs.public_job(job), 202, methods=METHODS)
+
+
+def job_status(kind, job_id):
+    job = jobs.get_job(job_id)
+    if not job or job["kind"] != kind:
+        return error_response("Import job not found", 404)
+    out = jobs.public_job(job)
+    if job.get("errorReportKey"):
+        out["errorReportUrl"] = s3.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": job["bucket"], "Key": job["errorReportKey"]},
+            ExpiresIn=UPLOAD_URL_SECONDS,
+        )
+    return json_response(out, methods=METHODS)
+
+
+def handler(event, context):
+    method = event.get("httpMethod") or "GET"
+    if method == "OPTIONS":
+        return json_response({}, methods=METHODS)
+
+    kind = _kind(event)
+    job_id = (event.get("pathParameters") or {}).get("jobId")
+    try:
+        if not job_id and method == "POST":
+            try:
+                body = json.loads(event.get("body") or "{}")
+            except json.JSONDecodeError:
+                return error_response("Invalid JSON body", 400)
+            return create_job(kind, body)
+        if job_id and method == "POST":
+            return start_job(kind, job_id)
+        if job_id:
+            return job_status(kind, job_id)
+        return error_response("Unsupported route", 405)
+    except Exception as e:
+        print(f"❌ Import API error: {e}")
+        return error_response("Import request failed", 500, message=str(e))
@@ -0,0 +1,108 @@
+import os
+import time
+
+import boto3
+
+# Bulk listing import jobs, one MetaTable item each:
+#
+#   id            "IMPORT#<jobId>"
+#   kind          rent | sell
+#   bucket/key    the uploaded CSV or JSONL file
+#   format        csv | jsonl
+#   status        awaiting_upload -> queued -> running -> done | failed
+#                 (running -> queued again at each worker checkpoint)
+#   rows/imported/failed      progress counters, updated while running
+#   errors        first MAX_REPORTED_ERRORS [{"row", "error"}]
+#   errorReportKey  S3 key of the full JSONL error report (if any errors)
+#   checkpoint    counters and error report upload state as of the last
+#                 rows fully written; a restarted worker resumes there
+
+META_TABLE = os.environ.get("META_TABLE")
+
+# Per kind: listings table and media bucket the upload lands in
+TARGETS = {
+    "rent": {"table": os.environ.get("RENT_TABLE"), "bucket": os.environ.get("RENT_BUCKET")},
+    "sell": {"table": os.environ.get("SELL_TABLE"), "bucket": os.environ.get("SELL_BUCKET")},
+}
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+MAX_REPORTED_ERRORS = 200
+
+# A queued or running job not updated for this long has lost its worker
+# (a running worker writes progress every few seconds); it reads as
+# failed and can be started again
+STALE_AFTER_SECONDS = 300
+
+_meta = boto3.resource("dynamodb").Table(META_TABLE) if META_TABLE else None
+
+
+def job_key(job_id):
+    return {"id": f"IMPORT#{job_id}"}
+
+
+def get_job(job_id, consistent=False):
+    resp = _meta.get_item(Key=job_key(job_id), ConsistentRead=consistent)
+    return resp.get("Item")
+
+
+def put_job(job):
+    _meta.put_item(Item=job)
+
+
+def is_stale(job):
+    return (job.get("status") in ("queued", "running")
+            and time.time() - int(job.get("updatedAt") or 0) > STALE_AFTER_SECONDS)
+
+
+def transition(job_id, from_status, to_status, updated_before=None, **fields):
+    """
+    Move a job between statuses (conditional, so a job only starts once).
+    updated_before additionally requires updatedAt to be older (stale).
+    Returns False if the job did not match.
+    """
+    names = {"#s": "status"}
+    values = {":from": from_status, ":to": to_status, ":now": int(time.time())}
+    condition = "#s = :from"
+    if updated_before is not None:
+        condition += " AND updatedAt < :before"
+        values[":before"] = int(updated_before)
+    sets = ["#s = :to", "updatedAt = :now"]
+    for i, (k, v) in enumerate(fields.items()):
+        names[f"#f{i}"] = k
+        values[f":f{i}"] = v
+        sets.append(f"#f{i} = :f{i}")
+    try:
+        _meta.update_item(
+            Key=job_key(job_id),
+            UpdateExpression="SET " + ", ".join(sets),
+            ConditionExpression=condition,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+        )
+        return True
+    except _meta.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+
+
+def update_job(job_id, **fields):
+    names, values, sets = {}, {":now": int(time.time())}, ["updatedAt = :now"]
+    for i, (k, v) in enumerate(fields.items()):
+        names[f"#f{i}"] = k
+        values[f":f{i}"] = v
+        sets.append(f"#f{i} = :f{i}")
+    kwargs = {"ExpressionAttributeNames": names} if names else {}
+    _meta.update_item(
+        Key=job_key(job_id),
+        UpdateExpression="SET " + ", ".join(sets),
+        ExpressionAttributeValues=values,
+        **kwargs,
+    )
+
+
+def public_job(job):
+    """Job as the API returns it (a stale job reads as failed)."""
+    out = {k: v for k, v in job.items() if k not in ("id", "bucket", "checkpoint")}
+    out["jobId"] = job["id"].split("#", 1)[1]
+    if is_stale(job):
+        out.update(status="failed", failure="import worker stopped; start the job again to resume")
+    return out
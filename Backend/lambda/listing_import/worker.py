@@ -0,0 +1,313 @@
+import io
+import csv
+import json
+import time
+import uuid
+import codecs
+import random
+import itertools
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+import jobs
+import listings
+
+# Runs one bulk import job (async-invoked by app.start_job with {"jobId"}).
+#
+# The uploaded file is read as a stream, row by row. Each row goes
+# through the same build_listing/prepare_listing as create_listing. Valid
+# rows are written in BatchWriteItem chunks of 25, several in flight at
+# once, and unprocessed items are retried with backoff. listingIds derive
+# from the job and row number, so a rerun overwrites rather than duplicates.
+#
+# One invocation stops reading CHECKPOINT_MARGIN_MS before its deadline,
+# drains its writes and saves a checkpoint (rows handled, counters, error
+# report state) on the job, which goes back to queued; it then invokes
+# itself and the next invocation skips the rows already handled.
+
+WRITE_CHUNK = 25             # BatchWriteItem limit
+WRITE_WORKERS = 8
+MAX_IN_FLIGHT = WRITE_WORKERS * 2
+MAX_ATTEMPTS = 8
+PROGRESS_EVERY_SECONDS = 2.0
+# Time left to drain in-flight writes and checkpoint before the timeout
+CHECKPOINT_MARGIN_MS = 60_000
+# Error report upload part size (S3's minimum for all but the last part)
+REPORT_PART_BYTES = 5 * 1024 * 1024
+
+# Required on every imported row (create_listing itself requires nothing)
+REQUIRED_FIELDS = ["title", "location"]
+
+# CSV cells holding lists: "a.jpg|b.jpg"
+LIST_FIELDS = {"images"}
+LIST_SEPARATOR = "|"
+
+_ddb = boto3.resource("dynamodb")
+_s3 = boto3.client("s3")
+_lambda = boto3.client("lambda")
+
+
+def _backoff(attempt):
+    time.sleep(min(2.0, 0.05 * (2 ** attempt)) * (1 + random.random()))
+
+
+# ---------------------------------------------------
+# PARSING
+# ---------------------------------------------------
+def _rows(body, fmt):
+    """(row_number, dict or ValueError) for each data row of the stream."""
+    reader = codecs.getreader("utf-8-sig")(body)
+    if fmt == "csv":
+        for n, row in enumerate(csv.DictReader(reader), start=2):  # line 1 is the header
+            if None in row:
+                yield n, ValueError("more cells than header columns")
+                continue
+            yield n, {k.strip(): _csv_value(k.strip(), v) for k, v in row.items() if k}
+        return
+
+    for n, line in enumerate(reader, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line, parse_float=Decimal)
+        except ValueError as e:
+            yield n, ValueError(f"invalid JSON: {e}")
+            continue
+        if not isinstance(row, dict):
+            yield n, ValueError("each line must be a JSON object")
+            continue
+        yield n, row
+
+
+def _csv_value(field, value):
+    value = (value or "").strip()
+    if field in LIST_FIELDS:
+        return [v.strip() for v in value.split(LIST_SEPARATOR) if v.strip()]
+    return value or None
+
+
+def to_listing(row, kind, job_id, row_number, created_at):
+    """Validated, prepared listing for one row; ValueError describes a bad row."""
+    missing = [f for f in REQUIRED_FIELDS if not str(row.get(f) or "").strip()]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    images = row.get("images")
+    if images is not None and not (isinstance(images, list) and all(isinstance(i, str) for i in images)):
+        raise ValueError("images must be a list of URLs")
+
+    listing_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"import:{job_id}:{row_number}"))
+    listing = listings.build_listing(row, kind, listing_id=listing_id, created_at=created_at)
+    return listings.prepare_listing(listing, listings.KIND_PRICE_FIELD[kind])
+
+
+# ---------------------------------------------------
+# WRITING
+# ---------------------------------------------------
+def _write_chunk(table_name, chunk):
+    """
+    BatchWriteItem one chunk of (row_number, item) with retries.
+    Returns [(row_number, error)] for items that never landed.
+    """
+    client = _ddb.meta.client
+    pending = {item["listingId"]: n for n, item in chunk}
+    requests = [{"PutRequest": {"Item": item}} for _, item in chunk]
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            resp = client.batch_write_item(RequestItems={table_name: requests})
+        except client.exceptions.ProvisionedThroughputExceededException:
+            _backoff(attempt)
+            continue
+        requests = (resp.get("UnprocessedItems") or {}).get(table_name, [])
+        if not requests:
+            return []
+        _backoff(attempt)
+    return [(pending[r["PutRequest"]["Item"]["listingId"]], "write throttled, not stored")
+            for r in requests]
+
+
+class _Report:
+    """
+    The full JSONL error report, streamed to S3 as a multipart upload in
+    REPORT_PART_BYTES parts. At a checkpoint the unsent tail (less than
+    a part) is parked in a pending object the next invocation reads back.
+    """
+
+    def __init__(self, bucket, key, state=None):
+        state = state or {}
+        self.bucket = bucket
+        self.key = key
+        self.pending_key = key + ".pending"
+        self.upload_id = state.get("reportUploadId")
+        self.parts = [{"PartNumber": int(p["PartNumber"]), "ETag": p["ETag"]}
+                      for p in state.get("reportParts") or []]
+        self.buf = io.BytesIO()
+        self.pending = bool(state.get("reportPending"))
+        if self.pending:
+            self.buf.write(_s3.get_object(Bucket=bucket, Key=self.pending_key)["Body"].read())
+
+    def write(self, line):
+        self.buf.write(line.encode())
+        if self.buf.tell() >= REPORT_PART_BYTES:
+            self._upload_part()
+
+    def _upload_part(self):
+        if not self.upload_id:
+            self.upload_id = _s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType="application/x-ndjson")["UploadId"]
+        number = len(self.parts) + 1
+        resp = _s3.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                               PartNumber=number, Body=self.buf.getvalue())
+        self.parts.append({"PartNumber": number, "ETag": resp["ETag"]})
+        self.buf = io.BytesIO()
+
+    def checkpoint(self):
+        """State for the job's checkpoint; parks the unsent tail in S3."""
+        # Rewritten even when empty once parked, so no stale tail is read back
+        if self.buf.tell() or self.pending:
+            _s3.put_object(Bucket=self.bucket, Key=self.pending_key, Body=self.buf.getvalue())
+            self.pending = True
+        return {"reportUploadId": self.upload_id, "reportParts": self.parts,
+                "reportPending": self.pending}
+
+    def close(self):
+        """Finish the report; returns its key, or None if nothing was written."""
+        if self.upload_id:
+            if self.buf.tell():
+                self._upload_part()
+            _s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                          MultipartUpload={"Parts": self.parts})
+        elif self.buf.tell():
+            _s3.put_object(Bucket=self.bucket, Key=self.key, Body=self.buf.getvalue(),
+                           ContentType="application/x-ndjson")
+        else:
+            return None
+        if self.pending:
+            _s3.delete_object(Bucket=self.bucket, Key=self.pending_key)
+        return self.key
+
+
+class _Progress:
+    """Counters and the capped error list; every error also goes to the report."""
+
+    def __init__(self, report, checkpoint=None):
+        checkpoint = checkpoint or {}
+        self.rows = int(checkpoint.get("rows", 0))
+        self.imported = int(checkpoint.get("imported", 0))
+        self.failed = int(checkpoint.get("failed", 0))
+        self.errors = list(checkpoint.get("errors") or [])
+        self.report = report
+        self.last_flush = time.monotonic()
+
+    def error(self, row_number, message):
+        self.failed += 1
+        entry = {"row": row_number, "error": message}
+        if len(self.errors) < jobs.MAX_REPORTED_ERRORS:
+            self.errors.append(entry)
+        self.report.write(json.dumps(entry) + "\n")
+
+    def counters(self):
+        return {"rows": self.rows, "imported": self.imported, "failed": self.failed,
+                "errors": self.errors}
+
+    def maybe_flush(self, job_id):
+        if time.monotonic() - self.last_flush >= PROGRESS_EVERY_SECONDS:
+            jobs.update_job(job_id, **self.counters())
+            self.last_flush = time.monotonic()
+
+
+def run_job(job, context):
+    """
+    Import the job's rows, resuming after its checkpoint if it has one.
+    Returns the job fields written: status "done", or "queued" when the
+    invocation ran short of time and checkpointed instead.
+    """
+    job_id = job["id"].split("#", 1)[1]
+    kind = job["kind"]
+    table_name = jobs.TARGETS[kind]["table"]
+    checkpoint = job.get("checkpoint") or {}
+    created_at = int(checkpoint.get("createdAt") or time.time())
+    report = _Report(job["bucket"], f"imports/{job_id}/errors.jsonl", checkpoint)
+    progress = _Progress(report, checkpoint)
+
+    body = _s3.get_object(Bucket=job["bucket"], Key=job["key"])["Body"]
+    in_flight = []
+    out_of_time = False
+
+    def collect(done):
+        chunk_size, fut = done
+        failures = fut.result()
+        for n, message in failures:
+            progress.error(n, message)
+        progress.imported += chunk_size - len(failures)
+
+    with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as pool:
+        chunk = []
+        # Rows a previous invocation handled (progress.rows) are skipped
+        for n, row in itertools.islice(_rows(body, job["format"]), progress.rows, None):
+            progress.rows += 1
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                chunk.append((n, to_listing(row, kind, job_id, n, created_at)))
+            except ValueError as e:
+                progress.error(n, str(e))
+
+            if len(chunk) >= WRITE_CHUNK:
+                in_flight.append((len(chunk), pool.submit(_write_chunk, table_name, chunk)))
+                chunk = []
+                # Bound memory: wait for the oldest writes before reading further
+                while len(in_flight) >= MAX_IN_FLIGHT:
+                    collect(in_flight.pop(0))
+            while in_flight and in_flight[0][1].done():
+                collect(in_flight.pop(0))
+            progress.maybe_flush(job_id)
+
+            if context.get_remaining_time_in_millis() < CHECKPOINT_MARGIN_MS:
+                out_of_time = True
+                break
+
+        if chunk:
+            in_flight.append((len(chunk), pool.submit(_write_chunk, table_name, chunk)))
+        for done in in_flight:
+            collect(done)
+
+    fields = progress.counters()
+    if out_of_time:
+        fields["checkpoint"] = {**fields, **report.checkpoint(), "createdAt": created_at}
+        jobs.transition(job_id, "running", "queued", **fields)
+        return {"status": "queued", **fields}
+
+    report_key = report.close()
+    if report_key:
+        fields["errorReportKey"] = report_key
+    jobs.transition(job_id, "running", "done", finishedAt=int(time.time()), **fields)
+    return {"status": "done", **fields}
+
+
+def handler(event, context):
+    job_id = event["jobId"]
+    job = jobs.get_job(job_id, consistent=True)
+    started = {} if job and job.get("startedAt") else {"startedAt": int(time.time())}
+    if not job or not jobs.transition(job_id, "queued", "running", **started):
+        print(f"Import {job_id} is not queued; nothing to do")
+        return {"status": "skipped"}
+
+    t0 = time.time()
+    try:
+        result = run_job(job, context)
+    except Exception as e:
+        print(f"❌ Import {job_id} failed: {e}")
+        jobs.transition(job_id, "running", "failed", failure=str(e))
+        raise
+    if result["status"] == "queued":
+        # Checkpointed: carry on in a fresh invocation
+        _lambda.invoke(FunctionName=context.invoked_function_arn, InvocationType="Event",
+                       Payload=json.dumps({"jobId": job_id}).encode())
+        print(f"Import {job_id}: checkpointed after {result['rows']} rows; continuing")
+        return {"status": "continued", "rows": result["rows"]}
+    print(f"Import {job_id}: {result['rows']} rows, {result['imported']} imported, "
+          f"{result['failed']} failed in {time.time() - t0:.1f}s")
+    return {"status": "done", **{k: result[k] for k in ("rows", "imported", "failed")}}
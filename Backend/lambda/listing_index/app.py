@@ -0,0 +1,88 @@
+import os
+import logging
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+
+import listing_text
+import listing_facets
+from scan_engine import ParallelScan
+
+# Keeps ListingTermsTable (the listings full-text index) and the facet
+# counts in MetaTable in step with the rent and sell listings tables' streams.
+# A failed batch is retried whole, so the counters are bumped at most once
+# per batch id (the table's first and last sequence numbers in it).
+
+REBUILD_CHUNK = 200
+
+_ddb = boto3.resource("dynamodb")
+_terms = _ddb.Table(os.environ["TERMS_TABLE"])
+_deserializer = TypeDeserializer()
+logger = logging.getLogger()
+
+
+def _image(record, key):
+    image = (record.get("dynamodb") or {}).get(key)
+    if not image:
+        return None
+    return {k: _deserializer.deserialize(v) for k, v in image.items()}
+
+
+def _table_name(record):
+    # arn:aws:dynamodb:<region>:<account>:table/<name>/stream/<label>
+    return record["eventSourceARN"].split(":table/", 1)[1].split("/", 1)[0]
+
+
+def rebuild(table_name):
+    """Re-index every listing of one table, reset its stats row, recount facets."""
+    _terms.put_item(Item={
+        "term": f"{table_name}#{listing_text.STATS_TERM}",
+        "listingId": listing_text.STATS_SORT_KEY,
+        "docs": 0,
+        "length": 0,
+    })
+    scan = ParallelScan(_ddb.Table(table_name))
+    written = 0
+    batch = []
+    for item in scan:
+        batch.append((None, item))
+        if len(batch) >= REBUILD_CHUNK:
+            written += listing_text.apply_change(_terms, table_name, batch)
+            batch = []
+    if batch:
+        written += listing_text.apply_change(_terms, table_name, batch)
+    # Per-segment scan stats for debugging a slow rebuild
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(scan.summary())
+    if listing_facets.META_TABLE:
+        listing_facets.rebuild(table_name)
+    return written
+
+
+def handler(event, context):
+    """
+    Stream records -> postings. Invoke with
+    {"rebuild": true, "table": "<listings table>"} to index a whole table.
+    """
+    if event.get("rebuild"):
+        written = rebuild(event["table"])
+        return {"status": "rebuilt", "postings": written}
+
+    by_table = {}
+    seqs = {}
+    for rec in event.get("Records") or []:
+        change = (_image(rec, "OldImage"), _image(rec, "NewImage"))
+        if change != (None, None):
+            by_table.setdefault(_table_name(rec), []).append(change)
+            seq = (rec.get("dynamodb") or {}).get("SequenceNumber")
+            if seq:
+                seqs.setdefault(_table_name(rec), []).append(seq)
+
+    written = 0
+    for table_name, changes in by_table.items():
+        table_seqs = seqs.get(table_name)
+        batch_id = f"{table_seqs[0]}-{table_seqs[-1]}" if table_seqs else None
+        written += listing_text.apply_change(_terms, table_name, changes, batch_id)
+        if listing_facets.META_TABLE:
+            listing_facets.apply_changes(table_name, changes, batch_id)
+    print(f"Applied {sum(len(c) for c in by_table.values())} listing changes, {written} posting writes")
+    return {"status": "ok", "postings": written}
@@ -1,43 +1,44 @@
 import os
-import json
+import hashlib
 import boto3
-from boto3.dynamodb.conditions import Key
-from decimal import Decimal
+
+from responses import dumps, cors_headers, error_response
+import news_pages
 
 TABLE = os.environ["NEWS_TABLE"]
 dynamo = boto3.resource("dynamodb").Table(TABLE)
 
-# Convert DynamoDB Decimals → int
-def decimal_to_python(obj):
-    if isinstance(obj, list):
-        return [decimal_to_python(i) for i in obj]
-    if isinstance(obj, dict):
-        return {k: decimal_to_python(v) for k, v in obj.items()}
-    if isinstance(obj, Decimal):
-        return int(obj)  # your ts is always integer
-    return obj
+# The fetcher also publishes the first pages as static snapshots (see
+# news_fetcher/publish.py); this is the path for the rest and for paging.
+CACHE_CONTROL = "public, max-age=300"
 
 
 def lambda_handler(event, context):
-
-    # Read latest 50
-    resp = dynamo.query(
-        KeyConditionExpression=Key("pk").eq("NEWS"),
-        ScanIndexForward=False,
-        Limit=50
-    )
-
-    items = resp.get("Items", [])
-
-    # Convert Decimal objects
-    items = decimal_to_python(items)
-
-    # DO NOT double encode JSON — only encode once here
-    return {
-        "statusCode": 200,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*"
-        },
-        "body": json.dumps(items)   # clean JSON, NO slashes, NO escaping
-    }
+    """
+    GET /news?limit=&source=&tag=&nextToken=
+    -> {"items": [...latest first], "nextToken": "..." | null}
+    """
+    params = event.get("queryStringParameters") or {}
+    source = (params.get("source") or "").strip()
+    tag = (params.get("tag") or "").strip().lower()
+    try:
+        limit = int(params.get("limit") or news_pages.DEFAULT_LIMIT)
+    except ValueError:
+        return error_response("limit must be a number", 400)
+    limit = max(1, min(limit, news_pages.MAX_LIMIT))
+
+    try:
+        items, next_token = news_pages.read_page(dynamo, source, tag, limit, params.get("nextToken"))
+    except ValueError as e:
+        return error_response(str(e), 400)
+
+    # DO NOT double encode JSON — encoded once here
+    body = dumps({"items": items, "nextToken": next_token})
+    etag = '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"'
+    headers = {"Cache-Control": CACHE_CONTROL, "ETag": etag}
+    headers.update(cors_headers(expose="ETag"))
+    request_headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+    if request_headers.get("if-none-match") == etag:
+        return {"statusCode": 304, "headers": headers, "body": ""}
+    headers["Content-Type"] = "application/json"
+    return {"statusCode": 200, "headers": headers, "body": body}
@@ -1,44 +1,159 @@
 import os
 import time
+import gzip
 import json
+import urllib.error
 import urllib.request
 import xml.etree.ElementTree as ET
-import hashlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+from botocore.exceptions import ClientError
 
-# RSS FEED URLs
-FEEDS = [
+import news_items
+import seen_set
+import publish
+
+# RSS FEED URLs (NEWS_FEEDS="url,url" overrides, e.g. for a local test server)
+FEEDS = [f.strip() for f in os.environ.get("NEWS_FEEDS", "").split(",") if f.strip()] or [
     "https://www.joc.com/rssfeed",
     "https://www.container-news.com/feed/",
     "https://www.porttechnology.org/feed/",
 ]
 
 TABLE = os.environ["NEWS_TABLE"]
-dynamo = boto3.resource("dynamodb").Table(TABLE)
+_ddb = boto3.resource("dynamodb")
+dynamo = _ddb.Table(TABLE)
+
+# ETag / Last-Modified per feed, kept in the meta table when configured
+META_TABLE = os.environ.get("META_TABLE")
 
 KEYWORDS = ["container", "port", "shipping", "freight", "logistics"]
 
+FETCH_WORKERS = 8
+FEED_DEADLINE_SECONDS = float(os.environ.get("FEED_DEADLINE_SECONDS", "15"))
+MAX_FEED_BYTES = 5 * 1024 * 1024
+READ_CHUNK = 64 * 1024
+WRITE_WORKERS = 8
+
+
+# ---------------------------------------------------
+# FEED STATE (conditional GET validators)
+# ---------------------------------------------------
+def _state_id(url):
+    return f"NEWSFEED#{url}"
+
+
+def load_feed_states(urls):
+    """{url: {"etag", "lastModified"}} for the feeds seen before."""
+    if not META_TABLE or not urls:
+        return {}
+    client = _ddb.meta.client
+    request = {META_TABLE: {"Keys": [{"id": _state_id(u)} for u in urls]}}
+    states = {}
+    for _ in range(5):
+        resp = client.batch_get_item(RequestItems=request)
+        for item in resp.get("Responses", {}).get(META_TABLE, []):
+            states[item["id"].split("#", 1)[1]] = item
+        request = resp.get("UnprocessedKeys")
+        if not request:
+            break
+        time.sleep(0.1)
+    return states
+
+
+def save_feed_states(results):
+    """Store new validators (only for feeds whose validators changed)."""
+    if not META_TABLE:
+        return
+    changed = [r for r in results if r["status"] == "fetched" and r.get("validators_changed")]
+    if not changed:
+        return
+    with _ddb.Table(META_TABLE).batch_writer() as bw:
+        for r in changed:
+            item = {"id": _state_id(r["url"]), "fetchedAt": int(time.time())}
+            for key in ("etag", "lastModified"):
+                if r.get(key):
+                    item[key] = r[key]
+            bw.put_item(Item=item)
+
 
 # ---------------------------------------------------
 # FETCH RSS FEED (prevents 403 errors)
 # ---------------------------------------------------
-def fetch_feed(url):
+def _download(url, state, deadline):
+    """
+    (status, body, response headers): "fetched" with the (decoded) body,
+    "not_modified" for a 304. Raises on errors and on the deadline.
+    """
+    headers = {"User-Agent": "Mozilla/5.0", "Accept-Encoding": "gzip"}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("lastModified"):
+        headers["If-Modified-Since"] = state["lastModified"]
+
+    req = urllib.request.Request(url, headers=headers)
     try:
-        req = urllib.request.Request(
-            url,
-            headers={"User-Agent": "Mozilla/5.0"}
-        )
-        with urllib.request.urlopen(req, timeout=20) as r:
-            xml = r.read()
+        r = urllib.request.urlopen(req, timeout=max(0.1, deadline - time.monotonic()))
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return "not_modified", None, e.headers
+        raise
+    with r:
+        chunks, size = [], 0
+        while True:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"feed not read within {FEED_DEADLINE_SECONDS}s")
+            chunk = r.read1(READ_CHUNK)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > MAX_FEED_BYTES:
+                raise ValueError(f"feed larger than {MAX_FEED_BYTES} bytes")
+            chunks.append(chunk)
+        body = b"".join(chunks)
+        if (r.headers.get("Content-Encoding") or "").lower() == "gzip":
+            body = gzip.decompress(body)
+        return "fetched", body, r.headers
+
+
+def fetch_feed(url, state=None):
+    """
+    One feed: {"url", "status", "items", ...} where status is fetched,
+    not_modified or failed. Fetched results carry the new validators.
+    """
+    state = state or {}
+    t0 = time.monotonic()
+    result = {"url": url, "status": "failed", "items": []}
+    try:
+        status, xml, headers = _download(url, state, t0 + FEED_DEADLINE_SECONDS)
     except Exception as e:
         print("Feed Error", url, e)
-        return []
+        return result
+    result["status"] = status
+    result["seconds"] = round(time.monotonic() - t0, 3)
+    if status == "not_modified":
+        return result
+
+    result["etag"] = headers.get("ETag")
+    result["lastModified"] = headers.get("Last-Modified")
+    result["validators_changed"] = (
+        (result["etag"], result["lastModified"]) != (state.get("etag"), state.get("lastModified"))
+    )
+    items = parse_feed(url, xml)
+    if items is None:
+        # Don't keep validators for a body we couldn't read
+        return dict(result, status="failed", validators_changed=False)
+    result["items"] = items
+    return result
 
+
+def parse_feed(url, xml):
     try:
         root = ET.fromstring(xml)
     except Exception as e:
         print("XML Parse Error", url, e)
-        return []
+        return None
 
     items = []
 
@@ -47,6 +162,7 @@ def fetch_feed(url):
         link = (it.findtext("link") or "").strip()
         desc = (it.findtext("description") or "").strip()
         pub = (it.findtext("pubDate") or "").strip()
+        categories = [c.text for c in it.findall("category")]
 
         content = f"{title} {desc}".lower()
 
@@ -60,54 +176,171 @@ def fetch_feed(url):
             "summary": desc[:500],
             "published_at": pub,
             "source": urllib.request.urlparse(url).netloc,
+            "tags": news_items.feed_tags(categories),
         })
 
     return items
 
 
 # ---------------------------------------------------
-# SAFE BATCH-WRITE (Unique Sort Key)
+# INCREMENTAL WRITE (only new or changed articles)
 # ---------------------------------------------------
-def put_items(items):
-    seen = set()
+def _put(job):
+    """
+    Store one article: the NEWS row first (conditional), then its tag
+    copies. Returns what actually happened: new, updated, seen or failed.
+    """
+    state, ts, old_ts, article = job
+    client = _ddb.meta.client
+    main, copies = news_items.rows(article, ts)
+    if state == "updated" and old_ts == ts:
+        condition = {
+            "ConditionExpression": "attribute_exists(ts) AND "
+                                   "(attribute_not_exists(contentHash) OR contentHash <> :h)",
+            "ExpressionAttributeValues": {":h": article["contentHash"]},
+        }
+    else:
+        # new, or updated with a new published_at (so a new key)
+        condition = {"ConditionExpression": "attribute_not_exists(ts)"}
+    try:
+        client.put_item(TableName=TABLE, Item=main, **condition)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            print("News write failed", article.get("link"), e)
+            return "failed"
+        # Stored already; the seen-set was behind. Fill in any tag copy an
+        # earlier run didn't get to (never overwriting one).
+        try:
+            for copy in copies:
+                _put_if_absent(client, copy)
+        except ClientError as e:
+            print("News tag copy write failed", article.get("link"), e)
+        return "seen"
+    try:
+        for copy in copies:
+            client.put_item(TableName=TABLE, Item=copy)
+        if state == "updated" and old_ts not in (None, ts):
+            for old in [main] + copies:
+                client.delete_item(TableName=TABLE, Key={"pk": old["pk"], "ts": old_ts})
+        return state
+    except ClientError as e:
+        print("News write failed", article.get("link"), e)
+        return "failed"
 
-    with dynamo.batch_writer() as bw:
-        for it in items:
 
-            # Unique hash based on title + link
-            raw = (it["title"] + it["link"]).encode()
-            h = int(hashlib.sha256(raw).hexdigest()[:14], 16)  # convert to integer for ts
+def _put_if_absent(client, item):
+    try:
+        client.put_item(TableName=TABLE, Item=item, ConditionExpression="attribute_not_exists(ts)")
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
 
-            # Avoid duplicates inside the same batch
-            if h in seen:
-                continue
 
-            seen.add(h)
+def put_items(items, seen):
+    """
+    Write the articles the seen-set doesn't already hold with this content.
+    Returns {"new", "seen", "updated", "failed"} counts.
+    """
+    counts = {"new": 0, "seen": 0, "updated": 0, "failed": 0}
+    jobs = {}
 
-            item = {
-                "pk": "NEWS",      # Same partition key for all items
-                "ts": h,           # UNIQUE sort key to avoid duplicates
-                **it,
-                "tags": ["container", "market"],
-            }
+    for it in items:
+        # Unique hash based on title + link
+        h = news_items.article_id(it)
 
-            bw.put_item(Item=item)
+        # Avoid duplicates inside the same batch
+        if h in jobs:
+            continue
+
+        chash = seen_set.content_hash(it)
+        state = seen.classify(h, chash)
+        old_ts = seen.stored_ts(h)
+        # Undated articles keep the key they were first stored under
+        fallback = news_items.key_seconds(old_ts) if old_ts else None
+        ts = news_items.sort_key(it, h, fallback)
+        if state == "seen":
+            counts["seen"] += 1
+            seen.mark(h, chash, old_ts or ts)
+            jobs[h] = None
+            continue
+
+        jobs[h] = (state, ts, old_ts, {
+            **it,
+            "articleId": h,
+            "contentHash": chash,
+        })
+
+    pending = [(h, job) for h, job in jobs.items() if job]
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(len(pending), WRITE_WORKERS)) as pool:
+            outcomes = list(pool.map(lambda hj: _put(hj[1]), pending))
+        for (h, (_, ts, old_ts, article)), outcome in zip(pending, outcomes):
+            counts[outcome] += 1
+            if outcome == "seen":
+                seen.mark(h, article["contentHash"], old_ts or ts)
+            elif outcome != "failed":
+                seen.mark(h, article["contentHash"], ts)
+    return counts
 
 
 # ---------------------------------------------------
 # MAIN HANDLER
 # ---------------------------------------------------
+def fetch_all(feeds):
+    """Every feed at once (bounded pool): run time is the slowest feed, not the sum."""
+    states = {}
+    try:
+        states = load_feed_states(feeds)
+    except Exception as e:
+        print("Feed state read failed; fetching unconditionally", e)
+    with ThreadPoolExecutor(max_workers=min(len(feeds), FETCH_WORKERS)) as pool:
+        return list(pool.map(lambda url: fetch_feed(url, states.get(url)), feeds))
+
+
 def lambda_handler(event, context):
 
-    all_items = []
+    t0 = time.monotonic()
+    results = fetch_all(FEEDS)
+    all_items = [it for r in results for it in r["items"]]
+
+    meta = _ddb.Table(META_TABLE) if META_TABLE else None
+    seen = seen_set.load(meta, dynamo)
+    written = put_items(all_items, seen) if all_items else {}
+    if meta is not None and all_items and not seen.save(meta):
+        print("Seen-set changed underneath this run; not saved")
+
+    # Only after the items are stored: a failed write must not turn the
+    # next run's fetch into a 304
+    if written.get("failed"):
+        print(f"{written['failed']} article writes failed; keeping the old feed validators")
+    else:
+        try:
+            save_feed_states(results)
+        except Exception as e:
+            print("Feed state write failed", e)
 
-    for feed in FEEDS:
-        all_items.extend(fetch_feed(feed))
+    counts = {s: sum(1 for r in results if r["status"] == s)
+              for s in ("fetched", "not_modified", "failed")}
+    print(f"Fetched {len(FEEDS)} feeds in {time.monotonic() - t0:.2f}s: {json.dumps(counts)}; "
+          + ", ".join(f"{r['url']} {r['status']} {r.get('seconds', '-')}s" for r in results))
+    print(f"Articles: {len(all_items)} in feeds, {json.dumps(written)}")
 
-    if all_items:
-        put_items(all_items)
+    # Static first pages for the news site (unchanged pages are skipped)
+    published = None
+    if publish.WEB_BUCKET:
+        try:
+            sources = {urllib.request.urlparse(f).netloc for f in FEEDS}
+            tag_counts = Counter(t for it in all_items for t in it.get("tags") or [])
+            tags = [t for t, _ in tag_counts.most_common(publish.MAX_TAG_PAGES)]
+            published = publish.publish(dynamo, sources, tags)
+            print(f"Published {published} news snapshot pages")
+        except Exception as e:
+            print("News snapshot publish failed", e)
 
     return {
         "status": "ok",
-        "inserted": len(all_items)
+        "inserted": written.get("new", 0),
+        "articles": written,
+        "feeds": counts,
+        "published": published,
     }
@@ -0,0 +1,83 @@
+"""
+News table rows for one article.
+
+    pk "NEWS"        ts   every article, newest first by ts
+    pk "TAG#<tag>"   ts   a copy per tag (a GSI key can't index list elements);
+                          tags are the feed's own <category> values
+    GSI_Source       sourceKey + ts, only on the "NEWS" rows (sparse)
+
+ts sorts by time: the article's published_at in epoch seconds times
+10^8, plus its id modulo 10^8 as a tiebreaker, so the same article keeps
+the same key and "latest" is a plain descending range query.
+"""
+import re
+import time
+import hashlib
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from news_pages import NEWS_PK, TAG_PK_PREFIX
+
+TIEBREAK = 10 ** 8
+
+# Each tag is another copy of the article, so only the first few count
+MAX_TAGS = 5
+MAX_TAG_LENGTH = 40
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def article_id(item):
+    """Identity of an article: hash of title + link (the table's original ts)."""
+    raw = (item["title"] + item["link"]).encode()
+    return int(hashlib.sha256(raw).hexdigest()[:14], 16)
+
+
+def feed_tags(categories):
+    """Tags for an article from its feed categories: lower-cased, de-duplicated."""
+    tags = []
+    for category in categories:
+        tag = _SPACE_RE.sub(" ", str(category or "")).strip().lower()[:MAX_TAG_LENGTH]
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags[:MAX_TAGS]
+
+
+def published_seconds(value):
+    """Epoch seconds of an RFC 822 (RSS) or ISO 8601 date, or None."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def sort_key(item, aid, fallback_seconds=None):
+    """Time-ordered ts; undated articles take fallback_seconds (default: now)."""
+    seconds = published_seconds(item.get("published_at"))
+    if seconds is None:
+        seconds = int(fallback_seconds if fallback_seconds is not None else time.time())
+    return max(seconds, 0) * TIEBREAK + aid % TIEBREAK
+
+
+def key_seconds(ts):
+    return int(ts) // TIEBREAK
+
+
+def rows(article, ts):
+    """The "NEWS" row and one copy per tag for an article dict."""
+    main = dict(article, pk=NEWS_PK, ts=ts, sourceKey=article.get("source") or "unknown")
+    copies = []
+    for tag in article.get("tags") or []:
+        copy = dict(main, pk=f"{TAG_PK_PREFIX}{tag}")
+        copy.pop("sourceKey")   # keeps GSI_Source to the NEWS rows
+        copies.append(copy)
+    return main, copies
@@ -0,0 +1,115 @@
+"""
+Static snapshots of the first news pages, published to the web bucket
+after each ingest so the news page reads CloudFront instead of DynamoDB.
+
+    news/data/manifest.json                 short max-age, lists the pages
+    news/data/latest.<digest>.json          immutable, gzip-encoded
+    news/data/source/<source>.<digest>.json
+    news/data/tag/<tag>.<digest>.json
+
+Each page is the body GET /news would return for the same filters
+(news_pages.read_page), so its nextToken continues through the API. A
+page's key carries its content digest: unchanged pages aren't rewritten
+and can be cached forever. Objects from two manifests ago are deleted,
+leaving one generation for browsers still holding the previous manifest.
+
+Tags come from the feeds' categories. A run publishes the tags of the
+articles it fetched and keeps earlier tag pages as they are (no article
+with those tags was written since), up to MAX_TAG_PAGES.
+"""
+import os
+import gzip
+import json
+import time
+import hashlib
+
+import boto3
+from botocore.exceptions import ClientError
+
+import news_pages
+from responses import dumps
+
+WEB_BUCKET = os.environ.get("WEB_BUCKET")
+PREFIX = "news/data/"
+MANIFEST_KEY = f"{PREFIX}manifest.json"
+
+PAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MANIFEST_CACHE_CONTROL = "public, max-age=300"
+
+# Tag pages listed in the manifest; other tags are served by GET /news
+MAX_TAG_PAGES = 30
+
+_s3 = boto3.client("s3")
+
+
+def _read_manifest():
+    try:
+        body = _s3.get_object(Bucket=WEB_BUCKET, Key=MANIFEST_KEY)["Body"].read()
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+            return {}
+        raise
+    return json.loads(body)
+
+
+def _safe(name):
+    return "".join(c if c.isalnum() or c in ".-_" else "_" for c in name)
+
+
+def pages_for(sources, tags):
+    """(manifest name, object path stem, source, tag) for every published page."""
+    yield "latest", "latest", "", ""
+    for source in sorted(sources):
+        yield f"source:{source}", f"source/{_safe(source)}", source, ""
+    for tag in sorted(tags):
+        yield f"tag:{tag}", f"tag/{_safe(tag)}", "", tag
+
+
+def publish(table, sources, tags):
+    """Write changed pages and the manifest; returns the number of pages written."""
+    old = _read_manifest()
+    old_pages = old.get("pages") or {}
+    pages, written = {}, 0
+
+    for name, stem, source, tag in pages_for(sources, tags):
+        items, next_token = news_pages.read_page(table, source, tag)
+        body = dumps({"items": items, "nextToken": next_token}).encode()
+        key = f"{PREFIX}{stem}.{hashlib.sha256(body).hexdigest()[:16]}.json"
+        if (old_pages.get(name) or {}).get("key") != "/" + key:
+            _s3.put_object(
+                Bucket=WEB_BUCKET, Key=key,
+                Body=gzip.compress(body, mtime=0),
+                ContentType="application/json",
+                ContentEncoding="gzip",
+                CacheControl=PAGE_CACHE_CONTROL,
+            )
+            written += 1
+        pages[name] = {"key": "/" + key, "count": len(items)}
+
+    room = MAX_TAG_PAGES - sum(1 for name in pages if name.startswith("tag:"))
+    for name, page in old_pages.items():
+        if room <= 0:
+            break
+        if name.startswith("tag:") and name not in pages:
+            pages[name] = page
+            room -= 1
+
+    if pages != old_pages:
+        _s3.put_object(
+            Bucket=WEB_BUCKET, Key=MANIFEST_KEY,
+            Body=json.dumps({
+                "version": int(time.time()),
+                "pages": pages,
+                "previous": sorted(p["key"] for p in old_pages.values()),
+            }, separators=(",", ":")).encode(),
+            ContentType="application/json",
+            CacheControl=MANIFEST_CACHE_CONTROL,
+        )
+        current = {p["key"] for p in pages.values()} | {p["key"] for p in old_pages.values()}
+        stale = [k for k in old.get("previous") or [] if k not in current]
+        if stale:
+            _s3.delete_objects(Bucket=WEB_BUCKET, Delete={
+                "Objects": [{"Key": k.lstrip("/")} for k in stale[:1000]],
+                "Quiet": True,
+            })
+    return written
@@ -0,0 +1,139 @@
+"""
+Compact record of the articles already stored, so a run writes only
+what is new or changed.
+
+    article id    int from sha256(title + link), the article's identity
+    content hash  8 hex chars over the fields a feed may revise
+    ts            the article's sort key in the news table
+
+The set lives in one meta table item, gzip-compressed JSON
+{article id: [content hash, last seen day, ts]} with an optimistic-lock
+version like the facet snapshots:
+
+    id       "NEWS#seen"
+    entries  Binary
+    version  n
+
+Entries not seen in a feed for RETENTION_DAYS are dropped. Without the
+item (first run, or no META_TABLE) the set is rebuilt from a projected
+query of the news table. It is only a hint: writes stay conditional, so
+a stale set costs a failed condition, never a duplicate.
+"""
+import os
+import gzip
+import json
+import time
+import hashlib
+
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+import news_items
+from news_items import article_id
+
+SNAPSHOT_ID = "NEWS#seen"
+RETENTION_DAYS = int(os.environ.get("NEWS_SEEN_RETENTION_DAYS", "90"))
+MAX_SNAPSHOT_BYTES = 350_000   # DynamoDB items stop at 400 KB
+
+# Fields whose change makes a stored article "updated"
+CONTENT_FIELDS = ["title", "link", "summary", "published_at", "source"]
+
+
+def content_hash(item):
+    raw = "\x1f".join(str(item.get(f) or "") for f in CONTENT_FIELDS).encode()
+    return hashlib.sha256(raw).hexdigest()[:8]
+
+
+def _today():
+    return int(time.time() // 86400)
+
+
+class SeenSet:
+
+    def __init__(self, entries=None, version=None):
+        self.entries = entries or {}
+        self.version = version
+
+    def classify(self, aid, chash):
+        """"new", "seen" (same content) or "updated"."""
+        entry = self.entries.get(str(aid))
+        if entry is None:
+            return "new"
+        return "seen" if entry[0] == chash else "updated"
+
+    def stored_ts(self, aid):
+        """The article's sort key when it was stored, or None."""
+        entry = self.entries.get(str(aid))
+        return entry[2] if entry and len(entry) > 2 else None
+
+    def mark(self, aid, chash, ts):
+        self.entries[str(aid)] = [chash, _today(), ts]
+
+    def _encode(self):
+        cutoff = _today() - RETENTION_DAYS
+        entries = {k: v for k, v in self.entries.items() if v[1] >= cutoff}
+        while True:
+            blob = gzip.compress(json.dumps(entries, separators=(",", ":")).encode())
+            if len(blob) <= MAX_SNAPSHOT_BYTES:
+                return blob
+            # Too big: keep the more recently seen half
+            keep = sorted(entries.items(), key=lambda kv: kv[1][1], reverse=True)
+            entries = dict(keep[:len(keep) // 2])
+
+    def save(self, meta_table):
+        """Conditional put; False if another run saved in between."""
+        item = {
+            "id": SNAPSHOT_ID,
+            "entries": self._encode(),
+            "version": (self.version or 0) + 1,
+            "updatedAt": int(time.time()),
+        }
+        if self.version is None:
+            condition = {"ConditionExpression": "attribute_not_exists(id)"}
+        else:
+            condition = {
+                "ConditionExpression": "version = :v",
+                "ExpressionAttributeValues": {":v": self.version},
+            }
+        try:
+            meta_table.put_item(Item=item, **condition)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            return False
+        self.version = item["version"]
+        return True
+
+
+def from_table(news_table):
+    """Rebuild the set from the stored articles (projected query of pk NEWS)."""
+    entries = {}
+    today = _today()
+    fields = CONTENT_FIELDS + ["contentHash", "ts"]
+    kwargs = {
+        "KeyConditionExpression": Key("pk").eq(news_items.NEWS_PK),
+        "ProjectionExpression": ", ".join(f"#p{i}" for i in range(len(fields))),
+        "ExpressionAttributeNames": {f"#p{i}": f for i, f in enumerate(fields)},
+    }
+    while True:
+        resp = news_table.query(**kwargs)
+        for it in resp.get("Items", []):
+            if it.get("title") is None or it.get("link") is None:
+                continue
+            entries[str(article_id(it))] = [it.get("contentHash") or content_hash(it), today, int(it["ts"])]
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return SeenSet(entries)
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def load(meta_table, news_table):
+    """The stored set, or one rebuilt from the news table."""
+    if meta_table is not None:
+        item = meta_table.get_item(Key={"id": SNAPSHOT_ID}, ConsistentRead=True).get("Item")
+        if item:
+            blob = item["entries"]
+            blob = getattr(blob, "value", blob)
+            return SeenSet(json.loads(gzip.decompress(blob)), int(item["version"]))
+    # First run (or no meta table): save() creates the item
+    return from_table(news_table)
@@ -1,12 +1,26 @@
 import os
 import json
+import time
+import random
+import logging
 import boto3
-from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Attr, Key
 from urllib.parse import unquote_plus  # <-- IMPORTANT for /ports/{id}
+from concurrent.futures import ThreadPoolExecutor
+
+import geo
+import facets
+import search_index
+from responses import json_response
+from tokens import encode_token, decode_token
+from scan_engine import ParallelScan, projection_kwargs as _projection_kwargs
 
 TABLE = os.environ["PORTS_TABLE"]
 ddb = boto3.resource("dynamodb").Table(TABLE)
 
+logger = logging.getLogger()
+
 # Fields returned in list view
 BASIC_FIELDS = [
     "id", "name", "country", "state", "city", "pincode", "image_url"
@@ -15,18 +29,35 @@ BASIC_FIELDS = [
 # None => return full item in detail view
 DETAIL_FIELDS = None
 
+# Debug header naming the access path used for a list request
+PLAN_HEADER = "X-Query-Plan"
 
-def _ok(body_obj, status=200):
-    return {
-        "statusCode": status,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET,OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type",
-        },
-        "body": json.dumps(body_obj, default=str),
-    }
+# Paged list requests (?pageSize=&nextToken=)
+MAX_PAGE_SIZE = 500
+# DynamoDB calls one page may spend topping up a filtered result
+MAX_CALLS_PER_PAGE = 5
+# Order named in list nextTokens (index/table order; relevance pages use "relevance")
+TOKEN_SORT = "index"
+
+# /ports/batch
+MAX_BATCH_IDS = 500
+BATCH_GET_CHUNK = 100      # BatchGetItem hard limit
+BATCH_GET_WORKERS = 5
+BATCH_GET_ATTEMPTS = 6
+
+# /ports/nearby
+GEO_INDEX = "GSI_Geo"
+DEFAULT_RADIUS_KM = 100
+MAX_RADIUS_KM = 500
+MAX_NEARBY_RESULTS = 50
+# Fallback for ports stored before the loader precomputed `nearby`
+DETAIL_NEARBY_COUNT = 5
+DETAIL_NEARBY_RADIUS_KM = 250
+
+
+def _ok(body_obj, status=200, headers=None):
+    return json_response(body_obj, status, headers, methods="GET,POST,OPTIONS",
+                         expose=PLAN_HEADER, allow_headers="Content-Type")
 
 
 def _err(msg, status=400):
@@ -66,8 +97,9 @@ def _build_text_filter(q: str):
 
 def _build_structured_filter(params):
     """
-    Build a FilterExpression combining state/city/name/pincode
-    (ANDed together). Name matches both exact and contains (lc + cs).
+    Build a FilterExpression combining state/city/name/pincode/type
+    (ANDed together). Name matches both exact and contains (lc + cs);
+    type is the port_type ("major"/"minor").
     """
     f = None
 
@@ -75,6 +107,7 @@ def _build_structured_filter(params):
     city = (params.get("city") or "").strip()
     name = (params.get("name") or "").strip()
     pincode = (params.get("pincode") or "").strip()
+    port_type = (params.get("type") or "").strip().lower()
 
     def AND(a, b):
         return b if a is None else (a & b)
@@ -106,27 +139,17 @@ def _build_structured_filter(params):
         )
         f = AND(f, name_filter)
 
+    if port_type:
+        f = AND(f, Attr("port_type").eq(port_type))
+
     return f
 
 
-def _scan_all(filter_expression=None, projection=None, limit_soft=None):
+def _read_pages(op, kwargs, limit_soft=None):
     """
-    Scan with pagination. Use projection to reduce payload in list views.
-    limit_soft: if set, stop after returning roughly this many items.
+    Drive a paginated scan/query. limit_soft: if set, stop after
+    returning roughly this many items.
     """
-    kwargs = {}
-    if filter_expression is not None:
-        kwargs["FilterExpression"] = filter_expression
-
-    if projection:
-        # Build ProjectionExpression safely
-        field_list = sorted(set(projection))
-        pe = ", ".join(field_list)
-        ean = {f"#n{i}": name for i, name in enumerate(field_list)}
-        rev = {v: k for k, v in ean.items()}
-        kwargs["ProjectionExpression"] = ", ".join(rev[n] for n in field_list)
-        kwargs["ExpressionAttributeNames"] = ean
-
     items = []
     last_evaluated_key = None
 
@@ -134,7 +157,7 @@ def _scan_all(filter_expression=None, projection=None, limit_soft=None):
         if last_evaluated_key:
             kwargs["ExclusiveStartKey"] = last_evaluated_key
 
-        resp = ddb.scan(**kwargs)
+        resp = op(**kwargs)
         batch = resp.get("Items", [])
         items.extend(batch)
 
@@ -148,38 +171,170 @@ def _scan_all(filter_expression=None, projection=None, limit_soft=None):
     return items
 
 
-def handle_filters(params):
+def _read_page(op, kwargs, page_size, start_key=None):
     """
-    Returns distinct states/cities/ports/pincodes.
-    Optional inputs: state, city (to cascade).
+    Read one bounded page: at most page_size items and MAX_CALLS_PER_PAGE
+    round trips. Limit shrinks as items arrive so the returned
+    LastEvaluatedKey always resumes exactly after the last item kept.
+    Returns (items, last_evaluated_key).
     """
-    state = (params.get("state") or "").strip()
-    city = (params.get("city") or "").strip()
+    items = []
+    last_evaluated_key = start_key
+
+    for _ in range(MAX_CALLS_PER_PAGE):
+        if last_evaluated_key:
+            kwargs["ExclusiveStartKey"] = last_evaluated_key
+        kwargs["Limit"] = page_size - len(items)
+
+        resp = op(**kwargs)
+        items.extend(resp.get("Items", []))
+
+        last_evaluated_key = resp.get("LastEvaluatedKey")
+        if not last_evaluated_key or len(items) >= page_size:
+            break
+
+    return items, last_evaluated_key
 
-    # Small capped scan to keep it light; in prod, maintain a cached meta item.
-    items = _scan_all(
-        projection=["state", "city", "name", "pincode"],
-        limit_soft=2000,
+
+def _scan_kwargs(filter_expression=None, projection=None):
+    kwargs = _projection_kwargs(projection)
+    if filter_expression is not None:
+        kwargs["FilterExpression"] = filter_expression
+    return kwargs
+
+
+def _query_kwargs(index_name, key_condition, filter_expression=None,
+                  projection=None):
+    kwargs = _scan_kwargs(filter_expression, projection)
+    kwargs["IndexName"] = index_name
+    kwargs["KeyConditionExpression"] = key_condition
+    return kwargs
+
+
+def _scan_all(filter_expression=None, projection=None, limit_soft=None):
+    """
+    Parallel segmented scan (CommonLayer scan_engine). Use projection to
+    reduce payload in list views. limit_soft: stop all segments once
+    this many items have been read.
+    """
+    scan = ParallelScan(
+        ddb,
+        filter_expression=filter_expression,
+        projection=projection,
+        limit=limit_soft,
     )
+    items = list(scan)
+    # Scan metrics only when asked for: summary() waits for every segment
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(scan.summary())
+    return items
 
-    def uniq_sorted(seq):
-        return sorted({s for s in seq if s})
 
-    states = uniq_sorted(x.get("state") for x in items)
+def _query_all(index_name, key_condition, filter_expression=None,
+               projection=None, limit_soft=None):
+    """
+    Query a GSI with pagination; same projection/limit handling as _scan_all.
+    """
+    kwargs = _query_kwargs(index_name, key_condition, filter_expression, projection)
+    return _read_pages(ddb.query, kwargs, limit_soft)
 
-    filtered_state = [x for x in items if (not state or x.get("state") == state)]
-    cities = uniq_sorted(x.get("city") for x in filtered_state)
 
-    filtered_city = [x for x in filtered_state if (not city or x.get("city") == city)]
-    ports = uniq_sorted(x.get("name") for x in filtered_city)
-    pincodes = uniq_sorted(x.get("pincode") for x in filtered_city)
+def _plan_query(params):
+    """
+    Pick the GSI access path that can serve this request.
+    Returns (index_name, key_condition), or None when only a Scan can.
+
+    Index layout (PortsTableV2 in template.yaml):
+      GSI_Pincode      pincode  / id
+      GSI_Name         name_lc  / id
+      GSI_StateCityLc  state_lc / city_lc
+      GSI_CityLc       city_lc  / name_lc
+
+    Keys are the lower-cased *_lc attributes load_ports.py writes, queried
+    with lower-cased input, so a plan selects exactly what the state/city
+    filter would and its (possibly empty) result is the answer. name= and
+    q are contains matches and pincode= a prefix match, none of which these
+    keys can express (GSI_Pincode/GSI_Name only answer exact values), so
+    they are left to the FilterExpression on whichever plan runs.
+    """
+    state = (params.get("state") or "").strip().lower()
+    city = (params.get("city") or "").strip().lower()
 
-    return {
-        "states": states,
-        "cities": cities,
-        "ports": ports,
-        "pincodes": pincodes,
-    }
+    if state and city:
+        return "GSI_StateCityLc", Key("state_lc").eq(state) & Key("city_lc").eq(city)
+    if city:
+        return "GSI_CityLc", Key("city_lc").eq(city)
+    if state:
+        return "GSI_StateCityLc", Key("state_lc").eq(state)
+    return None
+
+
+def _execute_plan(plan, filter_expression, projection, limit_soft):
+    """
+    Run the planned index query, or a Scan when no index applies.
+    Returns (items, plan_description).
+    """
+    if plan is None:
+        items = _scan_all(
+            filter_expression=filter_expression,
+            projection=projection,
+            limit_soft=limit_soft,
+        )
+        return items, "Scan"
+
+    index_name, key_condition = plan
+    items = _query_all(
+        index_name,
+        key_condition,
+        filter_expression=filter_expression,
+        projection=projection,
+        limit_soft=limit_soft,
+    )
+    return items, index_name
+
+
+def _cursor_filters(params, q):
+    """
+    Every filter of a request, joined into the plan name its nextToken
+    is issued for ("<plan>#<filters>", like news_pages.plan), so a token
+    replayed with other filters is rejected instead of skipping rows.
+    """
+    filters = [(params.get(k) or "").strip() for k in ("state", "city", "name", "pincode", "type")]
+    return "#".join([*filters, q])
+
+
+def _execute_page(plan, filter_expression, projection, page_size, filters, token=None):
+    """
+    Paged counterpart of _execute_plan; later pages resume from the
+    token, which must carry this plan and filters (see _cursor_filters).
+    Returns (items, plan_name, next_token).
+    """
+    if plan is None:
+        name = "Scan"
+        op, kwargs = ddb.scan, _scan_kwargs(filter_expression, projection)
+    else:
+        name, key_condition = plan
+        op = ddb.query
+        kwargs = _query_kwargs(name, key_condition, filter_expression, projection)
+
+    cursor = f"{name}#{filters}"
+    start_key = decode_token(token, cursor, TOKEN_SORT) if token else None
+    items, last_key = _read_page(op, kwargs, page_size, start_key)
+    return items, name, (encode_token(cursor, TOKEN_SORT, last_key) if last_key else None)
+
+
+def handle_filters(params):
+    """
+    Returns distinct states/cities/ports/pincodes.
+    Optional inputs: state, city (to cascade).
+
+    Served from the facet snapshot the ports stream keeps current
+    (see facets.py), so this is one GetItem at most per warm container.
+    """
+    state = (params.get("state") or "").strip()
+    city = (params.get("city") or "").strip()
+
+    return facets.facets_from_tree(facets.get_tree(), state, city)
 
 
 def handle_detail(port_id: str):
@@ -203,17 +358,302 @@ def handle_detail(port_id: str):
     if not item:
         return _err("Not found", 404)
 
+    if "nearby" not in item and item.get("geohash"):
+        found, _ = _nearby_items(float(item["lat"]), float(item["lon"]),
+                                 DETAIL_NEARBY_RADIUS_KM, DETAIL_NEARBY_COUNT + 1)
+        item["nearby"] = [
+            {k: it.get(k) for k in ("id", "name", "city", "state", "distanceKm")}
+            for it in found if it.get("id") != item["id"]
+        ][:DETAIL_NEARBY_COUNT]
+
     return _ok(_pick(item, DETAIL_FIELDS))
 
 
+# ---------------------------------------------------
+# NEARBY (GSI_Geo: geoCell / geohash)
+# ---------------------------------------------------
+def _query_cell(cell, projection):
+    """All ports whose geohash starts with `cell` (one GSI_Geo partition)."""
+    kwargs = _projection_kwargs(projection)
+    kwargs.setdefault("ExpressionAttributeNames", {}).update({"#gc": "geoCell", "#gh": "geohash"})
+    kwargs["ExpressionAttributeValues"] = {":gc": cell[:geo.GEO_CELL_PRECISION]}
+    kwargs["KeyConditionExpression"] = "#gc = :gc"
+    if len(cell) > geo.GEO_CELL_PRECISION:
+        kwargs["KeyConditionExpression"] += " AND begins_with(#gh, :gh)"
+        kwargs["ExpressionAttributeValues"][":gh"] = cell
+
+    items = []
+    while True:
+        # Pre-rendered expression on the client: safe to run from threads
+        resp = ddb.meta.client.query(TableName=TABLE, IndexName=GEO_INDEX, **kwargs)
+        items.extend(resp.get("Items", []))
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return items
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def _nearby_items(lat, lon, radius_km, limit):
+    """
+    Ports within radius_km of (lat, lon), nearest first, each with
+    distanceKm. Only the geohash cells covering the radius are read.
+    Returns (items, cells_queried).
+    """
+    cells = geo.covering_cells(lat, lon, radius_km)
+    projection = BASIC_FIELDS + ["lat", "lon"]
+    with ThreadPoolExecutor(max_workers=min(len(cells), geo.MAX_COVER_CELLS)) as pool:
+        results = list(pool.map(lambda c: _query_cell(c, projection), cells))
+
+    ranked = []
+    for it in (it for chunk in results for it in chunk):
+        km = geo.haversine_km(lat, lon, float(it["lat"]), float(it["lon"]))
+        if km <= radius_km:
+            out = _pick(it, BASIC_FIELDS)
+            out["distanceKm"] = round(km, 1)
+            ranked.append(out)
+    ranked.sort(key=lambda it: (it["distanceKm"], it.get("id") or ""))
+    return ranked[:limit], cells
+
+
+def handle_nearby(params):
+    """
+    Ports closest to a ZIP (or an explicit lat/lon):
+
+      /ports/nearby?pincode=77002&radiusKm=100&limit=10
+      /ports/nearby?lat=29.76&lon=-95.36
+
+    Origins come from the bundled ZIP centroid table; an unlisted ZIP is
+    placed at its 3-digit area's nearest listed ZIP, or its USPS prefix
+    range's representative point ("approximate": true).
+    """
+    pincode = (params.get("pincode") or "").strip()
+    try:
+        radius_km = float(params.get("radiusKm") or DEFAULT_RADIUS_KM)
+        limit = int(params.get("limit") or 10)
+        lat = float(params["lat"]) if params.get("lat") else None
+        lon = float(params["lon"]) if params.get("lon") else None
+    except ValueError:
+        return _err("radiusKm, limit, lat and lon must be numbers", 400)
+
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        return _err(f"radiusKm must be between 0 and {MAX_RADIUS_KM}", 400)
+    limit = max(1, min(limit, MAX_NEARBY_RESULTS))
+
+    origin = {"radiusKm": radius_km}
+    if lat is not None and lon is not None:
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return _err("lat/lon out of range", 400)
+        origin.update(lat=lat, lon=lon)
+    elif pincode:
+        centroid = geo.zip_centroid(pincode)
+        if not centroid:
+            return _err(f"Unknown pincode {pincode}", 404)
+        lat, lon, exact = centroid
+        origin.update(pincode=pincode, lat=lat, lon=lon, approximate=not exact)
+    else:
+        return _err("pincode or lat/lon required", 400)
+
+    items, cells = _nearby_items(lat, lon, radius_km, limit)
+    return _ok({"origin": origin, "items": items},
+               headers={PLAN_HEADER: f"{GEO_INDEX}[{','.join(cells)}]"})
+
+
+def _split_ids(raw):
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    return [str(x) for x in (raw or [])]
+
+
+def _get_chunk(keys, projection):
+    """
+    One BatchGetItem for <=100 keys, retrying UnprocessedKeys with
+    jittered exponential backoff. Returns (items_found, keys_given_up_on).
+    """
+    request = {"Keys": keys}
+    request.update(_projection_kwargs(projection))
+    found = []
+
+    for attempt in range(BATCH_GET_ATTEMPTS):
+        resp = ddb.meta.client.batch_get_item(RequestItems={TABLE: request})
+        found.extend(resp.get("Responses", {}).get(TABLE, []))
+        pending = resp.get("UnprocessedKeys", {}).get(TABLE)
+        if not pending:
+            return found, []
+        request = pending
+        time.sleep(0.05 * (2 ** attempt) * (1 + random.random()))
+
+    return found, request["Keys"]
+
+
+def handle_batch(params, body=None):
+    """
+    Fetch many ports in one call.
+
+      GET  /ports/batch?ids=PORT%23a,PORT%23b&fields=name,city
+      POST /ports/batch  {"ids": [...], "fields": [...]}
+
+    Ids are decoded like /ports/{id}. Keys go out in chunks of 100 per
+    BatchGetItem, chunks run concurrently. fields= limits the attributes
+    returned (id is always included). Response:
+      {"items": [... in request order ...], "missing": [ids not found]}
+    plus "unprocessed": [ids] if DynamoDB kept throttling some keys.
+    """
+    body = body or {}
+    raw_ids = body.get("ids") if "ids" in body else params.get("ids")
+    raw_fields = body.get("fields") if "fields" in body else params.get("fields")
+
+    ids = []
+    for port_id in _split_ids(raw_ids):
+        port_id = unquote_plus(port_id.strip())
+        if port_id and port_id not in ids:
+            ids.append(port_id)
+
+    if not ids:
+        return _err("ids required", 400)
+    if len(ids) > MAX_BATCH_IDS:
+        return _err(f"at most {MAX_BATCH_IDS} ids per request", 400)
+
+    projection = None
+    fields = [f.strip() for f in _split_ids(raw_fields) if f.strip()]
+    if fields:
+        projection = set(fields) | {"id"}
+
+    keys = [{"id": port_id} for port_id in ids]
+    chunks = [keys[i:i + BATCH_GET_CHUNK] for i in range(0, len(keys), BATCH_GET_CHUNK)]
+
+    if len(chunks) == 1:
+        results = [_get_chunk(chunks[0], projection)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(BATCH_GET_WORKERS, len(chunks))) as pool:
+            results = list(pool.map(lambda c: _get_chunk(c, projection), chunks))
+
+    by_id = {it["id"]: it for found, _ in results for it in found}
+    unprocessed = {k["id"] for _, left in results for k in left}
+
+    out = {
+        "items": [by_id[i] for i in ids if i in by_id],
+        "missing": [i for i in ids if i not in by_id and i not in unprocessed],
+    }
+    if unprocessed:
+        out["unprocessed"] = [i for i in ids if i in unprocessed]
+    return _ok(out)
+
+
+def _load_search_items():
+    scan = ParallelScan(ddb, projection=search_index.DOC_FIELDS)
+    items = list(scan)
+    # Scan metrics only when asked for: summary() waits for every segment
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(scan.summary())
+    return items
+
+
+def _matches_structured(doc, params):
+    """In-memory equivalent of _build_structured_filter."""
+    def val(k):
+        return str(doc.get(k) or "")
+
+    state = (params.get("state") or "").strip()
+    city = (params.get("city") or "").strip()
+    name = (params.get("name") or "").strip()
+    pincode = (params.get("pincode") or "").strip()
+    port_type = (params.get("type") or "").strip().lower()
+
+    if state and state.lower() != val("state").lower():
+        return False
+    if city and city.lower() != val("city").lower():
+        return False
+    if pincode and not val("pincode").startswith(pincode):
+        return False
+    if name and name.lower() not in val("name").lower():
+        return False
+    if port_type and port_type != val("port_type").lower():
+        return False
+    return True
+
+
+def handle_suggest(params):
+    """
+    Autocomplete for the search box: /ports/suggest?prefix=hou&limit=10
+    Served from the warm container's search index.
+    """
+    prefix = (params.get("prefix") or params.get("q") or "").strip()
+    try:
+        limit = max(1, min(int(params.get("limit") or 10), 25))
+    except ValueError:
+        return _err("limit must be a number", 400)
+
+    if not prefix:
+        return _ok({"prefix": "", "suggestions": []})
+
+    index = search_index.get_index(_load_search_items)
+    suggestions = [
+        {
+            "id": doc.get("id"),
+            "name": doc.get("name"),
+            "city": doc.get("city"),
+            "state": doc.get("state"),
+            "pincode": doc.get("pincode"),
+            "score": score,
+        }
+        for doc, score in index.suggest(prefix, limit=limit)
+    ]
+    return _ok({"prefix": prefix, "suggestions": suggestions},
+               headers={PLAN_HEADER: "SearchIndex"})
+
+
+def _handle_relevance(params, q, limit_soft, page_size, token):
+    """
+    ?sort=relevance&q=... : ranked, typo-tolerant results from the
+    in-memory search index, structured filters applied on top. Paged
+    requests carry an offset in the usual nextToken envelope.
+    """
+    cursor = f"SearchIndex#{_cursor_filters(params, q)}"
+    offset = 0
+    if token:
+        try:
+            offset = int(decode_token(token, cursor, "relevance")["o"])
+        except (ValueError, KeyError, TypeError) as e:
+            return _err(str(e) if isinstance(e, ValueError) else "invalid nextToken", 400)
+
+    index = search_index.get_index(_load_search_items)
+    ranked = [
+        dict(doc, score=score)
+        for doc, score in index.search(q)
+        if _matches_structured(doc, params)
+    ]
+    fields = BASIC_FIELDS + ["score"]
+
+    if page_size:
+        page = ranked[offset:offset + page_size]
+        end = offset + len(page)
+        next_token = encode_token(cursor, "relevance", {"o": end}) if end < len(ranked) else None
+        return _ok({"items": [{k: it.get(k) for k in fields} for it in page],
+                    "nextToken": next_token},
+                   headers={PLAN_HEADER: "SearchIndex"})
+
+    if limit_soft:
+        ranked = ranked[:limit_soft]
+    return _ok([{k: it.get(k) for k in fields} for it in ranked],
+               headers={PLAN_HEADER: "SearchIndex"})
+
+
 def handle_list(params):
     """
     List/search ports.
 
     Supports:
       - ?q= free text
-      - ?state=&city=&name=&pincode= structured filters
+      - ?state=&city=&name=&pincode=&type= structured filters
       - ?limit= soft cap on number of results
+      - ?pageSize=&nextToken= bounded pages; the response becomes
+        {"items": [...], "nextToken": "..." | null}. Pass the same
+        filters with each nextToken.
+      - ?sort=relevance with q: ranked, typo-tolerant matches from the
+        in-memory search index (each item carries a "score")
+
+    Structured filters are served from the GSIs when one applies (see
+    _plan_query); the chosen plan is reported in the X-Query-Plan header.
     """
     q = (params.get("q") or "").strip().lower()
     limit_param = params.get("limit")
@@ -225,6 +665,17 @@ def handle_list(params):
         except Exception:
             limit_soft = None
 
+    page_size = None
+    token = (params.get("nextToken") or "").strip()
+    if params.get("pageSize") or token:
+        try:
+            page_size = max(1, min(int(params.get("pageSize") or 50), MAX_PAGE_SIZE))
+        except ValueError:
+            return _err("pageSize must be a number", 400)
+
+    if q and (params.get("sort") or "").lower() == "relevance":
+        return _handle_relevance(params, q, limit_soft, page_size, token)
+
     text_filter = _build_text_filter(q) if q else None
     structured_filter = _build_structured_filter(params)
 
@@ -234,11 +685,32 @@ def handle_list(params):
     else:
         filter_expression = text_filter or structured_filter
 
-    items = _scan_all(
-        filter_expression=filter_expression,
-        projection=BASIC_FIELDS,  # list view: basics only
-        limit_soft=limit_soft,
-    )
+    plan = _plan_query(params)
+    next_token = None
+
+    if page_size:
+        try:
+            items, plan, next_token = _execute_page(
+                plan,
+                filter_expression,
+                projection=BASIC_FIELDS,
+                page_size=page_size,
+                filters=_cursor_filters(params, q),
+                token=token,
+            )
+        except ValueError as e:
+            return _err(str(e), 400)
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ValidationException":
+                return _err("invalid nextToken", 400)
+            raise
+    else:
+        items, plan = _execute_plan(
+            plan,
+            filter_expression,
+            projection=BASIC_FIELDS,  # list view: basics only
+            limit_soft=limit_soft,
+        )
 
     # Make sure "id" exists; if the data lacks it, synthesize (fallback).
     for i in items:
@@ -246,7 +718,10 @@ def handle_list(params):
             i["id"] = f"SYNTH#{(i.get('name') or '')}#{(i.get('city') or '')}"
 
     cleaned = [{k: it.get(k) for k in BASIC_FIELDS} for it in items]
-    return _ok(cleaned)
+    if page_size:
+        return _ok({"items": cleaned, "nextToken": next_token},
+                   headers={PLAN_HEADER: plan})
+    return _ok(cleaned, headers={PLAN_HEADER: plan})
 
 
 def lambda_handler(event, context):
@@ -264,6 +739,26 @@ def lambda_handler(event, context):
         data = handle_filters(params)
         return _ok(data)
 
+    # Route: /ports/nearby
+    if method == "GET" and path.rstrip("/").endswith("/ports/nearby"):
+        return handle_nearby(params)
+
+    # Route: /ports/suggest
+    if method == "GET" and path.rstrip("/").endswith("/ports/suggest"):
+        return handle_suggest(params)
+
+    # Route: /ports/batch (before /ports/{id})
+    if path.rstrip("/").endswith("/ports/batch") and method in ("GET", "POST"):
+        body = None
+        if method == "POST":
+            try:
+                body = json.loads(event.get("body") or "{}")
+            except json.JSONDecodeError:
+                return _err("Invalid JSON body", 400)
+            if not isinstance(body, dict):
+                return _err("Body must be a JSON object", 400)
+        return handle_batch(params, body)
+
     # Route: /ports/{id}
     if method == "GET" and path.rstrip("/").startswith("/ports/") and path.rstrip("/") != "/ports":
         # Try pathParameters first
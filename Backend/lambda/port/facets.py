@@ -0,0 +1,267 @@
+import os
+import json
+import time
+import zlib
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+from scan_engine import scan_items
+
+# Precomputed state -> city -> port/pincode tree for /ports/filters.
+#
+# The tree is kept as one JSON document in the meta table:
+#   {state: {city: {"ports": {name: n}, "pincodes": {pincode: n}}}}
+# Counts let a REMOVE/MODIFY from the ports stream take a value out
+# again without rescanning the table.
+#
+# DynamoDB items stop at 400 KB: past MAX_SNAPSHOT_BYTES the JSON is
+# stored zlib-compressed ("treeZ"), and if that is still too big the
+# biggest cities' pincode lists, then port lists, are emptied (logged).
+
+PORTS_TABLE = os.environ.get("PORTS_TABLE")
+META_TABLE = os.environ.get("META_TABLE")
+
+FACETS_ID = "PORTS#facets"
+FACET_FIELDS = ["state", "city", "name", "pincode"]
+
+# Map key used when a port has no state/city
+BLANK = "#none"
+
+# How long a warm container keeps its copy before re-reading the meta item
+CACHE_TTL_SECONDS = int(os.environ.get("FACETS_TTL_SECONDS", "60"))
+
+MAX_WRITE_ATTEMPTS = 5
+MAX_SNAPSHOT_BYTES = 350_000
+
+_ddb = boto3.resource("dynamodb")
+_deserializer = TypeDeserializer()
+
+_cache = {"tree": None, "loaded_at": 0.0}
+
+
+# ---------------------------------------------------
+# TREE OPERATIONS
+# ---------------------------------------------------
+def _facet_key(item):
+    return tuple((item.get(f) or "").strip() for f in FACET_FIELDS)
+
+
+def apply_item(tree, item, delta):
+    """Add (delta=1) or remove (delta=-1) one port's values from the tree."""
+    state, city, name, pincode = _facet_key(item)
+    cities = tree.setdefault(state or BLANK, {})
+    node = cities.setdefault(city or BLANK, {"ports": {}, "pincodes": {}})
+
+    for bucket, value in (("ports", name), ("pincodes", pincode)):
+        if not value:
+            continue
+        counts = node[bucket]
+        n = counts.get(value, 0) + delta
+        if n > 0:
+            counts[value] = n
+        else:
+            counts.pop(value, None)
+
+    # Prune empty branches so removed states/cities drop out of the lists
+    if not node["ports"] and not node["pincodes"] and delta < 0:
+        cities.pop(city or BLANK, None)
+    if not cities:
+        tree.pop(state or BLANK, None)
+
+
+def build_tree(items):
+    tree = {}
+    for it in items:
+        apply_item(tree, it, 1)
+    return tree
+
+
+def facets_from_tree(tree, state="", city=""):
+    """Same response shape handle_filters always returned."""
+    states = sorted(s for s in tree if s != BLANK)
+
+    state_nodes = [tree.get(state, {})] if state else list(tree.values())
+    cities = sorted({c for node in state_nodes for c in node if c != BLANK})
+
+    ports, pincodes = set(), set()
+    for node in state_nodes:
+        city_nodes = [node.get(city)] if city else node.values()
+        for leaf in city_nodes:
+            if not leaf:
+                continue
+            ports.update(leaf["ports"])
+            pincodes.update(leaf["pincodes"])
+
+    return {
+        "states": states,
+        "cities": cities,
+        "ports": sorted(ports),
+        "pincodes": sorted(pincodes),
+    }
+
+
+# ---------------------------------------------------
+# SNAPSHOT STORAGE
+# ---------------------------------------------------
+def _scan_facet_items():
+    return scan_items(_ddb.Table(PORTS_TABLE), projection=FACET_FIELDS)
+
+
+def _read_snapshot(consistent=False):
+    """Returns (tree, version) or (None, None) if no snapshot exists yet."""
+    resp = _ddb.Table(META_TABLE).get_item(
+        Key={"id": FACETS_ID},
+        ConsistentRead=consistent,
+    )
+    item = resp.get("Item")
+    if not item:
+        return None, None
+    if "treeZ" in item:
+        return json.loads(zlib.decompress(bytes(item["treeZ"]))), int(item.get("version", 0))
+    return json.loads(item["tree"]), int(item.get("version", 0))
+
+
+def _dumps(tree):
+    return json.dumps(tree, separators=(",", ":"), sort_keys=True)
+
+
+def _trim(tree, target_bytes):
+    """Empty the largest pincode, then port, lists until the JSON is about target_bytes."""
+    size = len(_dumps(tree).encode())
+    leaves = sorted(
+        ((bucket, state, city) for state, cities in tree.items() for city in cities
+         for bucket in ("pincodes", "ports")),
+        key=lambda leaf: (leaf[0] != "pincodes", -len(tree[leaf[1]][leaf[2]][leaf[0]])))
+    dropped = 0
+    for bucket, state, city in leaves:
+        if size <= target_bytes:
+            break
+        values = tree[state][city][bucket]
+        size -= len(_dumps(values).encode()) - 2
+        dropped += len(values)
+        values.clear()
+    print(f"Facet snapshot too big: dropped {dropped} port/pincode values")
+
+
+def _tree_attrs(tree):
+    """{"tree": json} or, past MAX_SNAPSHOT_BYTES, {"treeZ": compressed json} (trimmed to fit)."""
+    text = _dumps(tree)
+    if len(text.encode()) <= MAX_SNAPSHOT_BYTES:
+        return {"tree": text}
+    packed = zlib.compress(text.encode(), 9)
+    while len(packed) > MAX_SNAPSHOT_BYTES:
+        ratio = len(packed) / len(text.encode())
+        _trim(tree, int(MAX_SNAPSHOT_BYTES / ratio * 0.9))
+        text = _dumps(tree)
+        packed = zlib.compress(text.encode(), 9)
+    print(f"Facet snapshot stored compressed: {len(text)} -> {len(packed)} bytes")
+    return {"treeZ": packed}
+
+
+def _write_snapshot(tree, expected_version):
+    """Conditional put so concurrent stream batches never lose an update."""
+    item = {
+        "id": FACETS_ID,
+        **_tree_attrs(tree),
+        "version": (expected_version or 0) + 1,
+        "updatedAt": int(time.time()),
+    }
+    if expected_version is None:
+        condition = {"ConditionExpression": "attribute_not_exists(id)"}
+    else:
+        condition = {
+            "ConditionExpression": "version = :v",
+            "ExpressionAttributeValues": {":v": expected_version},
+        }
+    _ddb.Table(META_TABLE).put_item(Item=item, **condition)
+
+
+def get_tree():
+    """
+    Facet tree for the API: in-container copy first, then one GetItem.
+    Without a snapshot (or meta table) the tree is built from a full
+    projected scan so the answer stays complete.
+    """
+    now = time.time()
+    if _cache["tree"] is not None and now - _cache["loaded_at"] < CACHE_TTL_SECONDS:
+        return _cache["tree"]
+
+    tree = None
+    if META_TABLE:
+        try:
+            tree, _ = _read_snapshot()
+        except ClientError as e:
+            print("Facet snapshot read failed", e)
+
+    if tree is None:
+        tree = build_tree(_scan_facet_items())
+
+    _cache["tree"] = tree
+    _cache["loaded_at"] = now
+    return tree
+
+
+def rebuild():
+    tree = build_tree(_scan_facet_items())
+    _, version = _read_snapshot(consistent=True)
+    _write_snapshot(tree, version)
+    return tree
+
+
+# ---------------------------------------------------
+# STREAM HANDLER (PortsTableV2 -> meta snapshot)
+# ---------------------------------------------------
+def _image(record, key):
+    image = (record.get("dynamodb") or {}).get(key)
+    if not image:
+        return None
+    return {k: _deserializer.deserialize(v) for k, v in image.items()}
+
+
+def _deltas(records):
+    """(item, delta) pairs for records that touch a facet attribute."""
+    out = []
+    for rec in records:
+        old = _image(rec, "OldImage")
+        new = _image(rec, "NewImage")
+        if old and new and _facet_key(old) == _facet_key(new):
+            continue
+        if old:
+            out.append((old, -1))
+        if new:
+            out.append((new, 1))
+    return out
+
+
+def stream_handler(event, context):
+    """
+    Apply a batch of ports-table stream records to the facet snapshot.
+    Invoke with {"rebuild": true} to recompute it from a full scan.
+    """
+    if event.get("rebuild"):
+        tree = rebuild()
+        return {"status": "rebuilt", "states": len(tree)}
+
+    deltas = _deltas(event.get("Records") or [])
+    if not deltas:
+        return {"status": "unchanged"}
+
+    for attempt in range(MAX_WRITE_ATTEMPTS):
+        tree, version = _read_snapshot(consistent=True)
+        try:
+            if tree is None:
+                # First run: the scan already reflects this batch
+                tree = build_tree(_scan_facet_items())
+            else:
+                for item, delta in deltas:
+                    apply_item(tree, item, delta)
+            _write_snapshot(tree, version)
+            return {"status": "ok", "applied": len(deltas)}
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            print("Facet snapshot changed underneath us, retrying", attempt + 1)
+            time.sleep(0.05 * (2 ** attempt))
+
+    raise RuntimeError("Could not update facet snapshot after retries")
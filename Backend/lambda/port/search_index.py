@@ -0,0 +1,200 @@
+import os
+import re
+import math
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+# In-memory ranked search over ports, built once per warm container.
+#
+#   postings:  term    -> {doc: weighted term frequency}   (BM25 ranking)
+#   vocab:     sorted terms, bisected for prefix (autocomplete) matches
+#   trigrams:  trigram -> {term}   candidate terms for typo tolerance
+#
+# A query token is matched exactly, by prefix (the token being typed) or
+# fuzzily ("huston" -> "houston"); each doc keeps the best-scoring
+# expansion per token and the token scores are summed.
+
+# Attributes indexed, with how much a hit in each counts
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "city": 2.0,
+    "pincode": 2.0,
+    "state": 1.5,
+    "port_type": 1.0,
+}
+
+# Attributes kept per doc (list view fields + port_type)
+DOC_FIELDS = ["id", "name", "country", "state", "city", "pincode", "image_url", "port_type"]
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+PREFIX_WEIGHT = 0.9       # "hous" -> "houston"
+FUZZY_WEIGHT = 0.8        # scaled further by trigram similarity
+MIN_TRIGRAM_SIMILARITY = 0.35
+MAX_PREFIX_TERMS = 50     # expansions considered for a very short prefix
+
+INDEX_TTL_SECONDS = int(os.environ.get("SEARCH_INDEX_TTL_SECONDS", "300"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(str(text or "").lower())
+
+
+def _trigrams(term):
+    padded = f"$${term}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance_within(a, b, limit):
+    """Levenshtein distance <= limit, with early exit."""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return False
+        prev = cur
+    return prev[-1] <= limit
+
+
+class SearchIndex:
+    """
+    Build from any iterable of port items (a table scan or a snapshot).
+    search()/suggest() return (doc, score) pairs, best first.
+    """
+
+    def __init__(self, items):
+        self.docs = []
+        self.postings = defaultdict(dict)
+        self.doc_len = []
+        self.trigrams = defaultdict(set)
+
+        for item in items:
+            doc = {k: item.get(k) for k in DOC_FIELDS}
+            idx = len(self.docs)
+            self.docs.append(doc)
+
+            length = 0.0
+            for field, weight in FIELD_WEIGHTS.items():
+                for term in tokenize(doc.get(field)):
+                    posting = self.postings[term]
+                    posting[idx] = posting.get(idx, 0.0) + weight
+                    length += weight
+            self.doc_len.append(length)
+
+        self.vocab = sorted(self.postings)
+        for term in self.vocab:
+            for tri in _trigrams(term):
+                self.trigrams[tri].add(term)
+
+        n = len(self.docs)
+        self.avg_len = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {
+            t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for t, p in self.postings.items()
+        }
+        self.built_at = time.time()
+
+    # -------------------- term expansion --------------------
+    def _prefix_terms(self, prefix):
+        out = []
+        i = bisect_left(self.vocab, prefix)
+        while i < len(self.vocab) and self.vocab[i].startswith(prefix):
+            out.append(self.vocab[i])
+            if len(out) >= MAX_PREFIX_TERMS:
+                break
+            i += 1
+        return out
+
+    def _fuzzy_terms(self, token):
+        """(term, similarity) for vocabulary terms close to token."""
+        grams = _trigrams(token)
+        shared = defaultdict(int)
+        for tri in grams:
+            for term in self.trigrams.get(tri, ()):
+                shared[term] += 1
+
+        limit = 1 if len(token) <= 5 else 2
+        out = []
+        for term, common in shared.items():
+            sim = common / (len(grams) + len(_trigrams(term)) - common)
+            if sim >= MIN_TRIGRAM_SIMILARITY and _edit_distance_within(token, term, limit):
+                out.append((term, sim))
+        return out
+
+    def _expand(self, token, allow_prefix):
+        """term -> weight for everything this query token may match."""
+        weights = {}
+        if token in self.postings:
+            weights[token] = 1.0
+        if allow_prefix:
+            for term in self._prefix_terms(token):
+                weights.setdefault(term, PREFIX_WEIGHT)
+        if not weights and len(token) >= 3:
+            for term, sim in self._fuzzy_terms(token):
+                weights[term] = FUZZY_WEIGHT * sim
+        return weights
+
+    # -------------------- scoring --------------------
+    def _bm25(self, term, idx):
+        tf = self.postings[term][idx]
+        norm = 1 - BM25_B + BM25_B * (self.doc_len[idx] / self.avg_len if self.avg_len else 1)
+        return self.idf[term] * (tf * (BM25_K1 + 1)) / (tf + BM25_K1 * norm)
+
+    def _score(self, tokens, prefix_last):
+        scores = defaultdict(float)
+        matched = defaultdict(int)
+        for pos, token in enumerate(tokens):
+            allow_prefix = prefix_last and pos == len(tokens) - 1
+            best = {}
+            for term, weight in self._expand(token, allow_prefix).items():
+                for idx in self.postings[term]:
+                    s = weight * self._bm25(term, idx)
+                    if s > best.get(idx, 0.0):
+                        best[idx] = s
+            for idx, s in best.items():
+                scores[idx] += s
+                matched[idx] += 1
+
+        # Docs matching every token outrank partial matches
+        n = len(tokens)
+        return {idx: s * (matched[idx] / n) for idx, s in scores.items()}
+
+    def search(self, query, limit=None, prefix_last=True):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        scored = self._score(tokens, prefix_last)
+        ranked = sorted(scored.items(), key=lambda kv: (-kv[1], self.docs[kv[0]].get("name") or ""))
+        if limit:
+            ranked = ranked[:limit]
+        return [(self.docs[idx], round(score, 4)) for idx, score in ranked]
+
+    def suggest(self, prefix, limit=10):
+        """Autocomplete: earlier tokens complete, the last one a prefix."""
+        return self.search(prefix, limit=limit, prefix_last=True)
+
+
+_cached = {"index": None}
+
+
+def get_index(load_items):
+    """
+    Per-container index, rebuilt after SEARCH_INDEX_TTL_SECONDS.
+    load_items: callable returning an iterable of port items.
+    """
+    index = _cached["index"]
+    if index is None or time.time() - index.built_at > INDEX_TTL_SECONDS:
+        t0 = time.perf_counter()
+        index = SearchIndex(load_items())
+        _cached["index"] = index
+        print(f"Search index built: {len(index.docs)} ports, {len(index.vocab)} terms "
+              f"in {time.perf_counter() - t0:.3f}s")
+    return index
@@ -2,11 +2,17 @@
 
 import json
 import os
+import time
+import random
 import logging
-from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
 
 import boto3
 
+from responses import dumps, json_response, error_response
+import rate_cards
+import route_graph
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
@@ -15,16 +21,150 @@ dynamodb = boto3.resource("dynamodb")
 ONLOAD_TABLE_NAME = os.environ.get("ONLOAD_TABLE")
 OFFLOAD_TABLE_NAME = os.environ.get("OFFLOAD_TABLE")
 
+# Batch quotes: {"requests": [{"mode", "route"}, ...]}
+MAX_BATCH_ROUTES = 100
+BATCH_GET_LIMIT = 100      # keys per BatchGetItem call
+BATCH_WORKERS = 4
+MAX_ATTEMPTS = 5
+
+
+def _table_for(mode):
+    return {"onload": ONLOAD_TABLE_NAME, "offload": OFFLOAD_TABLE_NAME}.get(mode)
+
+
+def _option(item):
+    """Either store a single option or an array of options in the item.
+    Here we build a single option from top-level attributes."""
+    return {
+        "carrier":      item.get("carrier", "Carrier"),
+        "vehicle_type": item.get("vehicle_type", "Truck"),
+        "price":        item.get("price"),
+        "currency":     item.get("currency", "INR"),
+        "transit_days": item.get("transit_days"),
+        "notes":        item.get("notes", "")
+    }
 
-def _decimal_to_float(obj):
-    """Recursively convert Decimal to float for JSON serialization."""
-    if isinstance(obj, list):
-        return [_decimal_to_float(x) for x in obj]
-    if isinstance(obj, dict):
-        return {k: _decimal_to_float(v) for k, v in obj.items()}
-    if isinstance(obj, Decimal):
-        return float(obj)
-    return obj
+
+def _composed_option(path):
+    """Option for a stored multi-leg path; legs carry the per-leg breakdown."""
+    legs = path["legs"]
+    via = [leg["route"].split(route_graph.ROUTE_SEPARATOR, 1)[-1] for leg in legs[:-1]]
+    return {
+        "carrier":      " + ".join(dict.fromkeys(leg["carrier"] for leg in legs)),
+        "vehicle_type": " + ".join(dict.fromkeys(leg["vehicle_type"] for leg in legs)),
+        "price":        path["price"],
+        "currency":     path["currency"],
+        "transit_days": path["transit_days"],
+        "notes":        f"{len(legs)} legs via {', '.join(via)} ({' & '.join(path['kind'])})",
+        "legs":         legs,
+    }
+
+
+def _options(table_name, route, item):
+    """
+    The route's own rate card option, plus precomputed multi-leg options
+    when there is none or they beat it on price or transit time.
+    """
+    options = [_option(item)] if item else []
+    try:
+        paths = route_graph.composed(table_name, route)
+    except Exception as e:
+        logger.exception("Route graph lookup failed for route '%s': %s", route, e)
+        paths = []
+
+    def beats_direct(path):
+        if not item:
+            return True
+        price, transit = item.get("price"), item.get("transit_days")
+        if path["currency"] == item.get("currency", "INR") and price is not None and path["price"] < price:
+            return True
+        return transit is not None and path["transit_days"] is not None and path["transit_days"] < transit
+
+    options.extend(_composed_option(p) for p in paths if beats_direct(p))
+    return options
+
+
+def _batch_get(table_name, routes):
+    """{route: item} for up to BATCH_GET_LIMIT routes of one table."""
+    client = dynamodb.meta.client
+    request = {"Keys": [{"route": r} for r in routes]}
+    found = {}
+    for attempt in range(MAX_ATTEMPTS):
+        resp = client.batch_get_item(RequestItems={table_name: request})
+        for item in resp.get("Responses", {}).get(table_name, []):
+            found[item["route"]] = item
+        pending = (resp.get("UnprocessedKeys") or {}).get(table_name)
+        if not pending:
+            return found
+        request = pending
+        time.sleep(0.05 * (2 ** attempt) * (1 + random.random()))
+    raise RuntimeError(f"{len(request['Keys'])} routes still unprocessed in {table_name}")
+
+
+def batch_quotes(requests):
+    """
+    Results in request order, each {"index", "mode", "route"} plus
+    "found" and "options", or "error" for an invalid entry. Routes are
+    grouped per table and de-duplicated; those the rate card copy lacks
+    are fetched with concurrent BatchGetItem calls.
+    """
+    results = []
+    wanted = {}   # table -> set of routes
+    for i, req in enumerate(requests):
+        req = req if isinstance(req, dict) else {}
+        mode = str(req.get("mode") or "onload").lower()
+        route = str(req.get("route") or "").strip()
+        entry = {"index": i, "mode": mode, "route": route}
+        table_name = _table_for(mode)
+        if mode not in ("onload", "offload"):
+            entry["error"] = f"Unsupported mode '{mode}'"
+        elif not route:
+            entry["error"] = "Missing 'route'"
+        elif not table_name:
+            entry["error"] = "Server configuration error (missing table name)"
+        else:
+            wanted.setdefault(table_name, set()).add(route)
+            entry["table"] = table_name
+        results.append(entry)
+
+    items = {}
+    jobs = []
+    for table_name, routes in wanted.items():
+        cached, missing = rate_cards.lookup_many(table_name, sorted(routes))
+        for route, item in cached.items():
+            items[(table_name, route)] = item
+        jobs.extend((table_name, missing[i:i + BATCH_GET_LIMIT])
+                    for i in range(0, len(missing), BATCH_GET_LIMIT))
+    if jobs:
+        with ThreadPoolExecutor(max_workers=min(len(jobs), BATCH_WORKERS)) as pool:
+            for (table_name, _), found in zip(jobs, pool.map(lambda j: _batch_get(*j), jobs)):
+                rate_cards.remember(table_name, found)
+                for route, item in found.items():
+                    items[(table_name, route)] = item
+
+    for entry in results:
+        table_name = entry.pop("table", None)
+        if table_name is None:
+            continue
+        item = items.get((table_name, entry["route"]))
+        entry["options"] = _options(table_name, entry["route"], item)
+        entry["found"] = bool(entry["options"])
+    return results
+
+
+def handle_batch(requests):
+    if not isinstance(requests, list) or not requests:
+        return error_response("'requests' must be a non-empty list of {mode, route}", 400)
+    if len(requests) > MAX_BATCH_ROUTES:
+        return error_response(f"At most {MAX_BATCH_ROUTES} routes per request", 400)
+    try:
+        results = batch_quotes(requests)
+    except Exception as e:
+        logger.exception("Batch price lookup failed: %s", e)
+        return error_response("Failed to fetch prices", 500)
+    logger.info("Batch quotes: %d requested, %d found; rate cards %s", len(results),
+                sum(1 for r in results if r.get("found")), rate_cards.stats())
+    return json_response({"results": results}, methods="OPTIONS,POST", allow_headers="*")
 
 
 def lambda_handler(event, context):
@@ -39,22 +179,18 @@ def lambda_handler(event, context):
             body = json.loads(body)
         except json.JSONDecodeError:
             logger.error("Failed to parse event body as JSON: %s", body)
-            return {
-                "statusCode": 400,
-                "headers": {"Content-Type": "application/json"},
-                "body": json.dumps({"error": "Invalid JSON body"})
-            }
+            return error_response("Invalid JSON body", 400)
 
     if not isinstance(body, dict):
         logger.error("Missing or invalid body: %s", body)
-        return {
-            "statusCode": 400,
-            "headers": {"Content-Type": "application/json"},
-            "body": json.dumps({"error": "Missing request body"})
-        }
+        return error_response("Missing request body", 400)
 
     logger.info("Parsed request body: %s", json.dumps(body))
 
+    # Several {mode, route} pairs in one call
+    if "requests" in body:
+        return handle_batch(body["requests"])
+
     mode = (body.get("mode") or "onload").lower()
     route = (body.get("route") or "").strip()
     country = body.get("country")
@@ -66,86 +202,39 @@ def lambda_handler(event, context):
                 mode, route, country, state, city, port)
 
     # 3. Decide which table to use
-    if mode == "onload":
-        table_name = ONLOAD_TABLE_NAME
-    elif mode == "offload":
-        table_name = OFFLOAD_TABLE_NAME
-    else:
+    if mode not in ("onload", "offload"):
         logger.error("Unsupported mode: %s", mode)
-        return {
-            "statusCode": 400,
-            "headers": {"Content-Type": "application/json"},
-            "body": json.dumps({"error": f"Unsupported mode '{mode}'"})
-        }
+        return error_response(f"Unsupported mode '{mode}'", 400)
+    table_name = _table_for(mode)
 
     logger.info("Resolved DynamoDB table for mode '%s': %s", mode, table_name)
 
     if not table_name:
         logger.error("Table name for mode '%s' is not configured in environment", mode)
-        return {
-            "statusCode": 500,
-            "headers": {"Content-Type": "application/json"},
-            "body": json.dumps({"error": "Server configuration error (missing table name)"})
-        }
+        return error_response("Server configuration error (missing table name)", 500)
 
     if not route:
         logger.error("Route is empty. The frontend should send 'route'.")
-        return {
-            "statusCode": 400,
-            "headers": {"Content-Type": "application/json"},
-            "body": json.dumps({"error": "Missing 'route' in request"})
-        }
-
-    # 4. Query / get item from DynamoDB
-    table = dynamodb.Table(table_name)
-
-    logger.info("Attempting DynamoDB get_item with key: { route: '%s' }", route)
+        return error_response("Missing 'route' in request", 400)
 
+    # 4. Rate card copy, then get_item for routes it doesn't have
     try:
-        resp = table.get_item(Key={"route": route})
+        item, source = rate_cards.lookup(table_name, route)
     except Exception as e:
         logger.exception("DynamoDB get_item failed for route '%s': %s", route, e)
-        return {
-            "statusCode": 500,
-            "headers": {"Content-Type": "application/json"},
-            "body": json.dumps({"error": "Failed to fetch prices"})
-        }
-
-    logger.info("Raw DynamoDB response: %s", json.dumps(_decimal_to_float(resp)))
-
-    item = resp.get("Item")
+        return error_response("Failed to fetch prices", 500)
 
     if not item:
         logger.info("No item found in table '%s' for route '%s'", table_name, route)
-        options = []
     else:
-        logger.info("Item found in table '%s' for route '%s': %s", table_name, route, json.dumps(_decimal_to_float(item)))
-
-        # Either store a single option or an array of options in the item.
-        # Here we build a single option from top-level attributes.
-        option = {
-            "carrier":      item.get("carrier", "Carrier"),
-            "vehicle_type": item.get("vehicle_type", "Truck"),
-            "price":        item.get("price"),
-            "currency":     item.get("currency", "INR"),
-            "transit_days": item.get("transit_days"),
-            "notes":        item.get("notes", "")
-        }
-
-        options = [ _decimal_to_float(option) ]
+        logger.debug("Item found in table '%s' for route '%s': %s", table_name, route, dumps(item))
+    options = _options(table_name, route, item)
 
     # 5. Final response
-    logger.info("Final options to return to client: %s", json.dumps(options))
+    logger.info("Route '%s' answered from %s; rate cards %s", route, source, rate_cards.stats())
 
     # `onoff.js` understands either an array or { options: [...] }.
     # We'll return a plain array.
-    return {
-        "statusCode": 200,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",   # you can tighten this later
-            "Access-Control-Allow-Headers": "*",
-            "Access-Control-Allow-Methods": "OPTIONS,POST"
-        },
-        "body": json.dumps(options)
-    }
+    return json_response(options, methods="OPTIONS,POST", allow_headers="*",
+                         headers={"X-Rate-Card-Cache": "hit" if source == "cache" else "miss"},
+                         expose="X-Rate-Card-Cache")
@@ -0,0 +1,138 @@
+"""
+Per-container copy of the onload/offload rate cards.
+
+The price tables are small and read-mostly, so a warm container keeps
+each one as a {route: item} dict, loaded with one parallel scan:
+
+- every VERSION_CHECK_SECONDS one GetItem reads the table's version
+  stamp; a changed stamp reloads the table
+- after RATE_CARD_TTL_SECONDS the table is reloaded regardless, which
+  also covers tables that have no stamp
+- a route missing from the copy falls back to GetItem (and is kept when
+  found), so new rate cards are answered before the next reload
+- a failed load is retried after VERSION_CHECK_SECONDS, not on every
+  request; meanwhile the previous copy (or GetItem) answers
+
+Whoever edits a rate table bumps the stamp item:
+
+    {"route": "#version", "version": <n>}
+
+hits/misses/loads are counted per container; stats() returns them for
+the request log.
+"""
+import os
+import time
+import logging
+
+import boto3
+
+from scan_engine import scan_items
+
+logger = logging.getLogger()
+
+VERSION_ROUTE = "#version"
+TTL_SECONDS = int(os.environ.get("RATE_CARD_TTL_SECONDS", "900"))
+VERSION_CHECK_SECONDS = int(os.environ.get("RATE_CARD_VERSION_CHECK_SECONDS", "30"))
+
+_ddb = boto3.resource("dynamodb")
+
+_cards = {}   # table name -> RateCard
+_failed_at = {}   # table name -> time of the last failed load
+_stats = {"hits": 0, "misses": 0, "fallbackFound": 0, "loads": 0, "versionChecks": 0}
+
+
+class RateCard:
+    """One table's routes, as of its version stamp when it was loaded."""
+
+    def __init__(self, table_name):
+        self.table_name = table_name
+        self.routes = {}
+        self.version = None
+        t0 = time.perf_counter()
+        version = _read_version(table_name)
+        for item in scan_items(_ddb.Table(table_name)):
+            if item.get("route") != VERSION_ROUTE:
+                self.routes[item["route"]] = item
+        self.version = version
+        self.loaded_at = self.checked_at = time.time()
+        _stats["loads"] += 1
+        logger.info("Rate card %s loaded: %d routes, version %s in %.3fs",
+                    table_name, len(self.routes), version, time.perf_counter() - t0)
+
+
+def _read_version(table_name):
+    item = _ddb.Table(table_name).get_item(Key={"route": VERSION_ROUTE}).get("Item")
+    return item.get("version") if item else None
+
+
+def _is_current(card, now):
+    if now - card.loaded_at > TTL_SECONDS:
+        return False
+    if now - card.checked_at > VERSION_CHECK_SECONDS:
+        _stats["versionChecks"] += 1
+        if _read_version(card.table_name) != card.version:
+            return False
+        card.checked_at = now
+    return True
+
+
+def get_card(table_name):
+    """The table's current RateCard, or None when it can't be loaded."""
+    card = _cards.get(table_name)
+    now = time.time()
+    if now - _failed_at.get(table_name, 0) < VERSION_CHECK_SECONDS:
+        return card
+    try:
+        if card is None or not _is_current(card, now):
+            card = _cards[table_name] = RateCard(table_name)
+    except Exception as e:
+        # Serve the previous copy (or plain GetItems) rather than fail
+        _failed_at[table_name] = now
+        logger.exception("Rate card %s refresh failed: %s", table_name, e)
+    return card
+
+
+def lookup(table_name, route):
+    """(item or None, "cache" | "table") for one route."""
+    if route == VERSION_ROUTE:
+        return None, "cache"
+    found, missing = lookup_many(table_name, [route])
+    if not missing:
+        return found[route], "cache"
+    item = _ddb.Table(table_name).get_item(Key={"route": route}).get("Item")
+    remember(table_name, {route: item} if item else {})
+    return item, "table"
+
+
+def lookup_many(table_name, routes):
+    """
+    ({route: item} answered from the copy, [routes it doesn't have]).
+    Callers fetch the missing ones and pass what they find to remember().
+    The version stamp is in neither: it is not a route.
+    """
+    card = get_card(table_name)
+    known = card.routes if card else {}
+    found, missing = {}, []
+    for route in routes:
+        if route == VERSION_ROUTE:
+            continue
+        item = known.get(route)
+        if item is None:
+            missing.append(route)
+        else:
+            found[route] = item
+    _stats["hits"] += len(found)
+    _stats["misses"] += len(missing)
+    return found, missing
+
+
+def remember(table_name, items):
+    """Keep routes found by a fallback read until the next reload."""
+    _stats["fallbackFound"] += len(items)
+    card = _cards.get(table_name)
+    if card:
+        card.routes.update(items)
+
+
+def stats():
+    return dict(_stats, tables={name: len(card.routes) for name, card in _cards.items()})
@@ -0,0 +1,51 @@
+import boto3
+
+import route_graph
+from scan_engine import ParallelScan
+
+# Rebuilds the multi-leg route matrix (route_graph) of a price table when
+# its stream reports a change, then bumps the table's rate card version
+# stamp so warm price lambdas reload their copy.
+
+_ddb = boto3.resource("dynamodb")
+
+
+def _table_name(record):
+    # arn:aws:dynamodb:<region>:<account>:table/<name>/stream/<label>
+    return record["eventSourceARN"].split(":table/", 1)[1].split("/", 1)[0]
+
+
+def _route(record):
+    return (((record.get("dynamodb") or {}).get("Keys") or {}).get("route") or {}).get("S")
+
+
+def rebuild(table_name):
+    table = _ddb.Table(table_name)
+    scan = ParallelScan(table)
+    matrix = route_graph.build_matrix(scan)
+    version = route_graph.store(table_name, matrix)
+    table.update_item(
+        Key={"route": route_graph.VERSION_ROUTE},
+        UpdateExpression="ADD #v :one",
+        ExpressionAttributeNames={"#v": "version"},
+        ExpressionAttributeValues={":one": 1},
+    )
+    paths = sum(len(p) for dests in matrix.values() for p in dests.values())
+    print(f"Route graph {table_name}: {len(matrix)} origins, {paths} multi-leg paths, "
+          f"version {version}; {scan.summary()}")
+    return {"origins": len(matrix), "paths": paths, "version": version}
+
+
+def handler(event, context):
+    """
+    Stream records -> one rebuild per changed table. Invoke with
+    {"rebuild": true, "table": "<price table>"} to rebuild by hand.
+    """
+    if event.get("rebuild"):
+        return {"status": "rebuilt", **rebuild(event["table"])}
+
+    # The stamp bump below comes back on the stream; it isn't a rate change
+    changed = {_table_name(rec) for rec in event.get("Records") or []
+               if _route(rec) != route_graph.VERSION_ROUTE}
+    results = {name: rebuild(name) for name in sorted(changed)}
+    return {"status": "ok", "tables": results}
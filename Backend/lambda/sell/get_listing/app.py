@@ -1,43 +1,21 @@
-import json
 import boto3
 import os
-from decimal import Decimal
+
+from listings import public_view
+from responses import json_response, error_response
 
 dynamodb = boto3.resource("dynamodb")
 table = dynamodb.Table(os.environ["TABLE_NAME"])
 
-def decimal_to_native(obj):
-    if isinstance(obj, list):
-        return [decimal_to_native(i) for i in obj]
-    if isinstance(obj, dict):
-        return {k: decimal_to_native(v) for k, v in obj.items()}
-    if isinstance(obj, Decimal):
-        return float(obj)
-    return obj
-
 def handler(event, context):
     listing_id = event["pathParameters"].get("listingId")
 
     if not listing_id:
-        return {
-            "statusCode": 400,
-            "headers": {"Access-Control-Allow-Origin": "*"},
-            "body": json.dumps({"message": "listingId is required"})
-        }
+        return error_response("listingId is required", 400, key="message")
 
     response = table.get_item(Key={"listingId": listing_id})
 
     if "Item" not in response:
-        return {
-            "statusCode": 404,
-            "headers": {"Access-Control-Allow-Origin": "*"},
-            "body": json.dumps({"message": "Listing not found"})
-        }
-
-    item = decimal_to_native(response["Item"])
+        return error_response("Listing not found", 404, key="message")
 
-    return {
-        "statusCode": 200,
-        "headers": {"Access-Control-Allow-Origin": "*"},
-        "body": json.dumps(item)
-    }
+    return json_response(public_view(response["Item"]))
@@ -1,4 +1,5 @@
 import os, json, boto3, uuid
+from responses import json_response, error_response
 s3 = boto3.client('s3')
 BUCKET = os.environ['BUCKET_NAME']
 
@@ -10,6 +11,6 @@ def handler(event, context):
         key = f"rent-media/{uuid.uuid4()}-{filename}"
         url = s3.generate_presigned_url('put_object', Params={'Bucket': BUCKET, 'Key': key, 'ContentType': contentType}, ExpiresIn=3600)
         public_url = f"https://{BUCKET}.s3.amazonaws.com/{key}"
-        return { 'statusCode': 200, 'headers': { 'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*' }, 'body': json.dumps({ 'uploadUrl': url, 'publicUrl': public_url }) }
+        return json_response({ 'uploadUrl': url, 'publicUrl': public_url })
     except Exception as e:
-        return { 'statusCode': 400, 'headers': { 'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*' }, 'body': json.dumps({ 'error': str(e) }) }
\ No newline at end of file
+        return error_response(str(e), 400)
\ No newline at end of file
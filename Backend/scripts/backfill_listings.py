@@ -0,0 +1,221 @@
+"""
+Backfill existing rent/sell listings with the attributes the list
+handlers now query on:
+
+  entity                      GSI_Recent partition (newest-first list)
+  size/condition              stored as trimmed strings, empty values removed
+  priceNum                    numeric price (GSI_Price & co.; --price-field)
+  lat/lon/geohash/geoCell     geocoded location (GSI_Geo, near= searches)
+  searchText/locationLc/...   write-time normalised search fields
+
+Rows already at listings.SEARCH_VERSION are skipped. Segments are
+scanned in parallel; after every page each segment's position is saved
+to a checkpoint file, so an interrupted run picks up where it stopped.
+
+When every segment is done the run records the search version in the
+meta table (listings.backfill_id). The list handlers read through the
+GSIs only once that marker is there and scan the table until then, so
+run this after each deploy that adds an index or bumps SEARCH_VERSION
+(on a new, empty stack too):
+
+    python Backend/scripts/backfill_listings.py --table <stack>-RentListings --meta-table <stack>-meta
+    python Backend/scripts/backfill_listings.py --table <stack>-SellListings --dry-run
+
+The price field defaults to dailyRate for a *RentListings table and
+price otherwise.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from boto3.dynamodb.conditions import Attr, ConditionExpressionBuilder
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+# Shared lambda code (listing helpers)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda", "common"))
+import listings  # noqa: E402
+
+DONE = "done"
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def needs_backfill():
+    cond = (Attr("entity").not_exists()
+            | Attr("searchVersion").not_exists()
+            | Attr("searchVersion").lt(listings.SEARCH_VERSION))
+    for f in ("size", "condition"):
+        cond = cond | Attr(f).eq("") | Attr(f).attribute_type("NULL")
+    return cond
+
+
+def backfill_item(table, item, price_field):
+    """
+    Write the attributes prepare_listing() would have stored.
+    Returns True if the item was updated (False if it vanished meanwhile).
+    """
+    fixed = listings.prepare_listing(item, price_field)
+    names, values, sets, removes = {}, {}, [], []
+    for i, (k, v) in enumerate(sorted(fixed.items())):
+        if item.get(k) != v:
+            names[f"#s{i}"] = k
+            values[f":s{i}"] = v
+            sets.append(f"#s{i} = :s{i}")
+    for i, k in enumerate(sorted(set(item) - set(fixed))):
+        names[f"#r{i}"] = k
+        removes.append(f"#r{i}")
+    if not sets and not removes:
+        return False
+
+    expr = ""
+    if sets:
+        expr += "SET " + ", ".join(sets)
+    if removes:
+        expr += " REMOVE " + ", ".join(removes)
+    kwargs = {"ExpressionAttributeNames": names}
+    if values:
+        kwargs["ExpressionAttributeValues"] = values
+    try:
+        table.update_item(
+            Key={"listingId": item["listingId"]},
+            UpdateExpression=expr.strip(),
+            ConditionExpression="attribute_exists(listingId)",
+            **kwargs,
+        )
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return False
+        raise
+
+
+# ---------------------------------------------------
+# CHECKPOINTS
+# ---------------------------------------------------
+class Checkpoint:
+    """
+    {"table", "segments", "positions": {segment: typed key | "done"},
+     "scanned", "updated"} in a JSON file, rewritten after every page.
+    """
+
+    def __init__(self, path, table, segments):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = {"table": table, "segments": segments, "positions": {},
+                      "scanned": 0, "updated": 0}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as fp:
+                saved = json.load(fp)
+            if saved.get("table") != table or saved.get("segments") != segments:
+                raise SystemExit(f"{path} belongs to another run "
+                                 f"({saved.get('table')}, {saved.get('segments')} segments)")
+            self.state = saved
+
+    def start_key(self, segment):
+        pos = self.state["positions"].get(str(segment))
+        if pos is None or pos == DONE:
+            return pos
+        return {k: _deserializer.deserialize(v) for k, v in pos.items()}
+
+    def advance(self, segment, last_key, scanned, updated):
+        with self.lock:
+            self.state["positions"][str(segment)] = (
+                {k: _serializer.serialize(v) for k, v in last_key.items()} if last_key else DONE)
+            self.state["scanned"] += scanned
+            self.state["updated"] += updated
+            if self.path:
+                tmp = self.path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as fp:
+                    json.dump(self.state, fp)
+                os.replace(tmp, self.path)
+
+
+def run_segment(table, segment, segments, checkpoint, dry_run, price_field):
+    start_key = checkpoint.start_key(segment)
+    if start_key == DONE:
+        return
+
+    # Rendered once per segment: the client's condition builder isn't thread-safe
+    built = ConditionExpressionBuilder().build_expression(needs_backfill())
+    kwargs = {
+        "TableName": table.name,
+        "Segment": segment,
+        "TotalSegments": segments,
+        "FilterExpression": built.condition_expression,
+        "ExpressionAttributeNames": built.attribute_name_placeholders,
+        "ExpressionAttributeValues": built.attribute_value_placeholders,
+    }
+    if start_key:
+        kwargs["ExclusiveStartKey"] = start_key
+
+    client = table.meta.client
+    while True:
+        resp = client.scan(**kwargs)
+        updated = 0
+        for item in resp.get("Items", []):
+            if not dry_run and backfill_item(table, item, price_field):
+                updated += 1
+        last_key = resp.get("LastEvaluatedKey")
+        checkpoint.advance(segment, last_key, resp.get("ScannedCount", 0),
+                           len(resp.get("Items", [])) if dry_run else updated)
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--table", required=True)
+    ap.add_argument("--segments", type=int, default=4)
+    ap.add_argument("--price-field", help="attribute holding the price (default: by table name)")
+    ap.add_argument("--meta-table", help="meta table for the completion marker (required unless --dry-run)")
+    ap.add_argument("--checkpoint", help="progress file (default: .backfill-<table>.json)")
+    ap.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    ap.add_argument("--dry-run", action="store_true",
+                    help="count rows needing backfill without writing (no checkpoint)")
+    args = ap.parse_args(argv)
+    if not args.dry_run and not args.meta_table:
+        ap.error("--meta-table is required to record the finished backfill")
+
+    path = None if args.dry_run else (args.checkpoint or f".backfill-{args.table}.json")
+    if path and args.restart and os.path.exists(path):
+        os.remove(path)
+
+    price_field = args.price_field or ("dailyRate" if args.table.endswith("RentListings") else "price")
+    table = boto3.resource("dynamodb").Table(args.table)
+    checkpoint = Checkpoint(path, args.table, args.segments)
+    t0 = time.time()
+
+    with ThreadPoolExecutor(max_workers=args.segments) as pool:
+        futures = [pool.submit(run_segment, table, seg, args.segments, checkpoint,
+                               args.dry_run, price_field)
+                   for seg in range(args.segments)]
+        for fut in futures:
+            fut.result()
+
+    state = checkpoint.state
+    verb = "need backfill" if args.dry_run else "updated"
+    print(f"{args.table}: {state['scanned']} scanned, {state['updated']} {verb} "
+          f"in {time.time() - t0:.1f}s")
+    if not args.dry_run:
+        boto3.resource("dynamodb").Table(args.meta_table).put_item(Item={
+            "id": listings.backfill_id(args.table),
+            "searchVersion": listings.SEARCH_VERSION,
+            "finishedAt": int(time.time()),
+        })
+        print(f"Recorded search version {listings.SEARCH_VERSION} in {args.meta_table}; "
+              f"list handlers now read the GSIs")
+    if path:
+        print(f"Checkpoint {path} complete; delete it (or pass --restart) to run again")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
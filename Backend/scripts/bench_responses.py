@@ -0,0 +1,143 @@
+"""
+Micro-benchmark: the per-handler Decimal converters + json.dumps that
+the lambdas used to run, against the shared single-pass encoder in
+lambda/common/responses.py (orjson and stdlib paths).
+
+    python Backend/scripts/bench_responses.py --items 10000 --repeat 5
+
+orjson is what the layer ships; the stdlib case is the fallback and
+lands within noise of the float-only converters (faster or slower
+depending on the machine), so only the orjson row is the speed-up.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda", "common"))
+import responses  # noqa: E402
+
+
+# ---------------------------------------------------
+# PREVIOUS CONVERTERS (as they were in each handler)
+# ---------------------------------------------------
+def _convert_decimals(obj):
+    """list_listing/app.py"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    if isinstance(obj, dict):
+        return {k: _convert_decimals(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_convert_decimals(i) for i in obj]
+    if isinstance(obj, set):
+        return [_convert_decimals(i) for i in list(obj)]
+    if isinstance(obj, bytes):
+        try:
+            return obj.decode("utf-8")
+        except Exception:
+            return str(obj)
+    return obj
+
+
+def decimal_to_native(obj):
+    """get_listing/app.py"""
+    if isinstance(obj, list):
+        return [decimal_to_native(i) for i in obj]
+    if isinstance(obj, dict):
+        return {k: decimal_to_native(v) for k, v in obj.items()}
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return obj
+
+
+def _decimal_to_float(obj):
+    """price/app.py"""
+    if isinstance(obj, list):
+        return [_decimal_to_float(x) for x in obj]
+    if isinstance(obj, dict):
+        return {k: _decimal_to_float(v) for k, v in obj.items()}
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return obj
+
+
+def decimal_to_python(obj):
+    """news/app.py"""
+    if isinstance(obj, list):
+        return [decimal_to_python(i) for i in obj]
+    if isinstance(obj, dict):
+        return {k: decimal_to_python(v) for k, v in obj.items()}
+    if isinstance(obj, Decimal):
+        return int(obj)
+    return obj
+
+
+# ---------------------------------------------------
+# PAYLOAD
+# ---------------------------------------------------
+def make_listing(i, rng):
+    """Roughly the shape of a container listing as boto3 returns it."""
+    return {
+        "listingId": f"{rng.getrandbits(64):016x}-{i}",
+        "title": f"40ft High Cube container #{i}",
+        "size": rng.choice(["20ft", "40ft", "40ft HC", "45ft"]),
+        "condition": rng.choice(["new", "cargo-worthy", "wind-water-tight", "as-is"]),
+        "location": rng.choice(["Mumbai", "Chennai", "Kolkata", "Mundra", "Kochi"]),
+        "description": "One-trip container, CSC plated, lockbox fitted. " * 3,
+        "specs": "Tare 3,800 kg; max gross 30,480 kg; internal 12.03 x 2.35 x 2.69 m",
+        "images": [f"https://example.com/rent-media/{i}-{n}.jpg" for n in range(3)],
+        "dailyRate": Decimal(str(round(rng.uniform(200, 2500), 2))),
+        "price": Decimal(rng.randrange(90000, 450000)),
+        "createdAt": Decimal(1700000000 + i),
+        "tags": {"reefer", "ocean"} if i % 7 == 0 else {"dry"},
+        "dims": {"l": Decimal("12.03"), "w": Decimal("2.35"), "h": Decimal("2.69")},
+    }
+
+
+def _time(fn, repeat):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, len(out)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--items", type=int, default=10000)
+    ap.add_argument("--repeat", type=int, default=5, help="best of N runs")
+    args = ap.parse_args(argv)
+
+    rng = random.Random(42)
+    items = [make_listing(i, rng) for i in range(args.items)]
+    # float-only converters can't handle the set attribute; give them a copy without it
+    no_sets = [{k: v for k, v in it.items() if k != "tags"} for it in items]
+
+    cases = [
+        ("_convert_decimals + json.dumps", lambda: json.dumps({"items": [_convert_decimals(i) for i in items]})),
+        ("decimal_to_native + json.dumps", lambda: json.dumps({"items": decimal_to_native(no_sets)})),
+        ("_decimal_to_float + json.dumps", lambda: json.dumps({"items": _decimal_to_float(no_sets)})),
+        ("decimal_to_python + json.dumps", lambda: json.dumps({"items": decimal_to_python(no_sets)})),
+        ("responses (stdlib encoder)", lambda: responses._std_dumps({"items": items})),
+    ]
+    if responses.orjson is not None:
+        cases.append(("responses (orjson)", lambda: responses.dumps({"items": items})))
+    else:
+        print("orjson not installed; skipping the orjson case")
+
+    print(f"{args.items} listings, best of {args.repeat}")
+    baseline = None
+    for name, fn in cases:
+        seconds, size = _time(fn, args.repeat)
+        baseline = baseline or seconds
+        print(f"  {name:34s} {seconds * 1000:8.1f} ms  {size / 1e6:6.2f} MB  x{baseline / seconds:4.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
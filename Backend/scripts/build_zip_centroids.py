@@ -0,0 +1,87 @@
+"""
+Rebuild geodata/us_zip_centroids.csv (CommonLayer) from the Census
+Bureau's ZCTA Gazetteer: one internal point per ZIP Code Tabulation
+Area, ~33k rows.
+
+    python Backend/scripts/build_zip_centroids.py
+    python Backend/scripts/build_zip_centroids.py --source 2023_Gaz_zcta_national.zip
+
+The deploy workflow runs this before `sam build`, so the layer always
+ships the full table. Without it, geo.zip_centroid falls back to the
+representative points in geodata/us_zip_prefixes.csv for unlisted ZIPs.
+--source reads a downloaded .zip or extracted .txt instead of fetching.
+Exits non-zero (leaving the old table in place) if the file can't be
+read or looks truncated.
+"""
+import io
+import os
+import csv
+import sys
+import zipfile
+import argparse
+import urllib.request
+
+GAZETTEER_URL = ("https://www2.census.gov/geo/docs/maps-data/data/gazetteer/"
+                 "2023_Gazetteer/2023_Gaz_zcta_national.zip")
+OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                      "..", "lambda", "common", "geodata", "us_zip_centroids.csv")
+
+# Well under the ~33.7k ZCTAs; fewer means a partial download
+MIN_ROWS = 30000
+
+
+def read_gazetteer(raw):
+    """Gazetteer bytes (.zip or tab-separated .txt) -> {zip: (lat, lon)}."""
+    if raw[:2] == b"PK":
+        with zipfile.ZipFile(io.BytesIO(raw)) as zf:
+            name = next(n for n in zf.namelist() if n.endswith(".txt"))
+            raw = zf.read(name)
+    reader = csv.reader(io.StringIO(raw.decode("utf-8-sig")), delimiter="\t")
+    # The last header (INTPTLONG) carries trailing blanks
+    header = [h.strip() for h in next(reader)]
+    col = {h: i for i, h in enumerate(header)}
+    table = {}
+    for row in reader:
+        if not row:
+            continue
+        zip5 = row[col["GEOID"]].strip()
+        table[zip5] = (float(row[col["INTPTLAT"]]), float(row[col["INTPTLONG"]]))
+    return table
+
+
+def write_table(table, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as fp:
+        w = csv.writer(fp, lineterminator="\n")
+        w.writerow(["zip", "lat", "lon"])
+        for zip5 in sorted(table):
+            lat, lon = table[zip5]
+            w.writerow([zip5, f"{lat:.4f}", f"{lon:.4f}"])
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--source", help="local Gazetteer .zip/.txt (default: download)")
+    ap.add_argument("--url", default=GAZETTEER_URL)
+    ap.add_argument("--output", default=OUTPUT)
+    args = ap.parse_args(argv)
+
+    if args.source:
+        with open(args.source, "rb") as fp:
+            raw = fp.read()
+    else:
+        with urllib.request.urlopen(args.url, timeout=60) as resp:
+            raw = resp.read()
+
+    table = read_gazetteer(raw)
+    if len(table) < MIN_ROWS:
+        print(f"only {len(table)} ZCTAs read; keeping {args.output}", file=sys.stderr)
+        return 1
+    write_table(table, args.output)
+    print(f"wrote {len(table)} ZIP centroids to {os.path.normpath(args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
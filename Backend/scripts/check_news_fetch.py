@@ -0,0 +1,95 @@
+"""
+Local check of the news fetcher's HTTP path against a throwaway
+http.server: a plain 200, a 304 for a matching If-None-Match and a
+gzip-encoded feed, each through news_fetcher's fetch_feed().
+
+    python Backend/scripts/check_news_fetch.py
+
+Needs no AWS access (the fetcher's clients are created but not called).
+Exits non-zero on the first failed check.
+"""
+import os
+import sys
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("NEWS_TABLE", "check-news")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+_LAMBDA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda")
+sys.path[:0] = [os.path.join(_LAMBDA, "news_fetcher"), os.path.join(_LAMBDA, "common")]
+import app  # noqa: E402
+
+ETAG = '"feed-v1"'
+LAST_MODIFIED = "Sat, 17 Oct 2026 06:00:00 GMT"
+FEED = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Check</title>
+  <item><title>Container rates climb</title><link>https://example.com/a</link>
+    <description>Freight update</description><pubDate>Sat, 17 Oct 2026 05:00:00 GMT</pubDate></item>
+  <item><title>Port congestion eases</title><link>https://example.com/b</link>
+    <description>Shipping news</description><pubDate>Sat, 17 Oct 2026 04:00:00 GMT</pubDate></item>
+  <item><title>Unrelated story</title><link>https://example.com/c</link>
+    <description>Nothing to see</description></item>
+</channel></rss>"""
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    """/feed: 200 with validators, 304 when they match; /gzip: gzip-encoded."""
+
+    def do_GET(self):
+        if self.path == "/feed" and self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+        body = FEED
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("ETag", ETAG)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        if self.path == "/gzip":
+            assert "gzip" in (self.headers.get("Accept-Encoding") or "")
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def check(name, ok):
+    print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+    if not ok:
+        sys.exit(1)
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        r = app.fetch_feed(f"{base}/feed")
+        check("200 -> fetched", r["status"] == "fetched")
+        check("200 keeps the keyword items", [i["link"] for i in r["items"]]
+              == ["https://example.com/a", "https://example.com/b"])
+        check("200 returns new validators", r["etag"] == ETAG and r["lastModified"] == LAST_MODIFIED
+              and r["validators_changed"])
+
+        r = app.fetch_feed(f"{base}/feed", {"etag": ETAG, "lastModified": LAST_MODIFIED})
+        check("matching If-None-Match -> not_modified", r["status"] == "not_modified")
+        check("304 carries no items", r["items"] == [])
+
+        r = app.fetch_feed(f"{base}/gzip")
+        check("gzip -> fetched", r["status"] == "fetched")
+        check("gzip body decoded", len(r["items"]) == 2)
+    finally:
+        server.shutdown()
+    print("news fetch checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""
+Bulk loader for the ports table (PortsTableV2).
+
+Reads files like data/us-port-data.json: several JSON arrays written back
+to back, items in DynamoDB-typed ({"S": ...}) or plain form. Items are
+parsed one at a time, given the derived attributes the port service and
+its GSIs rely on, de-duplicated on id (last one wins) and written with
+parallel BatchWriteItem workers.
+
+    python Backend/scripts/load_ports.py data/us-port-data.json --table <name>
+    python Backend/scripts/load_ports.py data/us-port-data.json --dry-run
+
+Run scripts/build_zip_centroids.py first: with only the committed sample
+table, most ports get their prefix range's approximate coordinates.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import boto3
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+# Shared lambda code (geo helpers + bundled centroid tables)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda", "common"))
+import geo  # noqa: E402
+
+BATCH_SIZE = 25          # BatchWriteItem hard limit
+MAX_ATTEMPTS = 8         # per batch, for UnprocessedItems / throttling
+BASE_BACKOFF = 0.05      # seconds, doubled per attempt (plus jitter)
+READ_CHUNK = 64 * 1024
+
+# GSI key attributes; DynamoDB rejects empty strings here, so an empty
+# value is dropped instead (the item simply stays out of that index).
+INDEX_KEY_FIELDS = ["state_lc", "city_lc", "name_lc", "pincode", "geoCell", "geohash"]
+
+# Precomputed "nearby ports" list stored on each port
+NEARBY_COUNT = 5
+NEARBY_RADIUS_KM = 250
+
+DYNAMO_TYPES = {"S", "N", "B", "SS", "NS", "BS", "M", "L", "NULL", "BOOL"}
+
+_deserializer = TypeDeserializer()
+_serializer = TypeSerializer()
+
+
+# ---------------------------------------------------
+# STREAMING PARSE
+# ---------------------------------------------------
+def iter_json_items(fp):
+    """
+    Yield the elements of every top-level JSON array in fp (plus any bare
+    top-level objects), reading the file in chunks.
+    """
+    decoder = json.JSONDecoder(parse_float=Decimal)
+    buf = ""
+    pos = 0
+    eof = False
+
+    while True:
+        # Skip array brackets, commas and whitespace between items
+        while pos < len(buf) and (buf[pos].isspace() or buf[pos] in "[],"):
+            pos += 1
+
+        if pos >= len(buf):
+            if eof:
+                break
+            chunk = fp.read(READ_CHUNK)
+            buf, pos = buf[pos:] + chunk, 0
+            eof = not chunk
+            continue
+
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = fp.read(READ_CHUNK)
+            buf, pos = buf[pos:] + chunk, 0
+            eof = not chunk
+            continue
+
+        pos = end
+        if isinstance(obj, dict):
+            yield obj
+
+        # Keep the buffer from growing with consumed text
+        if pos > READ_CHUNK:
+            buf, pos = buf[pos:], 0
+
+
+def _is_typed(item):
+    return all(
+        isinstance(v, dict) and len(v) == 1 and next(iter(v)) in DYNAMO_TYPES
+        for v in item.values()
+    )
+
+
+def to_plain(item):
+    if item and _is_typed(item):
+        return {k: _deserializer.deserialize(v) for k, v in item.items()}
+    return item
+
+
+# ---------------------------------------------------
+# DERIVED ATTRIBUTES
+# ---------------------------------------------------
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+
+
+def derive(item):
+    """
+    Add the attributes handle_list / the GSIs expect:
+      name_lc, city_lc, country_lc, state_lc
+                  lower-cased copies; GSI_StateCityLc/GSI_CityLc/GSI_Name keys
+      lat, lon    ZIP centroid of pincode (bundled table, no lookups)
+      geohash     GSI_Geo range key; geoCell (its first chars) the hash key
+    """
+    out = dict(item)
+    for f in ("name", "city", "state", "country", "pincode"):
+        if isinstance(out.get(f), str):
+            out[f] = out[f].strip()
+
+    name = out.get("name") or ""
+    pincode = str(out.get("pincode") or "")
+
+    if not out.get("id"):
+        out["id"] = f"PORT#{_slug(name)}" if name else None
+
+    for f in ("name", "city", "country", "state"):
+        out[f"{f}_lc"] = (out.get(f) or "").lower()
+
+    centroid = geo.zip_centroid(pincode)
+    if centroid:
+        lat, lon, _ = centroid
+        out["lat"] = Decimal(str(lat))
+        out["lon"] = Decimal(str(lon))
+        out["geohash"] = geo.geohash_encode(lat, lon)
+        out["geoCell"] = out["geohash"][:geo.GEO_CELL_PRECISION]
+
+    for f in INDEX_KEY_FIELDS:
+        if out.get(f) == "":
+            del out[f]
+    return out
+
+
+def attach_nearby(items, count=NEARBY_COUNT, radius_km=NEARBY_RADIUS_KM):
+    """
+    Store each port's closest neighbours as `nearby`. Ports are bucketed
+    by geohash prefix so each one is only compared with ports in the
+    cells covering its radius.
+    """
+    located = [it for it in items if it.get("geohash")]
+    buckets = {}
+    for it in located:
+        for p in range(geo.GEO_CELL_PRECISION, geo.GEOHASH_PRECISION + 1):
+            buckets.setdefault(it["geohash"][:p], []).append(it)
+
+    for it in located:
+        lat, lon = float(it["lat"]), float(it["lon"])
+        candidates = {}
+        for cell in geo.covering_cells(lat, lon, radius_km):
+            for other in buckets.get(cell, ()):
+                candidates[other["id"]] = other
+        candidates.pop(it["id"], None)
+
+        ranked = []
+        for other in candidates.values():
+            km = geo.haversine_km(lat, lon, float(other["lat"]), float(other["lon"]))
+            if km <= radius_km:
+                ranked.append((km, other))
+        ranked.sort(key=lambda kv: (kv[0], kv[1]["id"]))
+
+        it["nearby"] = [
+            {
+                "id": other["id"],
+                "name": other.get("name"),
+                "city": other.get("city"),
+                "state": other.get("state"),
+                "distanceKm": Decimal(str(round(km, 1))),
+            }
+            for km, other in ranked[:count]
+        ]
+
+
+def load_items(paths):
+    """Parse, derive and de-duplicate. Returns (items_by_id, stats)."""
+    stats = {"read": 0, "duplicates": 0, "skipped": 0}
+    by_id = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as fp:
+            for raw in iter_json_items(fp):
+                stats["read"] += 1
+                item = derive(to_plain(raw))
+                if not item.get("id"):
+                    stats["skipped"] += 1
+                    continue
+                if item["id"] in by_id:
+                    stats["duplicates"] += 1
+                by_id[item["id"]] = item
+    attach_nearby(list(by_id.values()))
+    stats["located"] = sum(1 for it in by_id.values() if it.get("geohash"))
+    return by_id, stats
+
+
+# ---------------------------------------------------
+# PARALLEL WRITES
+# ---------------------------------------------------
+def _write_batch(client, table, batch):
+    """
+    Write one batch of <=25 put requests, retrying UnprocessedItems and
+    throttling with exponential backoff. Returns items that never landed.
+    """
+    requests = [{"PutRequest": {"Item": {k: _serializer.serialize(v) for k, v in it.items()}}}
+                for it in batch]
+
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            resp = client.batch_write_item(RequestItems={table: requests})
+            requests = (resp.get("UnprocessedItems") or {}).get(table, [])
+        except client.exceptions.ProvisionedThroughputExceededException:
+            pass
+        if not requests:
+            return []
+        time.sleep(BASE_BACKOFF * (2 ** attempt) * (1 + random.random()))
+
+    return requests
+
+
+def write_items(items, table, workers=8, client=None):
+    client = client or boto3.client("dynamodb")
+    batches = [items[i:i + BATCH_SIZE] for i in range(0, len(items), BATCH_SIZE)]
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_write_batch, client, table, b) for b in batches]
+        for fut in as_completed(futures):
+            failed.extend(fut.result())
+
+    return len(items) - len(failed), failed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("paths", nargs="+", help="JSON file(s) of concatenated item arrays")
+    ap.add_argument("--table", default=os.environ.get("PORTS_TABLE"),
+                    help="target table (default: $PORTS_TABLE)")
+    ap.add_argument("--workers", type=int, default=8)
+    ap.add_argument("--dry-run", action="store_true",
+                    help="parse and derive only; print a summary and one sample item")
+    args = ap.parse_args(argv)
+
+    t0 = time.time()
+    by_id, stats = load_items(args.paths)
+    items = list(by_id.values())
+    print(f"Parsed {stats['read']} items -> {len(items)} unique "
+          f"({stats['duplicates']} duplicate ids, {stats['skipped']} without id/name, "
+          f"{stats['located']} with coordinates)")
+
+    if args.dry_run:
+        if items:
+            print(json.dumps(items[0], indent=2, default=str))
+        return 0
+
+    if not args.table:
+        ap.error("--table (or PORTS_TABLE) is required unless --dry-run")
+
+    written, failed = write_items(items, args.table, workers=args.workers)
+    print(f"Wrote {written} items to {args.table} in {time.time() - t0:.1f}s")
+    if failed:
+        print(f"{len(failed)} items could not be written after {MAX_ATTEMPTS} attempts")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
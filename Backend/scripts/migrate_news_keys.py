@@ -0,0 +1,128 @@
+"""
+Move existing news rows to the time-ordered keys GET /news now reads.
+
+Rows written before this change are keyed by ts = hash(title + link),
+so "latest" came back in hash order. Each such row (one without
+articleId) is rewritten as news_fetcher would store it today:
+
+  ts         published_at (epoch s) * 10^8 + article id tiebreak
+  sourceKey  GSI_Source partition (source= filter)
+  TAG#<tag>  one copy per tag (tag= filter)
+
+and the old row is deleted. Undated rows sort as the oldest. Re-running
+is safe: migrated rows carry articleId and are skipped. Afterwards the
+fetcher's seen-set item is deleted so its next run rebuilds it with the
+new keys.
+
+The old fetcher tagged every article ["container", "market"]. Those
+tags are dropped (tags now come from the feed's categories): migrated
+rows get none, and rows already stored with exactly those tags lose them
+along with their TAG#container / TAG#market copies.
+
+    python Backend/scripts/migrate_news_keys.py --table <stack>-news --meta-table <stack>-meta
+    python Backend/scripts/migrate_news_keys.py --table <stack>-news --dry-run
+"""
+import os
+import sys
+import time
+import argparse
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+# Fetcher code (row layout, seen-set) and the shared lambda code it uses
+_LAMBDA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda")
+sys.path[:0] = [os.path.join(_LAMBDA, "news_fetcher"), os.path.join(_LAMBDA, "common")]
+import news_items  # noqa: E402
+import seen_set  # noqa: E402
+
+# The fixed tags every article used to get, whatever it was about
+LEGACY_TAGS = ["container", "market"]
+
+
+def news_rows(table):
+    kwargs = {"KeyConditionExpression": Key("pk").eq(news_items.NEWS_PK)}
+    while True:
+        resp = table.query(**kwargs)
+        yield from resp.get("Items", [])
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def old_rows(table):
+    for item in news_rows(table):
+        if "articleId" not in item and item.get("title") is not None and item.get("link") is not None:
+            yield item
+
+
+def legacy_tagged_rows(table):
+    for item in news_rows(table):
+        if "articleId" in item and list(item.get("tags") or []) == LEGACY_TAGS:
+            yield item
+
+
+def untag_item(table, item, dry_run):
+    """Drop the legacy tags from a migrated row and delete its tag copies."""
+    if dry_run:
+        return
+    table.update_item(Key={"pk": item["pk"], "ts": item["ts"]},
+                      UpdateExpression="SET tags = :none",
+                      ExpressionAttributeValues={":none": []})
+    with table.batch_writer() as bw:
+        for tag in LEGACY_TAGS:
+            bw.delete_item(Key={"pk": f"{news_items.TAG_PK_PREFIX}{tag}", "ts": item["ts"]})
+
+
+def migrate_item(table, item, dry_run):
+    aid = news_items.article_id(item)
+    article = {k: v for k, v in item.items() if k not in ("pk", "ts", "sourceKey")}
+    tags = list(item.get("tags") or [])
+    article["tags"] = [] if tags == LEGACY_TAGS else tags
+    article["articleId"] = aid
+    article["contentHash"] = seen_set.content_hash(item)
+    ts = news_items.sort_key(item, aid, fallback_seconds=0)
+    if dry_run:
+        return ts
+    main, copies = news_items.rows(article, ts)
+    with table.batch_writer() as bw:
+        for row in copies + [main]:
+            bw.put_item(Item=row)
+        if ts != item["ts"]:
+            bw.delete_item(Key={"pk": news_items.NEWS_PK, "ts": item["ts"]})
+    return ts
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--table", required=True, help="news table")
+    ap.add_argument("--meta-table", help="meta table holding the fetcher's seen-set")
+    ap.add_argument("--dry-run", action="store_true", help="count rows to migrate without writing")
+    args = ap.parse_args(argv)
+
+    ddb = boto3.resource("dynamodb")
+    table = ddb.Table(args.table)
+    t0 = time.time()
+    moved = 0
+    # Materialised first: rewritten rows land in the partition being read
+    for item in list(old_rows(table)):
+        migrate_item(table, item, args.dry_run)
+        moved += 1
+
+    untagged = 0
+    for item in list(legacy_tagged_rows(table)):
+        untag_item(table, item, args.dry_run)
+        untagged += 1
+
+    verb = "to migrate" if args.dry_run else "migrated"
+    print(f"{args.table}: {moved} rows {verb}, {untagged} rows' legacy tags "
+          f"{'to drop' if args.dry_run else 'dropped'} in {time.time() - t0:.1f}s")
+    if args.meta_table and not args.dry_run:
+        ddb.Table(args.meta_table).delete_item(Key={"id": seen_set.SNAPSHOT_ID})
+        print(f"Deleted {seen_set.SNAPSHOT_ID} from {args.meta_table}; the next fetch rebuilds it")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
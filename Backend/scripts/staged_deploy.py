@@ -0,0 +1,230 @@
+"""
+Deploy the built stack so no update creates or deletes more than one
+global secondary index per table.
+
+CloudFormation rejects an update that adds (or drops) several GSIs on
+one DynamoDB table, and a template change can carry several: the
+listings tables gained GSI_Recent, the three price indexes and GSI_Geo.
+This script compares the built template with the deployed tables and
+runs `sam deploy` once per step with an intermediate template. Each
+intermediate template is the built one with each table one index closer
+to its target, dropping old indexes before adding new ones and keeping
+only the AttributeDefinitions its keys use. The last deploy is the built
+template itself. Tables the stack doesn't have yet are created with all
+their indexes in one go.
+
+    sam build
+    python scripts/staged_deploy.py --stack-name containers-club-dev -- \\
+        --config-env dev --no-confirm-changeset --no-fail-on-empty-changeset
+    python scripts/staged_deploy.py --stack-name containers-club-dev --dry-run
+
+Arguments after "--" go to every `sam deploy`. Run from Backend/ after
+`sam build` (the stages are written next to .aws-sam/build/template.yaml
+so their CodeUris resolve). Each stage waits for its index to become
+ACTIVE, which can take a while on a large table. After the last stage,
+run backfill_listings.py for each listings table: the list handlers
+scan until its completion marker is there.
+"""
+import os
+import sys
+import copy
+import argparse
+import subprocess
+
+import boto3
+import yaml
+from botocore.exceptions import ClientError
+
+BUILT_TEMPLATE = os.path.join(".aws-sam", "build", "template.yaml")
+
+
+# ---------------------------------------------------
+# TEMPLATE I/O (keeps !Ref, !Sub, !GetAtt ... as written)
+# ---------------------------------------------------
+class Tagged:
+    def __init__(self, tag, value):
+        self.tag = tag
+        self.value = value
+
+
+class Loader(yaml.SafeLoader):
+    pass
+
+
+class Dumper(yaml.SafeDumper):
+    pass
+
+
+def _construct_tagged(loader, tag_suffix, node):
+    if isinstance(node, yaml.ScalarNode):
+        value = loader.construct_scalar(node)
+    elif isinstance(node, yaml.SequenceNode):
+        value = loader.construct_sequence(node, deep=True)
+    else:
+        value = loader.construct_mapping(node, deep=True)
+    return Tagged("!" + tag_suffix, value)
+
+
+def _represent_tagged(dumper, data):
+    if isinstance(data.value, list):
+        return dumper.represent_sequence(data.tag, data.value)
+    if isinstance(data.value, dict):
+        return dumper.represent_mapping(data.tag, data.value)
+    return dumper.represent_scalar(data.tag, data.value)
+
+
+Loader.add_multi_constructor("!", _construct_tagged)
+Dumper.add_representer(Tagged, _represent_tagged)
+
+
+def load_template(path):
+    with open(path, encoding="utf-8") as fp:
+        return yaml.load(fp, Loader=Loader)
+
+
+def write_template(template, path):
+    with open(path, "w", encoding="utf-8") as fp:
+        yaml.dump(template, fp, Dumper=Dumper, sort_keys=False, default_flow_style=False)
+
+
+# ---------------------------------------------------
+# DEPLOYED STATE
+# ---------------------------------------------------
+def deployed_indexes(cfn, ddb, stack_name, logical_id):
+    """
+    {index name: CFN-style definition} and {attribute: type} of the
+    deployed table, or (None, None) if the stack doesn't have it yet.
+    """
+    try:
+        resource = cfn.describe_stack_resource(StackName=stack_name, LogicalResourceId=logical_id)
+        table_name = resource["StackResourceDetail"]["PhysicalResourceId"]
+        desc = ddb.describe_table(TableName=table_name)["Table"]
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("ValidationError", "ResourceNotFoundException"):
+            return None, None
+        raise
+    indexes = {}
+    for gsi in desc.get("GlobalSecondaryIndexes", []):
+        projection = {"ProjectionType": gsi["Projection"]["ProjectionType"]}
+        if gsi["Projection"].get("NonKeyAttributes"):
+            projection["NonKeyAttributes"] = gsi["Projection"]["NonKeyAttributes"]
+        indexes[gsi["IndexName"]] = {
+            "IndexName": gsi["IndexName"],
+            "KeySchema": gsi["KeySchema"],
+            "Projection": projection,
+        }
+    types = {a["AttributeName"]: a["AttributeType"] for a in desc["AttributeDefinitions"]}
+    return indexes, types
+
+
+# ---------------------------------------------------
+# STAGES
+# ---------------------------------------------------
+def index_steps(current, target):
+    """
+    Index lists (definitions) from current to target, one index added
+    or dropped per step; the last step is target itself.
+    """
+    names = list(current)
+    wanted = [gsi["IndexName"] for gsi in target]
+    steps = []
+    for name in [n for n in names if n not in wanted]:
+        names.remove(name)
+        steps.append(list(names))
+    for name in wanted:
+        if name not in names:
+            names.append(name)
+            steps.append(list(names))
+    if not steps:
+        return []
+    by_name = dict(current)
+    by_name.update({gsi["IndexName"]: gsi for gsi in target})
+    return [[by_name[n] for n in step] for step in steps]
+
+
+def _attribute_definitions(props, indexes, deployed_types):
+    used = [k["AttributeName"] for k in props["KeySchema"]]
+    for gsi in indexes:
+        used += [k["AttributeName"] for k in gsi["KeySchema"]]
+    types = dict(deployed_types)
+    types.update({a["AttributeName"]: a["AttributeType"] for a in props["AttributeDefinitions"]})
+    seen = []
+    for name in used:
+        if name not in seen:
+            seen.append(name)
+    return [{"AttributeName": n, "AttributeType": types[n]} for n in seen]
+
+
+def plan_stages(template, cfn, ddb, stack_name):
+    """
+    ([intermediate templates], [(table, steps)]) bringing the deployed
+    tables to the built template one index per table per stage.
+    """
+    per_table = {}
+    for logical_id, resource in template.get("Resources", {}).items():
+        if resource.get("Type") != "AWS::DynamoDB::Table":
+            continue
+        props = resource.get("Properties", {})
+        current, types = deployed_indexes(cfn, ddb, stack_name, logical_id)
+        if current is None:
+            continue
+        steps = index_steps(current, props.get("GlobalSecondaryIndexes", []))
+        # The last step is the built template itself
+        if len(steps) > 1:
+            per_table[logical_id] = (steps[:-1], types)
+
+    stages = []
+    for i in range(max((len(s) for s, _ in per_table.values()), default=0)):
+        stage = copy.deepcopy(template)
+        for logical_id, (steps, types) in per_table.items():
+            props = stage["Resources"][logical_id]["Properties"]
+            indexes = steps[min(i, len(steps) - 1)]
+            props["AttributeDefinitions"] = _attribute_definitions(props, indexes, types)
+            if indexes:
+                props["GlobalSecondaryIndexes"] = indexes
+            else:
+                props.pop("GlobalSecondaryIndexes", None)
+        stages.append(stage)
+    summary = [(logical_id, [[g["IndexName"] for g in step] for step in steps])
+               for logical_id, (steps, _) in per_table.items()]
+    return stages, summary
+
+
+def sam_deploy(template_file, sam_args):
+    cmd = ["sam", "deploy", *sam_args]
+    if template_file:
+        cmd += ["--template-file", template_file]
+    print("$", " ".join(cmd), flush=True)
+    subprocess.run(cmd, check=True)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--stack-name", required=True)
+    ap.add_argument("--template", default=BUILT_TEMPLATE, help="built template (default: %(default)s)")
+    ap.add_argument("--dry-run", action="store_true", help="print the stages without deploying")
+    ap.add_argument("sam_args", nargs="*", help="passed to sam deploy (after --)")
+    args = ap.parse_args(argv)
+
+    template = load_template(args.template)
+    stages, summary = plan_stages(template, boto3.client("cloudformation"),
+                                  boto3.client("dynamodb"), args.stack_name)
+    for logical_id, steps in summary:
+        print(f"{logical_id}:")
+        for n, step in enumerate(steps, 1):
+            print(f"  stage {n}: {', '.join(step) or '(no indexes)'}")
+    print(f"{len(stages)} intermediate stage(s), then {args.template}")
+    if args.dry_run:
+        return 0
+
+    base = os.path.splitext(args.template)[0]
+    for n, stage in enumerate(stages, 1):
+        path = f"{base}.stage{n}.yaml"
+        write_template(stage, path)
+        sam_deploy(path, args.sam_args)
+    sam_deploy(args.template, args.sam_args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
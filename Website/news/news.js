@@ -21,28 +21,47 @@
     return div.textContent || div.innerText || "";
   }
 
-  try {
-    const res = await fetch(url, { headers: { Accept: "application/json" } });
-    if (!res.ok) throw new Error(`Failed to fetch news (${res.status})`);
-
-    const data = await res.json();
+  // ?source= / ?tag= on the page are passed through to the API
+  const pageParams = new URLSearchParams(location.search);
 
-    if (!Array.isArray(data) || data.length === 0) {
-      list.innerHTML = "<p>No news yet. Check back tomorrow.</p>";
-      return;
+  // First page: the static snapshot the fetcher publishes after each run
+  // (served by CloudFront); the API is the fallback and serves later pages.
+  async function fetchSnapshot() {
+    const source = pageParams.get("source");
+    const tag = pageParams.get("tag");
+    if (source && tag) return null;
+    const name = source ? `source:${source}` : tag ? `tag:${tag.toLowerCase()}` : "latest";
+    try {
+      const res = await fetch("/news/data/manifest.json", { headers: { Accept: "application/json" } });
+      if (!res.ok) return null;
+      const page = ((await res.json()).pages || {})[name];
+      if (!page) return null;
+      const body = await fetch(page.key, { headers: { Accept: "application/json" } });
+      return body.ok ? await body.json() : null;
+    } catch (err) {
+      console.warn("News snapshot unavailable", err);
+      return null;
     }
+  }
 
-    metricStories.textContent = data.length.toString();
-    const sources = new Set(data.map(i => i.source).filter(Boolean));
-    metricSources.textContent = sources.size.toString();
-
-    const latest = data.reduce((acc, item) => {
-      const d = toDate(item.published_at);
-      return d > acc ? d : acc;
-    }, new Date(0));
-    metricUpdated.textContent = latest.toLocaleString();
+  async function fetchPage(nextToken) {
+    if (!nextToken) {
+      const snapshot = await fetchSnapshot();
+      if (snapshot) return snapshot;
+    }
+    const q = new URLSearchParams();
+    ["source", "tag"].forEach(k => pageParams.get(k) && q.set(k, pageParams.get(k)));
+    if (nextToken) q.set("nextToken", nextToken);
+    const qs = q.toString();
+    const res = await fetch(qs ? `${url}?${qs}` : url, { headers: { Accept: "application/json" } });
+    if (!res.ok) throw new Error(`Failed to fetch news (${res.status})`);
+    const body = await res.json();
+    // { items, nextToken } (older API: a plain array)
+    return Array.isArray(body) ? { items: body, nextToken: null } : body;
+  }
 
-    list.innerHTML = data.map(item => {
+  function renderCards(data) {
+    return data.map(item => {
       const when = toDate(item.published_at).toLocaleString();
       const link = item.url ?? item.link ?? "#";
       const tags = (item.tags || [])
@@ -60,6 +79,55 @@
         </article>
       `;
     }).join("");
+  }
+
+  try {
+    const first = await fetchPage();
+    const data = first.items || [];
+
+    if (data.length === 0) {
+      list.innerHTML = "<p>No news yet. Check back tomorrow.</p>";
+      return;
+    }
+
+    function updateMetrics() {
+      metricStories.textContent = data.length.toString();
+      const sources = new Set(data.map(i => i.source).filter(Boolean));
+      metricSources.textContent = sources.size.toString();
+
+      const latest = data.reduce((acc, item) => {
+        const d = toDate(item.published_at);
+        return d > acc ? d : acc;
+      }, new Date(0));
+      metricUpdated.textContent = latest.toLocaleString();
+    }
+
+    updateMetrics();
+    list.innerHTML = renderCards(data);
+
+    // Older stories, one page at a time
+    let nextToken = first.nextToken;
+    if (nextToken) {
+      const more = document.createElement("button");
+      more.type = "button";
+      more.className = "btn";
+      more.textContent = "Load more";
+      list.after(more);
+      more.addEventListener("click", async () => {
+        more.disabled = true;
+        try {
+          const page = await fetchPage(nextToken);
+          data.push(...(page.items || []));
+          list.insertAdjacentHTML("beforeend", renderCards(page.items || []));
+          updateMetrics();
+          nextToken = page.nextToken;
+        } catch (err) {
+          console.error(err);
+        }
+        more.disabled = false;
+        if (!nextToken) more.remove();
+      });
+    }
 
   } catch (err) {
     console.error(err);
@@ -432,10 +432,8 @@
 
   let base, endpoint;
 
-  const PAGE_SIZE = 50;
-  let ALL_PORTS = [];
-  let CURRENT_FILTERED = [];
-  let currentPage = 1;
+  // Ports rendered so far (first page plus any "Load more" pages)
+  let LOADED_PORTS = [];
 
   // ---------------------------------- HELPERS ----------------------------------
   async function api(path, params) {
@@ -466,8 +464,22 @@
   if (backdrop) backdrop.addEventListener('click', closeDrawer);
 
   // ---------------------------------- DROPDOWN LOGIC ----------------------------------
-  function loadStates() {
-    const states = Object.keys(IN_STATE_CITIES).sort((a, b) => a.localeCompare(b));
+  // Cascading values come from /ports/filters (a precomputed facet
+  // snapshot); the static map / rendered ports are only a fallback.
+  async function loadFacets(params) {
+    try {
+      return await api(`${endpoint}/filters`, params);
+    } catch (err) {
+      console.warn(err);
+      return null;
+    }
+  }
+
+  async function loadStates() {
+    const facets = await loadFacets();
+    const states = facets && facets.states && facets.states.length
+      ? facets.states
+      : Object.keys(IN_STATE_CITIES).sort((a, b) => a.localeCompare(b));
     fillSelect(stateSel, states, "State");
 
     if (citySel) {
@@ -487,9 +499,12 @@
     fillSelect(typeSel, portTypes, "Port type");
   }
 
-  function onStateChange() {
+  async function onStateChange() {
     const state = stateSel.value;
-    const cities = IN_STATE_CITIES[state] || [];
+    const facets = state ? await loadFacets({ state }) : null;
+    const cities = facets && facets.cities && facets.cities.length
+      ? facets.cities
+      : (IN_STATE_CITIES[state] || []);
     fillSelect(citySel, cities, "City");
 
     if (portSel) {
@@ -501,11 +516,10 @@
       pinSel.disabled = true;
     }
 
-    currentPage = 1;
     runSearch();
   }
 
-  function onCityChange() {
+  async function onCityChange() {
     const state = stateSel.value;
     const city  = citySel.value;
 
@@ -518,18 +532,25 @@
         pinSel.innerHTML  = '<option value="">Pincode</option>';
         pinSel.disabled = true;
       }
-      currentPage = 1;
       runSearch();
       return;
     }
 
-    const subset = ALL_PORTS.filter(p =>
-      (p.state || "").toLowerCase() === state.toLowerCase() &&
-      (p.city || "").toLowerCase() === city.toLowerCase()
-    );
+    let names, pins;
+    const facets = await loadFacets({ state, city });
+    if (facets) {
+      names = facets.ports || [];
+      pins  = facets.pincodes || [];
+    } else {
+      const subset = LOADED_PORTS.filter(p =>
+        (p.state || "").toLowerCase() === state.toLowerCase() &&
+        (p.city || "").toLowerCase() === city.toLowerCase()
+      );
+      names = [...new Set(subset.map(p => p.name).filter(Boolean))]
+        .sort((a, b) => a.localeCompare(b));
+      pins = [...new Set(subset.map(p => p.pincode).filter(Boolean))].sort();
+    }
 
-    const names = [...new Set(subset.map(p => p.name).filter(Boolean))]
-      .sort((a, b) => a.localeCompare(b));
     if (names.length) {
       fillSelect(portSel, names, "Port");
     } else if (portSel) {
@@ -537,241 +558,226 @@
       portSel.disabled = true;
     }
 
-    const pins = [...new Set(subset.map(p => p.pincode).filter(Boolean))];
     if (pins.length) {
-      fillSelect(pinSel, pins.sort(), "Pincode");
+      fillSelect(pinSel, pins, "Pincode");
     } else if (pinSel) {
       pinSel.innerHTML = '<option value="">Pincode</option>';
       pinSel.disabled = true;
     }
 
-    currentPage = 1;
     runSearch();
   }
 
   // ---------------------------------- FILTERING + RENDER ----------------------------------
-  function applyFilters() {
-    let items = [...ALL_PORTS];
-
-    const state   = stateSel.value.trim();
-    const city    = citySel.value.trim();
-    const port    = portSel ? portSel.value.trim() : "";
-    const pin     = pinSel ? pinSel.value.trim() : "";
-    const type    = typeSel ? typeSel.value.trim() : "";
-    const nameTxt = nameQ.value.trim();
-
-    if (state) {
-      items = items.filter(p => (p.state || "").toLowerCase() === state.toLowerCase());
-    }
-    if (city) {
-      items = items.filter(p => (p.city || "").toLowerCase() === city.toLowerCase());
-    }
-
-    const effectiveName = nameTxt || port;
-    if (effectiveName) {
-      items = items.filter(p => (p.name || "").toLowerCase() === effectiveName.toLowerCase());
-    }
-
-    if (pin) {
-      items = items.filter(p => (p.pincode || "").toString() === pin);
+  // Filters go to the API (state/city are served from a GSI); pages of
+  // FETCH_PAGE_SIZE arrive one at a time via "Load more".
+  const FETCH_PAGE_SIZE = 50;
+
+  function currentFilters() {
+    const port   = portSel ? portSel.value.trim() : "";
+    const values = {
+      state:   stateSel.value.trim(),
+      city:    citySel.value.trim(),
+      name:    nameQ.value.trim() || port,
+      pincode: pinSel ? pinSel.value.trim() : "",
+      type:    typeSel ? typeSel.value.trim() : ""
+    };
+    const filters = {};
+    for (const [k, v] of Object.entries(values)) {
+      if (v) filters[k] = v;
     }
+    return filters;
+  }
 
-    if (type) {
-      items = items.filter(p => (p.port_type || "").toLowerCase() === type.toLowerCase());
+  // One bounded page ({ items, nextToken }); pass nextToken for the next
+  async function listPorts(filters, nextToken = null) {
+    const params = { ...filters, pageSize: FETCH_PAGE_SIZE };
+    if (nextToken) params.nextToken = nextToken;
+    const page = await api(endpoint, params);
+    if (!page || !Array.isArray(page.items)) {
+      throw new Error("Ports API did not return a page of items");
     }
+    return page;
+  }
 
-    return items;
+  function cardHtml(p) {
+    const img = p.image_url && p.image_url.trim()
+      ? p.image_url
+      : "/assets/placeholder-port.jpg";
+
+    const title = p.name || "Unnamed Port";
+    const where = [p.city, p.state, p.country].filter(Boolean).join(", ");
+    const pin = p.pincode ? ` - ${p.pincode}` : "";
+
+    return `
+      <article class="port-card" data-id="${p.id || ""}">
+        <img class="port-img" src="${img}" alt="${title}" />
+        <h3>${title}</h3>
+        <p class="muted">${where}${pin}</p>
+      </article>
+    `;
   }
 
-  function renderPagination(totalItems) {
-    if (!paginationEl) return;
+  // Bumped per search so a slower, superseded response is dropped
+  let renderSeq = 0;
 
-    const totalPages = Math.ceil(totalItems / PAGE_SIZE) || 1;
-    if (currentPage > totalPages) currentPage = totalPages;
+  async function renderList() {
+    const seq = ++renderSeq;
+    const filters = currentFilters();
+    container.innerHTML = "<p>Loading ports…</p>";
+    if (paginationEl) paginationEl.innerHTML = "";
 
-    if (totalPages <= 1) {
-      paginationEl.innerHTML = "";
+    let first;
+    try {
+      first = await listPorts(filters);
+    } catch (err) {
+      console.error(err);
+      if (seq === renderSeq) container.innerHTML = `<p class="error">${err.message}</p>`;
       return;
     }
-
-    let html = `<div style="display:flex;align-items:center;gap:8px;flex-wrap:wrap;">
-      <button class="secondary" data-page="prev"${currentPage === 1 ? ' disabled' : ''}>Prev</button>
-      <span class="muted">Page ${currentPage} of ${totalPages}</span>
-      <button class="secondary" data-page="next"${currentPage === totalPages ? ' disabled' : ''}>Next</button>
-    </div>`;
-
-    paginationEl.innerHTML = html;
-
-    paginationEl.querySelectorAll('button[data-page]').forEach(btn => {
-      btn.addEventListener('click', () => {
-        const action = btn.getAttribute('data-page');
-        if (action === 'prev' && currentPage > 1) currentPage--;
-        if (action === 'next' && currentPage < totalPages) currentPage++;
-        renderList();
-      });
+    if (seq !== renderSeq) return;
+
+    LOADED_PORTS = first.items;
+    container.innerHTML = LOADED_PORTS.length
+      ? LOADED_PORTS.map(cardHtml).join("")
+      : "<p>No ports found.</p>";
+
+    // Later pages, one at a time
+    let nextToken = first.nextToken;
+    if (!nextToken) return;
+    const more = document.createElement("button");
+    more.type = "button";
+    more.className = "secondary";
+    more.textContent = "Load more";
+    if (paginationEl) paginationEl.appendChild(more);
+    else container.after(more);
+    more.addEventListener("click", async () => {
+      more.disabled = true;
+      try {
+        const page = await listPorts(filters, nextToken);
+        if (seq !== renderSeq) return;
+        LOADED_PORTS = LOADED_PORTS.concat(page.items);
+        container.insertAdjacentHTML("beforeend", page.items.map(cardHtml).join(""));
+        nextToken = page.nextToken;
+      } catch (err) {
+        console.error(err);
+      }
+      more.disabled = false;
+      if (!nextToken) more.remove();
     });
   }
 
-  function renderList() {
-    if (!Array.isArray(CURRENT_FILTERED) || CURRENT_FILTERED.length === 0) {
-      container.innerHTML = "<p>No ports found.</p>";
-      renderPagination(0);
-      return;
-    }
+  // 🔍 Click → fetch full details from /ports/:id
+  async function showDetail(id) {
+    try {
+      const detail = await api(`${endpoint}/${encodeURIComponent(id)}`);
 
-    renderPagination(CURRENT_FILTERED.length);
+      const img = detail.image_url && detail.image_url.trim()
+        ? detail.image_url
+        : "/assets/placeholder-port.jpg";
 
-    const start = (currentPage - 1) * PAGE_SIZE;
-    const end   = start + PAGE_SIZE;
-    const items = CURRENT_FILTERED.slice(start, end);
+      const portName = detail.name || "Unnamed Port";
+      const state    = detail.state || "";
+      const city     = detail.city || "";
+      const pin      = detail.pincode || "";
+      const country  = detail.country || "";
+
+      const description = detail.description || "";
+      const portType    = (detail.port_type || "").toLowerCase();
+      const portTypeLabel = portType
+        ? portType.charAt(0).toUpperCase() + portType.slice(1)
+        : "";
+
+      // facilities – support array or Dynamo-style {L:[{S:""}]}
+      let facilities = [];
+      if (Array.isArray(detail.facilities)) {
+        facilities = detail.facilities;
+      } else if (detail.facilities && Array.isArray(detail.facilities.L)) {
+        facilities = detail.facilities.L.map(x => x.S).filter(Boolean);
+      }
 
-    container.innerHTML = items.map(p => {
-      const img = p.image_url && p.image_url.trim()
-        ? p.image_url
-        : "/assets/placeholder-port.jpg";
+      const facilitiesHtml = facilities.length
+        ? `<ul>${facilities.map(f => `<li>${f}</li>`).join("")}</ul>`
+        : "";
 
-      const title = p.name || "Unnamed Port";
-      const where = [p.city, p.state, p.country].filter(Boolean).join(", ");
-      const pin = p.pincode ? ` - ${p.pincode}` : "";
+      const mapLine = [city, state, country].filter(Boolean).join(", ");
+      const mapText = mapLine || "";
 
-      return `
-        <article class="port-card" data-id="${p.id || ""}">
-          <img class="port-img" src="${img}" alt="${title}" />
-          <h3>${title}</h3>
-          <p class="muted">${where}${pin}</p>
+      const html = `
+        <article class="port-card" style="box-shadow:none;border:0;margin:0">
+          <img class="port-img" src="${img}" alt="${portName}" />
+          <h2 style="margin:8px 0 8px">${portName}</h2>
+
+          <p style="margin:4px 0;"><strong>Port Name:</strong> ${portName}</p>
+          ${state ? `<p style="margin:4px 0;"><strong>State:</strong> ${state}</p>` : ""}
+          ${city ? `<p style="margin:4px 0;"><strong>City:</strong> ${city}</p>` : ""}
+          ${pin ? `<p style="margin:4px 0;"><strong>Pincode:</strong> ${pin}</p>` : ""}
+          ${country ? `<p style="margin:4px 0;"><strong>Country:</strong> ${country}</p>` : ""}
+
+          ${description
+            ? `<p style="margin:12px 0 4px;"><strong>Detail:</strong> ${description}</p>`
+            : ""}
+
+          ${portTypeLabel
+            ? `<p style="margin:4px 0;"><strong>Port Type:</strong> ${portTypeLabel}</p>`
+            : ""}
+
+          ${facilities.length
+            ? `<p style="margin:12px 0 4px;"><strong>Facilities:</strong></p>${facilitiesHtml}`
+            : ""}
+
+          ${mapText
+            ? `<p class="muted" style="margin-top:12px;">${mapText}${pin ? " - " + pin : ""}</p>`
+            : ""}
         </article>
       `;
-    }).join("");
-
-    // 🔍 Click → fetch full details from /ports/:id
-    [...container.querySelectorAll('.port-card')].forEach(card => {
-      card.addEventListener('click', async () => {
-        const id = card.getAttribute('data-id');
-        if (!id) return;
-
-        try {
-          const detail = await api(`${endpoint}/${encodeURIComponent(id)}`);
-
-          const img = detail.image_url && detail.image_url.trim()
-            ? detail.image_url
-            : "/assets/placeholder-port.jpg";
-
-          const portName = detail.name || "Unnamed Port";
-          const state    = detail.state || "";
-          const city     = detail.city || "";
-          const pin      = detail.pincode || "";
-          const country  = detail.country || "";
-
-          const description = detail.description || "";
-          const portType    = (detail.port_type || "").toLowerCase();
-          const portTypeLabel = portType
-            ? portType.charAt(0).toUpperCase() + portType.slice(1)
-            : "";
-
-          // facilities – support array or Dynamo-style {L:[{S:""}]}
-          let facilities = [];
-          if (Array.isArray(detail.facilities)) {
-            facilities = detail.facilities;
-          } else if (detail.facilities && Array.isArray(detail.facilities.L)) {
-            facilities = detail.facilities.L.map(x => x.S).filter(Boolean);
-          }
-
-          const facilitiesHtml = facilities.length
-            ? `<ul>${facilities.map(f => `<li>${f}</li>`).join("")}</ul>`
-            : "";
-
-          const mapLine = [city, state, country].filter(Boolean).join(", ");
-          const mapText = mapLine || "";
-
-          const html = `
-            <article class="port-card" style="box-shadow:none;border:0;margin:0">
-              <img class="port-img" src="${img}" alt="${portName}" />
-              <h2 style="margin:8px 0 8px">${portName}</h2>
-
-              <p style="margin:4px 0;"><strong>Port Name:</strong> ${portName}</p>
-              ${state ? `<p style="margin:4px 0;"><strong>State:</strong> ${state}</p>` : ""}
-              ${city ? `<p style="margin:4px 0;"><strong>City:</strong> ${city}</p>` : ""}
-              ${pin ? `<p style="margin:4px 0;"><strong>Pincode:</strong> ${pin}</p>` : ""}
-              ${country ? `<p style="margin:4px 0;"><strong>Country:</strong> ${country}</p>` : ""}
-
-              ${description
-                ? `<p style="margin:12px 0 4px;"><strong>Detail:</strong> ${description}</p>`
-                : ""}
-
-              ${portTypeLabel
-                ? `<p style="margin:4px 0;"><strong>Port Type:</strong> ${portTypeLabel}</p>`
-                : ""}
-
-              ${facilities.length
-                ? `<p style="margin:12px 0 4px;"><strong>Facilities:</strong></p>${facilitiesHtml}`
-                : ""}
-
-              ${mapText
-                ? `<p class="muted" style="margin-top:12px;">${mapText}${pin ? " - " + pin : ""}</p>`
-                : ""}
-            </article>
-          `;
-
-          openDrawer(html, portName);
-        } catch (err) {
-          console.error(err);
-          openDrawer(`<p class="error">${err.message}</p>`, "Port details");
-        }
-      });
-    });
+
+      openDrawer(html, portName);
+    } catch (err) {
+      console.error(err);
+      openDrawer(`<p class="error">${err.message}</p>`, "Port details");
+    }
   }
 
+  container.addEventListener('click', (e) => {
+    const card = e.target.closest('.port-card[data-id]');
+    const id = card && card.getAttribute('data-id');
+    if (id) showDetail(id);
+  });
+
+  // Debounced: typing in the name box fires one request, not one per key
+  let searchTimer = null;
+
   function runSearch() {
-    CURRENT_FILTERED = applyFilters();
-    currentPage = 1;
-    renderList();
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(renderList, 300);
   }
 
-  function resetAll() {
-    loadStates();
+  async function resetAll() {
+    await loadStates();
     if (nameQ) nameQ.value = "";
     if (typeSel) typeSel.value = "";
     if (citySel) citySel.value = "";
     if (portSel) portSel.value = "";
     if (pinSel) pinSel.value  = "";
-    currentPage = 1;
-    CURRENT_FILTERED = [...ALL_PORTS];
-    renderList();
+    runSearch();
     closeDrawer();
   }
 
-  // ---------------------------------- INITIAL LOAD ----------------------------------
-  async function loadAllPorts() {
-    container.innerHTML = "<p>Loading ports…</p>";
-    try {
-      const items = await api(endpoint);
-      if (!Array.isArray(items)) {
-        throw new Error("Ports API did not return an array");
-      }
-      ALL_PORTS = items;
-      CURRENT_FILTERED = [...ALL_PORTS];
-      currentPage = 1;
-      renderList();
-    } catch (err) {
-      console.error(err);
-      container.innerHTML = `<p class="error">${err.message}</p>`;
-    }
-  }
-
   // ---------------------------------- EVENTS ----------------------------------
   if (stateSel) stateSel.addEventListener('change', onStateChange);
   if (citySel)  citySel.addEventListener('change', onCityChange);
 
-  if (portSel)  portSel.addEventListener('change', () => { currentPage = 1; runSearch(); });
-  if (pinSel)   pinSel.addEventListener('change', () => { currentPage = 1; runSearch(); });
-  if (typeSel)  typeSel.addEventListener('change', () => { currentPage = 1; runSearch(); });
-  if (nameQ)    nameQ.addEventListener('input', () => { currentPage = 1; runSearch(); });
+  if (portSel)  portSel.addEventListener('change', runSearch);
+  if (pinSel)   pinSel.addEventListener('change', runSearch);
+  if (typeSel)  typeSel.addEventListener('change', runSearch);
+  if (nameQ)    nameQ.addEventListener('input', runSearch);
 
   if (btn) {
     btn.addEventListener('click', (e) => {
       e.preventDefault();
-      currentPage = 1;
-      runSearch();
+      clearTimeout(searchTimer);
+      renderList();
     });
   }
 
@@ -783,8 +789,7 @@
     base = (cfg.apiBaseUrl || "").replace(/\/$/, "");
     endpoint = cfg.portsEndpoint || "/ports";
 
-    loadStates();
-    await loadAllPorts();
+    await Promise.all([loadStates(), renderList()]);
   } catch (err) {
     container.innerHTML = `<p class="error">${err.message}</p>`;
     console.error(err);
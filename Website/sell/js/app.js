@@ -212,8 +212,23 @@ async function api(path, options = {}) {
 
 /* ---------------- LIST ---------------- */
 
-async function listListings() {
-  return api("/sell/listings");
+const LIST_PAGE_SIZE = 100;
+
+// Filters from the search bar, applied by the API
+function currentFilters() {
+  const filters = {};
+  for (const id of ["q", "size", "condition", "location"]) {
+    const el = document.getElementById(id);
+    if (el && el.value.trim()) filters[id] = el.value.trim();
+  }
+  return filters;
+}
+
+// One bounded page ({ items, nextToken }); pass nextToken for the next
+async function listListings(filters = {}, nextToken = null) {
+  const qs = new URLSearchParams({ ...filters, pageSize: LIST_PAGE_SIZE, sort: "newest" });
+  if (nextToken) qs.set("nextToken", nextToken);
+  return api(`/sell/listings?${qs}`);
 }
 
 /* ---------------- RENDER ---------------- */
@@ -252,15 +267,44 @@ function cardHtml(it) {
 async function renderGrid() {
   const grid = document.getElementById("listingGrid");
   if (!grid) return; // Only render if grid exists (e.g., on index.html)
-  const data = await listListings();
-  window.listings = data.items;
-  grid.innerHTML = data.items.map(cardHtml).join("");
+  const filters = currentFilters();
+  const first = await listListings(filters);
+  window.listings = first.items || [];
+  grid.innerHTML = window.listings.map(cardHtml).join("");
   setupSlideshows();
+
+  // Later pages, one at a time
+  document.getElementById("loadMore")?.remove();
+  let nextToken = first.nextToken;
+  if (nextToken) {
+    const more = document.createElement("button");
+    more.type = "button";
+    more.id = "loadMore";
+    more.className = "btn";
+    more.textContent = "Load more";
+    grid.after(more);
+    more.addEventListener("click", async () => {
+      more.disabled = true;
+      try {
+        const page = await listListings(filters, nextToken);
+        window.listings.push(...(page.items || []));
+        grid.insertAdjacentHTML("beforeend", (page.items || []).map(cardHtml).join(""));
+        setupSlideshows();
+        nextToken = page.nextToken;
+      } catch (err) {
+        console.error(err);
+      }
+      more.disabled = false;
+      if (!nextToken) more.remove();
+    });
+  }
 }
 
 function setupSlideshows() {
   const containers = document.querySelectorAll('.img-container');
   containers.forEach(container => {
+    if (container.dataset.slideshow) return; // already running (earlier page)
+    container.dataset.slideshow = "1";
     const imgs = container.querySelectorAll('img');
     if (imgs.length <= 1) {
       imgs[0].style.display = 'block';
@@ -379,9 +423,10 @@ function confirmBooking(id, price) {
 
 /* ---------------- FILTERS ---------------- */
 
+// Location choices from the facet counts (normalised values)
 async function populateFilters() {
-  const data = await listListings();
-  const locations = [...new Set(data.items.map(it => it.location).filter(Boolean))].sort();
+  const data = await api("/sell/listings/facets");
+  const locations = (data.facets.location || []).map(f => f.value).sort();
   const locationSelect = document.getElementById("location");
   if (locationSelect) {
     locationSelect.innerHTML = '<option value="">Any location</option>' +
@@ -389,21 +434,11 @@ async function populateFilters() {
   }
 }
 
-function filterListings() {
-  const q = document.getElementById("q").value.toLowerCase();
-  const size = document.getElementById("size").value;
-  const condition = document.getElementById("condition").value;
-  const location = document.getElementById("location").value;
-
-  const filtered = window.listings.filter(it => {
-    if (q && !it.title.toLowerCase().includes(q) && !it.description.toLowerCase().includes(q) && !it.location.toLowerCase().includes(q)) return false;
-    if (size && it.size !== size) return false;
-    if (condition && it.condition !== condition) return false;
-    if (location && it.location !== location) return false;
-    return true;
-  });
+let filterTimer = null;
 
-  renderGrid({ items: filtered });
+function filterListings() {
+  clearTimeout(filterTimer);
+  filterTimer = setTimeout(() => renderGrid().catch(console.error), 300);
 }
 
 /* ---------------- INIT ---------------- */